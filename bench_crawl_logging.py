@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评论爬取的日志开销对比
+
+用固定的分页数据代替真实接口（不发请求、不签名），爬取同一篇笔记的全部评论，比较：
+- 旧行为：每追加一条评论就输出一次整个评论列表（输出量随评论数平方增长）
+- 日志关闭：移除所有 loguru 输出
+- INFO：只有采样的翻页摘要（XHS_LOG_PAGE_EVERY），默认配置
+- DEBUG：每页一条摘要
+日志写入临时文件，不受终端速度影响；旧行为的输出量很大，评论数不宜设得过高。
+
+使用示例：
+python bench_crawl_logging.py
+python bench_crawl_logging.py 5000
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from xhs_api_class import XhsAPI
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/bench?xsec_token=t"
+PAGE_SIZE = 20
+
+
+class FakePagesAPI(XhsAPI):
+    """固定分页数据，每页 PAGE_SIZE 条一级评论，不带可展开的二级评论"""
+
+    def __init__(self, total):
+        super().__init__()
+        self.pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+
+    def fetch_comment_page(self, cookies_str, note_params, cursor=''):
+        page = int(cursor or 0)
+        return {
+            'comments': [{
+                'id': f'{page}-{j}',
+                'content': '这是一条用于测试的评论内容' * 3,
+                'create_time': 1700000000000,
+                'ip_location': '上海',
+                'like_count': str(j),
+                'user_info': {'nickname': f'用户{j}', 'user_id': f'u{j}'},
+                'sub_comments': [],
+            } for j in range(PAGE_SIZE)],
+            'cursor': str(page + 1),
+            'has_more': page < self.pages - 1,
+        }
+
+
+def crawl(api):
+    return api.get_comments('a1=bench', NOTE_URL, comments_list=[])
+
+
+def crawl_legacy(api, out):
+    comments_list = []
+    for comment in api.iter_comments('a1=bench', NOTE_URL):
+        comments_list.append(comment)
+        print(comments_list, file=out)
+    return comments_list
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    api = FakePagesAPI(total)
+    log_path = os.path.join(tempfile.mkdtemp(), 'bench.log')
+    rows = []
+
+    logger.remove()
+    with open(log_path, 'w', encoding='utf-8') as out:
+        rows.append(('旧行为（逐条输出整个列表）', *timed(crawl_legacy, api, out)))
+    legacy_bytes = os.path.getsize(log_path)
+
+    rows.append(('日志关闭', *timed(crawl, api)))
+    for level in ('INFO', 'DEBUG'):
+        open(log_path, 'w').close()
+        sink = logger.add(log_path, level=level)
+        rows.append((f'loguru {level}', *timed(crawl, api)))
+        logger.remove(sink)
+        rows.append((f'  └ 输出 {os.path.getsize(log_path)} 字节', None, None))
+
+    print(f"评论数 {total}，每页 {PAGE_SIZE} 条；旧行为输出 {legacy_bytes / 1024 / 1024:.1f} MB")
+    for name, seconds, count in rows:
+        if seconds is None:
+            print(name)
+        else:
+            print(f"{name:<20}{seconds * 1000:>10.1f} ms  {count} 条")
+    os.remove(log_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求头构造耗时对比
+
+对比旧实现（每次重建请求头字典、逐字符拼接 x-b3-traceid、再逐个键赋值）与
+xhs_util.build_request_headers（不变部分预先构造，一次合并）。签名与 x-xray-traceid
+使用固定值，只测请求头本身的构造开销，不需要启动 Node。
+
+使用示例：
+python bench_headers.py
+python bench_headers.py 200000
+"""
+
+import math
+import random
+import sys
+import timeit
+
+from xhs_utils.xhs_util import build_request_headers, generate_x_b3_traceid
+
+XS = 'XYW_' + 'a' * 120
+XT = 1718000000000
+XS_COMMON = 'b' * 400
+XRAY_TRACEID = 'c' * 32
+
+
+def legacy_x_b3_traceid(len=16):
+    x_b3_traceid = ""
+    for t in range(len):
+        x_b3_traceid += "abcdef0123456789"[math.floor(16 * random.random())]
+    return x_b3_traceid
+
+
+def legacy_headers_template():
+    return {
+        "authority": "edith.xiaohongshu.com",
+        "accept": "application/json, text/plain, */*",
+        "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+        "cache-control": "no-cache",
+        "content-type": "application/json;charset=UTF-8",
+        "origin": "https://www.xiaohongshu.com",
+        "pragma": "no-cache",
+        "referer": "https://www.xiaohongshu.com/",
+        "sec-ch-ua": "\"Not A(Brand\";v=\"99\", \"Microsoft Edge\";v=\"121\", \"Chromium\";v=\"121\"",
+        "sec-ch-ua-mobile": "?0",
+        "sec-ch-ua-platform": "\"Windows\"",
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-site",
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36 Edg/121.0.0.0",
+        "x-b3-traceid": "",
+        "x-mns": "unload",
+        "x-s": "",
+        "x-s-common": "",
+        "x-t": "",
+        "x-xray-traceid": XRAY_TRACEID
+    }
+
+
+def legacy_build_headers():
+    x_b3_traceid = legacy_x_b3_traceid()
+    headers = legacy_headers_template()
+    headers['x-s'] = XS
+    headers['x-t'] = str(XT)
+    headers['x-s-common'] = XS_COMMON
+    headers['x-b3-traceid'] = x_b3_traceid
+    return headers
+
+
+def new_build_headers():
+    return build_request_headers(XS, XT, XS_COMMON, XRAY_TRACEID)
+
+
+def bench(func, number):
+    # 取多轮中最快的一轮，减少调度抖动的影响
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return best / number * 1e9
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    old, new = legacy_build_headers(), new_build_headers()
+    assert list(old) == list(new), "请求头顺序不一致"
+    assert {k: v for k, v in old.items() if k != 'x-b3-traceid'} == {k: v for k, v in new.items() if k != 'x-b3-traceid'}
+
+    rows = [
+        ('x-b3-traceid', bench(legacy_x_b3_traceid, number), bench(generate_x_b3_traceid, number)),
+        ('完整请求头', bench(legacy_build_headers, number), bench(new_build_headers, number)),
+    ]
+    print(f"{'项目':<14}{'旧实现(ns)':>12}{'新实现(ns)':>12}{'加速':>8}")
+    for name, old_ns, new_ns in rows:
+        print(f"{name:<14}{old_ns:>12.0f}{new_ns:>12.0f}{old_ns / new_ns:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
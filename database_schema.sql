@@ -14,14 +14,88 @@ CREATE TABLE `xhs_cookies` (
     `create_time` datetime DEFAULT CURRENT_TIMESTAMP COMMENT 'Create Time', 
     `is_survive` int DEFAULT NULL COMMENT 'Cookie是否有效: 1=有效, 0=无效', 
     `val` text COMMENT 'Cookie字符串', 
-    PRIMARY KEY (`id`) 
+    `val_hash` char(64) DEFAULT NULL COMMENT 'Cookie字符串的SHA-256，按值查找时走索引',
+    `last_used` datetime DEFAULT NULL COMMENT '最后使用时间',
+    `use_count` int NOT NULL DEFAULT 0 COMMENT '使用次数',
+    `fail_count` int NOT NULL DEFAULT 0 COMMENT '失败次数',
+    PRIMARY KEY (`id`),
+    INDEX `idx_val_hash` (`val_hash`),
+    INDEX `idx_survive_last_used` (`is_survive`, `last_used`)
 ) ENGINE = InnoDB AUTO_INCREMENT = 2 DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci;
 
+-- 已有 xhs_cookies 表升级（也可调用 DatabaseCookieManager.migrate_cookie_schema()，会跳过已存在的列与索引）：
+-- ALTER TABLE `xhs_cookies`
+--     ADD COLUMN `val_hash` char(64) DEFAULT NULL COMMENT 'Cookie字符串的SHA-256，按值查找时走索引',
+--     ADD COLUMN `last_used` datetime DEFAULT NULL COMMENT '最后使用时间',
+--     ADD COLUMN `use_count` int NOT NULL DEFAULT 0 COMMENT '使用次数',
+--     ADD COLUMN `fail_count` int NOT NULL DEFAULT 0 COMMENT '失败次数',
+--     ADD INDEX `idx_val_hash` (`val_hash`),
+--     ADD INDEX `idx_survive_last_used` (`is_survive`, `last_used`);
+-- UPDATE `xhs_cookies` SET `val_hash` = SHA2(`val`, 256) WHERE `val_hash` IS NULL AND `val` IS NOT NULL;
+
+-- 评论爬取断点表（XHS_CHECKPOINT_BACKEND=mysql 时使用）
+CREATE TABLE IF NOT EXISTS `crawl_checkpoints` (
+    `note_id` varchar(64) NOT NULL COMMENT '笔记ID',
+    `progress` text NOT NULL COMMENT 'CrawlProgress的JSON：一级评论游标、当前页偏移、二级评论游标、已获取数量',
+    `update_time` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT 'Update Time',
+    PRIMARY KEY (`note_id`)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci;
+
+-- 评论监控结果表：同一笔记的同一评论只保留一行，重复写入时刷新点赞等计数
+-- 写入使用 INSERT ... AS new ON DUPLICATE KEY UPDATE 行别名语法，需要 MySQL 8.0.19 及以上
+CREATE TABLE IF NOT EXISTS `monitor_comments` (
+    `id` bigint NOT NULL AUTO_INCREMENT COMMENT 'Primary Key',
+    `note_id` varchar(64) NOT NULL DEFAULT '' COMMENT '笔记ID',
+    `keyword` varchar(255) DEFAULT NULL COMMENT '关键词',
+    `title` varchar(255) DEFAULT NULL COMMENT '笔记标题',
+    `note_author` varchar(255) DEFAULT NULL COMMENT '笔记作者',
+    `userInfo` varchar(255) DEFAULT NULL COMMENT '客户标识',
+    `content` text COMMENT '评论内容',
+    `likes` varchar(32) DEFAULT NULL COMMENT '笔记点赞数',
+    `collects` varchar(32) DEFAULT NULL COMMENT '笔记收藏数',
+    `comments` varchar(32) DEFAULT NULL COMMENT '笔记评论数',
+    `comment_likes` varchar(32) DEFAULT NULL COMMENT '评论点赞数',
+    `note_url` varchar(1024) DEFAULT NULL COMMENT '笔记URL',
+    `collect_time` datetime DEFAULT NULL COMMENT '首次收集时间',
+    `note_time` datetime DEFAULT NULL COMMENT '笔记创建时间',
+    `note_location` varchar(64) DEFAULT NULL COMMENT '笔记IP属地',
+    `note_type` varchar(32) DEFAULT NULL COMMENT '笔记类型',
+    `comment_location` varchar(64) DEFAULT NULL COMMENT '评论IP属地',
+    `comment_id` varchar(64) NOT NULL COMMENT '评论ID',
+    `comment_author` varchar(255) DEFAULT NULL COMMENT '评论者昵称',
+    `update_time` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT 'Update Time',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uk_note_comment` (`note_id`, `comment_id`),
+    KEY `idx_keyword` (`keyword`),
+    KEY `idx_userinfo_collect_time` (`userInfo`, `collect_time`),
+    KEY `idx_collect_time` (`collect_time`)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci;
+
+-- 已有的 monitor_comments 表升级（按顺序执行一次）：
+-- 1. 增加 note_id / comment_likes / update_time 列，并从 note_url 中回填 note_id
+-- ALTER TABLE monitor_comments
+--     ADD COLUMN note_id varchar(64) NOT NULL DEFAULT '' AFTER id,
+--     ADD COLUMN comment_likes varchar(32) DEFAULT NULL AFTER comments,
+--     ADD COLUMN update_time datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+-- UPDATE monitor_comments
+--     SET note_id = SUBSTRING_INDEX(SUBSTRING_INDEX(SUBSTRING_INDEX(note_url, '?', 1), '/', -1), '#', 1)
+--     WHERE note_id = '';
+-- 2. 删除重复行，每个 (note_id, comment_id) 只保留最早的一行
+-- DELETE t1 FROM monitor_comments t1
+--     JOIN monitor_comments t2
+--       ON t1.note_id = t2.note_id AND t1.comment_id = t2.comment_id AND t1.id > t2.id;
+-- 3. 建立唯一键与查询索引
+-- ALTER TABLE monitor_comments
+--     ADD UNIQUE KEY uk_note_comment (note_id, comment_id),
+--     ADD KEY idx_keyword (keyword),
+--     ADD KEY idx_userinfo_collect_time (userInfo, collect_time),
+--     ADD KEY idx_collect_time (collect_time);
+
 -- 插入示例数据
-INSERT INTO `xhs_cookies` (`val`, `is_survive`) VALUES
-('a1=18e0ca70c46l1h6c9q0q; webId=xxx; web_session=xxx', 1),
-('a1=28e0ca70c46l1h6c9q0q; webId=yyy; web_session=yyy', 1),
-('a1=38e0ca70c46l1h6c9q0q; webId=zzz; web_session=zzz', 0);
+INSERT INTO `xhs_cookies` (`val`, `val_hash`, `is_survive`) VALUES
+('a1=18e0ca70c46l1h6c9q0q; webId=xxx; web_session=xxx', SHA2('a1=18e0ca70c46l1h6c9q0q; webId=xxx; web_session=xxx', 256), 1),
+('a1=28e0ca70c46l1h6c9q0q; webId=yyy; web_session=yyy', SHA2('a1=28e0ca70c46l1h6c9q0q; webId=yyy; web_session=yyy', 256), 1),
+('a1=38e0ca70c46l1h6c9q0q; webId=zzz; web_session=zzz', SHA2('a1=38e0ca70c46l1h6c9q0q; webId=zzz; web_session=zzz', 256), 0);
 
 -- 常用查询语句
 
@@ -53,7 +127,7 @@ LIMIT 1;
 -- UPDATE xhs_cookies SET is_survive = 0 WHERE id = ?;
 
 -- 5. 添加新的cookie
--- INSERT INTO xhs_cookies (val, is_survive) VALUES (?, 1);
+-- INSERT INTO xhs_cookies (val, val_hash, is_survive) VALUES (?, SHA2(?, 256), 1);
 
 -- 6. 删除无效的cookies（可选，定期清理）
 -- DELETE FROM xhs_cookies WHERE is_survive = 0 AND create_time < DATE_SUB(NOW(), INTERVAL 30 DAY);
\ No newline at end of file
@@ -5,11 +5,398 @@
 从MySQL数据库获取小红书cookies
 """
 
+import atexit
+import hashlib
+import os
+import time
+import threading
 import pymysql
+from pymysql.constants import SERVER_STATUS
 import random
-import logging
-from typing import Optional, List, Dict
+from collections import deque
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
+from loguru import logger
+from xhs_utils.cookie_cache import CookieCache
+from xhs_utils.models import MonitorRecord
+from xhs_utils.time_util import epoch_ms_to_datetime
+
+# save_to_monitor_comments 每批写入的行数
+MONITOR_SAVE_BATCH_SIZE = int(os.getenv('DB_SAVE_BATCH_SIZE', '500'))
+
+# 以 (note_id, comment_id) 唯一键去重：已存在的评论只刷新计数等可变字段，保留首次收集时间。
+# 使用行别名引用新值（MySQL 8.0.19+），VALUES() 写法自 8.0.20 起已弃用
+INSERT_MONITOR_COMMENT_SQL = """
+INSERT INTO monitor_comments (
+    note_id, keyword, title, note_author, userInfo, content,
+    likes, collects, comments, comment_likes, note_url, collect_time,
+    note_time, note_location, note_type, comment_location,
+    comment_id, comment_author
+) VALUES (
+    %s, %s, %s, %s, %s, %s,
+    %s, %s, %s, %s, %s, %s,
+    %s, %s, %s, %s,
+    %s, %s
+) AS new
+ON DUPLICATE KEY UPDATE
+    title = new.title,
+    content = new.content,
+    likes = new.likes,
+    collects = new.collects,
+    comments = new.comments,
+    comment_likes = new.comment_likes,
+    comment_author = new.comment_author
+"""
+# 连接池配置：最少保留的空闲连接（创建时预先建立）、最大连接数、空闲多久后回收（秒）、
+# 连接池配置：最少保留的空闲连接、最大连接数、空闲多久后回收（秒）、
+# 空闲多久后在借出前先ping确认存活（秒，0表示每次借出都ping）、连接池满时的等待时间（秒）
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', '30'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# 内存cookie池的有效期（秒），过期后在后台重新加载
+DB_COOKIE_CACHE_TTL = float(os.getenv('DB_COOKIE_CACHE_TTL', '60'))
+# cookie使用次数等统计写回数据库的间隔（秒）
+DB_USAGE_FLUSH_INTERVAL = float(os.getenv('DB_USAGE_FLUSH_INTERVAL', '5'))
+
+# MySQL 未知列错误码，表结构未升级时出现
+ER_BAD_FIELD_ERROR = 1054
+
+# xhs_cookies 在原表之后新增的列与索引，migrate_cookie_schema 会补齐缺少的部分
+COOKIE_EXTRA_COLUMNS = {
+    'val_hash': "ADD COLUMN `val_hash` char(64) DEFAULT NULL COMMENT 'Cookie字符串的SHA-256'",
+    'last_used': "ADD COLUMN `last_used` datetime DEFAULT NULL COMMENT '最后使用时间'",
+    'use_count': "ADD COLUMN `use_count` int NOT NULL DEFAULT 0 COMMENT '使用次数'",
+    'fail_count': "ADD COLUMN `fail_count` int NOT NULL DEFAULT 0 COMMENT '失败次数'",
+}
+COOKIE_EXTRA_INDEXES = {
+    'idx_val_hash': "ADD INDEX `idx_val_hash` (`val_hash`)",
+    'idx_survive_last_used': "ADD INDEX `idx_survive_last_used` (`is_survive`, `last_used`)",
+}
+
+
+def note_id_from_url(note_url) -> str:
+    """从笔记URL中取note_id（去掉查询参数后路径的最后一段），与 database_schema.sql 中回填 note_id 的规则相同"""
+    if not note_url:
+        return ''
+    return note_url.split('?', 1)[0].split('#', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def cookie_hash(cookie_string: str) -> str:
+    """cookie字符串的SHA-256，与MySQL中 SHA2(val, 256) 的结果相同"""
+    return hashlib.sha256(cookie_string.encode('utf-8')).hexdigest()
+
+
+# 累计的使用次数直接加到已有值上；last_used 只前进不后退，本批没有使用时保持原值
+UPDATE_COOKIE_USAGE_SQL = """
+UPDATE xhs_cookies
+SET use_count = use_count + %s,
+    fail_count = fail_count + %s,
+    last_used = COALESCE(GREATEST(last_used, %s), %s, last_used)
+WHERE id = %s
+"""
+
+
+class PooledConnection:
+    """从连接池借出的连接，用法与pymysql连接相同，close()时归还连接池而不是断开"""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise pymysql.err.InterfaceError("连接已归还连接池")
+        return getattr(self._connection, name)
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # 调用方忘记close时也把连接还回去，避免连接池被耗尽
+        self.close()
+
+
+class ConnectionPool:
+    """线程安全的pymysql连接池
+
+    创建时预先建立min_size个连接；空闲连接后进先出，最近用过的连接最先被复用；
+    空闲超过max_idle的连接在保留min_size个之后关闭。
+    连接不开启autocommit，写入需要调用commit()；归还时回滚未提交的事务，
+    下一个使用者不会继承未提交的写入或旧的事务快照。
+    """
+
+    def __init__(self, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE, max_idle=DB_POOL_MAX_IDLE,
+                 ping_interval=DB_POOL_PING_INTERVAL, timeout=DB_POOL_TIMEOUT, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = deque()  # (connection, 归还时间)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._metrics = {
+            'created': 0, 'closed': 0, 'checkouts': 0, 'waits': 0, 'wait_time': 0.0,
+            'timeouts': 0, 'ping_failures': 0, 'recycled': 0,
+        }
+        self._prewarm()
+
+    def _prewarm(self):
+        """预先建立min_size个空闲连接；建立失败时不影响创建连接池，借出时再按需建立"""
+        for _ in range(min(self.min_size, self.max_size)):
+            try:
+                connection = self._connect()
+            except Exception as e:
+                logger.warning(f"预先建立数据库连接失败: {e}")
+                return
+            with self._cond:
+                self._size += 1
+                self._idle.append((connection, time.monotonic()))
+
+    def _connect(self):
+        connection = pymysql.connect(autocommit=False, **self.connect_kwargs)
+        with self._cond:
+            self._metrics['created'] += 1
+        return connection
+
+    def _discard(self, connection):
+        """关闭连接并让出名额，调用时需持有锁"""
+        self._size -= 1
+        self._metrics['closed'] += 1
+        self._cond.notify()
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _recycle_idle(self, now):
+        """关闭空闲过久的连接，至少保留min_size个，调用时需持有锁"""
+        while len(self._idle) > self.min_size and now - self._idle[0][1] > self.max_idle:
+            connection, _ = self._idle.popleft()
+            self._metrics['recycled'] += 1
+            self._discard(connection)
+
+    def acquire(self):
+        """借出一个连接，连接池满时最多等待timeout秒
+
+        Returns:
+            PooledConnection: 借出的连接
+
+        Raises:
+            TimeoutError: 等待超时
+            pymysql.err.MySQLError: 新建连接失败
+        """
+        deadline = wait_start = None
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._recycle_idle(now)
+                    if self._idle:
+                        connection, released_at = self._idle.pop()
+                        need_ping = now - released_at >= self.ping_interval
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection, need_ping = None, False
+                        break
+                    # 连接池已满，等待其他线程归还
+                    if deadline is None:
+                        deadline = now + self.timeout
+                        self._metrics['waits'] += 1
+                    if wait_start is None:
+                        wait_start = now
+                    if now >= deadline:
+                        self._metrics['timeouts'] += 1
+                        self._metrics['wait_time'] += now - wait_start
+                        raise TimeoutError(f"等待数据库连接超时（{self.timeout}秒）")
+                    self._cond.wait(deadline - now)
+                if wait_start is not None:
+                    self._metrics['wait_time'] += time.monotonic() - wait_start
+                    wait_start = None
+
+            if connection is None:
+                # 在锁外建立新连接，已经预先占用了名额
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                break
+            if not need_ping:
+                break
+            # 存活检查要等一次网络往返，在锁外进行，其他线程借还连接不受影响
+            try:
+                connection.ping(reconnect=False)
+                break
+            except Exception:
+                with self._cond:
+                    self._metrics['ping_failures'] += 1
+                    self._discard(connection)
+
+        with self._cond:
+            self._metrics['checkouts'] += 1
+        return PooledConnection(self, connection)
+
+    def release(self, connection):
+        """归还连接，先回滚未提交的事务；已断开或回滚失败的连接直接丢弃"""
+        if connection.open and getattr(connection, 'server_status', 0) & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                connection.rollback()
+            except Exception:
+                with self._cond:
+                    self._discard(connection)
+                return
+        with self._cond:
+            if not connection.open:
+                self._discard(connection)
+                return
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._metrics,
+                'wait_time': round(self._metrics['wait_time'], 3),
+            }
+
+    def close(self):
+        """关闭所有空闲连接，借出中的连接归还时照常处理"""
+        with self._cond:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._discard(connection)
+
+
+class CookieUsageWriter:
+    """cookie使用统计的异步批量写回
+
+    选择cookie时只在内存中累计使用次数、失败次数与最后使用时间，
+    后台线程每隔interval秒把累计值合并成一批UPDATE写回，请求路径上不访问数据库。
+    """
+
+    def __init__(self, manager, interval=DB_USAGE_FLUSH_INTERVAL):
+        self.manager = manager
+        self.interval = interval
+        self.enabled = True
+        self._pending = {}  # id -> [使用次数, 失败次数, 最后使用时间]
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._metrics = {'flushes': 0, 'rows_written': 0, 'flush_failures': 0}
+
+    def record(self, cookie_id, uses=0, failures=0, used_at=None):
+        """累计一次使用或失败"""
+        if not self.enabled:
+            return
+        with self._lock:
+            pending = self._pending.setdefault(cookie_id, [0, 0, None])
+            pending[0] += uses
+            pending[1] += failures
+            if used_at is not None and (pending[2] is None or used_at > pending[2]):
+                pending[2] = used_at
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cookie-usage-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """立即写回累计的统计，返回写回的行数"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        rows = [(uses, failures, used_at, used_at, cookie_id) for cookie_id, (uses, failures, used_at) in pending.items()]
+        try:
+            connection = self.manager.pool.acquire()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.executemany(UPDATE_COOKIE_USAGE_SQL, rows)
+                connection.commit()
+            finally:
+                connection.close()
+        except pymysql.err.OperationalError as e:
+            if e.args and e.args[0] == ER_BAD_FIELD_ERROR:
+                # 表结构还没有使用统计列，停止累计，避免内存无限增长
+                self.enabled = False
+                logger.warning("xhs_cookies 缺少使用统计列，请执行 DatabaseCookieManager.migrate_cookie_schema()，已停止写回")
+                return 0
+            self._restore(pending, e)
+            return 0
+        except Exception as e:
+            self._restore(pending, e)
+            return 0
+        with self._lock:
+            self._metrics['flushes'] += 1
+            self._metrics['rows_written'] += len(rows)
+        return len(rows)
+
+    def _restore(self, pending, error):
+        """写回失败时把统计放回去，下次一起写"""
+        logger.warning(f"写回cookie使用统计失败: {error}")
+        with self._lock:
+            self._metrics['flush_failures'] += 1
+            for cookie_id, (uses, failures, used_at) in pending.items():
+                current = self._pending.setdefault(cookie_id, [0, 0, None])
+                current[0] += uses
+                current[1] += failures
+                if used_at is not None and (current[2] is None or used_at > current[2]):
+                    current[2] = used_at
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'enabled': self.enabled, 'pending': len(self._pending), 'interval': self.interval, **self._metrics}
+
+
+_pools = {}
+_cookie_caches = {}
+_usage_writers = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host, port, database, user, password) -> ConnectionPool:
+    """按连接参数取共享的连接池，同一进程中相同配置的DatabaseCookieManager共用一个连接池"""
+    key = (host, port, database, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                host=host,
+                port=port,
+                user=user,
+                password=password,
+                database=database,
+                charset='utf8mb4',
+                cursorclass=pymysql.cursors.DictCursor
+            )
+            _pools[key] = pool
+        return pool
+
 
 class DatabaseCookieManager:
     def __init__(self, host: str = "gz-cdb-grqtft0j.sql.tencentcdb.com", 
@@ -34,22 +421,96 @@ class DatabaseCookieManager:
         self.password = password
         
         
+    @property
+    def pool(self) -> ConnectionPool:
+        """当前配置对应的共享连接池"""
+        return get_pool(self.host, self.port, self.database, self.user, self.password)
+
     def get_connection(self):
-        """获取数据库连接"""
+        """从连接池借出数据库连接，用完后调用close()归还"""
         try:
-            connection = pymysql.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
-            )
-            return connection
+            return self.pool.acquire()
         except Exception as e:
-            print.error(f"数据库连接失败: {e}")
+            logger.error(f"数据库连接失败: {e}")
             return None
+
+    def pool_stats(self) -> Dict:
+        """连接池指标"""
+        return self.pool.stats()
+
+    @property
+    def cookie_cache(self) -> CookieCache:
+        """当前配置对应的共享内存cookie池"""
+        key = (self.host, self.port, self.database, self.user)
+        with _pools_lock:
+            cache = _cookie_caches.get(key)
+            if cache is None:
+                cache = CookieCache(self._load_live_cookies, ttl=DB_COOKIE_CACHE_TTL)
+                _cookie_caches[key] = cache
+            return cache
+
+    @property
+    def usage_writer(self) -> CookieUsageWriter:
+        """当前配置对应的共享cookie使用统计写回器"""
+        key = (self.host, self.port, self.database, self.user)
+        with _pools_lock:
+            writer = _usage_writers.get(key)
+            if writer is None:
+                writer = CookieUsageWriter(self)
+                _usage_writers[key] = writer
+            return writer
+
+    def _load_live_cookies(self) -> List[Dict]:
+        """读取全部可用cookie的id、内容与最后使用时间，失败时抛出异常，供内存cookie池加载"""
+        connection = self.pool.acquire()
+        try:
+            with connection.cursor() as cursor:
+                try:
+                    cursor.execute("SELECT id, val as cookie_string, last_used FROM xhs_cookies WHERE is_survive = 1")
+                except pymysql.err.OperationalError as e:
+                    if not e.args or e.args[0] != ER_BAD_FIELD_ERROR:
+                        raise
+                    # 表结构未升级时没有last_used列
+                    cursor.execute("SELECT id, val as cookie_string FROM xhs_cookies WHERE is_survive = 1")
+                return cursor.fetchall()
+        finally:
+            connection.close()
+
+    def migrate_cookie_schema(self) -> List[str]:
+        """为xhs_cookies补齐val_hash/last_used/use_count/fail_count列及索引，并回填val_hash，可重复执行
+
+        Returns:
+            list: 本次新增的列与索引
+        """
+        connection = self.pool.acquire()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'xhs_cookies'",
+                    (self.database,)
+                )
+                columns = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+                cursor.execute(
+                    "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'xhs_cookies'",
+                    (self.database,)
+                )
+                indexes = {row['INDEX_NAME'] for row in cursor.fetchall()}
+                added = [name for name in COOKIE_EXTRA_COLUMNS if name not in columns]
+                clauses = [COOKIE_EXTRA_COLUMNS[name] for name in added]
+                for name, clause in COOKIE_EXTRA_INDEXES.items():
+                    if name not in indexes:
+                        clauses.append(clause)
+                        added.append(name)
+                if clauses:
+                    cursor.execute("ALTER TABLE xhs_cookies " + ", ".join(clauses))
+                    logger.info(f"xhs_cookies 表结构已升级: {added}")
+                # 升级前写入的cookie没有val_hash
+                cursor.execute("UPDATE xhs_cookies SET val_hash = SHA2(val, 256) WHERE val_hash IS NULL AND val IS NOT NULL")
+            connection.commit()
+            self.usage_writer.enabled = True
+            return added
+        finally:
+            connection.close()
     
     def get_all_cookies(self) -> List[Dict]:
         """获取所有可用的cookies"""
@@ -68,102 +529,119 @@ class DatabaseCookieManager:
                 """
                 cursor.execute(sql)
                 cookies = cursor.fetchall()
-                print(f"从数据库获取到 {len(cookies)} 个可用cookies")
+                logger.debug(f"从数据库获取到 {len(cookies)} 个可用cookies")
                 return cookies
         except Exception as e:
-            print.error(f"获取cookies失败: {e}")
+            logger.error(f"获取cookies失败: {e}")
             return []
         finally:
             connection.close()
     
-    def get_random_cookie(self) -> Optional[str]:
-        """随机获取一个可用的cookie"""
-        cookies = self.get_all_cookies()
-        if not cookies:
-            print("没有可用的cookies")
+    def get_cookie(self, least_used: bool = False) -> Optional[Tuple[int, str]]:
+        """从内存cookie池中选择一个可用cookie，不查询数据库
+
+        Args:
+            least_used (bool): True时取最久未使用的，否则随机选择
+
+        Returns:
+            tuple: (cookie_id, cookie_string)，没有可用cookie时返回None
+        """
+        cache = self.cookie_cache
+        selected = cache.least_used() if least_used else cache.choice()
+        if not selected:
+            logger.warning("没有可用的cookies")
             return None
-            
-        # 随机选择一个cookie
-        selected_cookie = random.choice(cookies)
-        cookie_string = selected_cookie['cookie_string']
-        
+
+        cookie_id, _ = selected
         # 更新最后使用时间
-        self.update_last_used(selected_cookie['id'])
-        
-        print(f"随机选择cookie ID: {selected_cookie['id']}")
-        return cookie_string
+        self.update_last_used(cookie_id)
+        logger.debug(f"{'选择最久未使用的' if least_used else '随机选择'}cookie ID: {cookie_id}")
+        return selected
+
+    def get_random_cookie(self) -> Optional[str]:
+        """随机获取一个可用的cookie字符串"""
+        selected = self.get_cookie()
+        return selected[1] if selected else None
     
     def get_least_used_cookie(self) -> Optional[str]:
-        """获取最少使用的cookie"""
-        cookies = self.get_all_cookies()
-        if not cookies:
-            print("没有可用的cookies")
-            return None
-            
-        # 选择最少使用的cookie（按last_used排序，第一个就是最少使用的）
-        selected_cookie = cookies[0]
-        cookie_string = selected_cookie['cookie_string']
-        
-        # 更新最后使用时间
-        self.update_last_used(selected_cookie['id'])
-        
-        print(f"选择最少使用的cookie ID: {selected_cookie['id']}")
-        return cookie_string
+        """获取最久未使用的cookie字符串"""
+        selected = self.get_cookie(least_used=True)
+        return selected[1] if selected else None
     
     def update_last_used(self, cookie_id: int) -> bool:
-        """更新cookie的最后使用时间"""
-        connection = self.get_connection()
-        if not connection:
-            return False
-            
-        try:
-            with connection.cursor() as cursor:
-                # 注意：原表结构没有last_used字段，这里只记录日志
-                # 如果需要记录使用时间，需要在表中添加相应字段
-                pass
-                connection.commit()
-                return True
-        except Exception as e:
-            print.error(f"更新cookie使用时间失败: {e}")
-            return False
-        finally:
-            connection.close()
+        """记录cookie被使用一次，由后台线程批量写回last_used与use_count"""
+        self.usage_writer.record(cookie_id, uses=1, used_at=datetime.now())
+        return True
+
+    def record_cookie_failure(self, cookie_id: int) -> None:
+        """记录cookie请求失败一次，由后台线程批量写回fail_count"""
+        self.usage_writer.record(cookie_id, failures=1)
     
-    def mark_cookie_status(self,status:int, cookie_string: str) -> bool:
-        """根据cookie字符串标记cookie为无效
+    def mark_cookie_status_by_id(self, cookie_id: int, status: int) -> bool:
+        """按id标记cookie状态，主键上的单行更新
+
+        Args:
+            cookie_id (int): cookie的id，来自 get_cookie
+            status (int): 0表示无效，1表示有效
+        Returns:
+            bool: 标记成功返回True，失败返回False
+        """
+        # 失效的先从内存cookie池移除，立即不再被选中；恢复的在提交后重新加载
+        if status == 0:
+            self.record_cookie_failure(cookie_id)
+            self.cookie_cache.remove(cookie_id)
+        return self._update_cookie_status(status, "id = %s", (cookie_id,))
+
+    def mark_cookie_status(self, status: int, cookie_string: str) -> bool:
+        """根据cookie字符串标记cookie状态
+
+        内存cookie池中有该cookie时按id更新；否则按val_hash索引查找，
+        再比较val排除哈希冲突，不再对TEXT列全表扫描。
         Args:
             status (int): 0表示无效，1表示有效
             cookie_string (str): 需要标记的cookie字符串
         Returns:
             bool: 标记成功返回True，失败返回False
         """
+        cookie_ids = self.cookie_cache.ids_of(cookie_string)
+        if cookie_ids:
+            results = [self.mark_cookie_status_by_id(cookie_id, status) for cookie_id in cookie_ids]
+            return any(results)
+
+        return self._update_cookie_status(status, "val_hash = %s AND val = %s",
+                                          (cookie_hash(cookie_string), cookie_string),
+                                          fallback=("val = %s", (cookie_string,)))
+
+    def _update_cookie_status(self, status: int, where: str, params: tuple, fallback=None) -> bool:
+        """执行 UPDATE xhs_cookies SET is_survive，表结构未升级（没有val_hash列）时使用fallback条件
+
+        恢复为有效时在提交之后才让内存cookie池重新加载，加载读不到提交前的is_survive = 0。
+        """
         connection = self.get_connection()
         if not connection:
             return False
             
         try:
             with connection.cursor() as cursor:
-                sql = """
-                UPDATE xhs_cookies 
-                SET is_survive = %s 
-                WHERE val = %s
-                """
-                cursor.execute(sql, (status,cookie_string,))
+                try:
+                    cursor.execute(f"UPDATE xhs_cookies SET is_survive = %s WHERE {where}", (status, *params))
+                except pymysql.err.OperationalError as e:
+                    if fallback is None or not e.args or e.args[0] != ER_BAD_FIELD_ERROR:
+                        raise
+                    where, params = fallback
+                    cursor.execute(f"UPDATE xhs_cookies SET is_survive = %s WHERE {where}", (status, *params))
                 affected_rows = cursor.rowcount
                 connection.commit()
+                if status != 0:
+                    self.cookie_cache.invalidate()
                 
                 if affected_rows > 0:
-                    if status == 0:
-                        print(f"成功标记cookie为无效，影响行数: {affected_rows}")
-                        return True
-                    if status == 1:
-                        print(f"成功标记cookie为有效，影响行数: {affected_rows}")
-                        return True
-                else:
-                    print("未找到匹配的cookie")
-                    return False
+                    logger.info(f"成功标记cookie为{'有效' if status == 1 else '无效'}，影响行数: {affected_rows}")
+                    return True
+                logger.warning("未找到匹配的cookie")
+                return False
         except Exception as e:
-            print.error(f"根据cookie字符串标记无效失败: {e}")
+            logger.error(f"标记cookie状态失败: {e}")
             return False
         finally:
             connection.close()
@@ -176,17 +654,23 @@ class DatabaseCookieManager:
             
         try:
             with connection.cursor() as cursor:
-                sql = """
-                INSERT INTO xhs_cookies (val, is_survive) 
-                VALUES (%s, %s)
-                """
                 survive_status = 1 if status == 'active' else 0
-                cursor.execute(sql, (cookie_string, survive_status))
+                try:
+                    cursor.execute(
+                        "INSERT INTO xhs_cookies (val, val_hash, is_survive) VALUES (%s, %s, %s)",
+                        (cookie_string, cookie_hash(cookie_string), survive_status)
+                    )
+                except pymysql.err.OperationalError as e:
+                    if not e.args or e.args[0] != ER_BAD_FIELD_ERROR:
+                        raise
+                    # 表结构未升级时没有val_hash列
+                    cursor.execute("INSERT INTO xhs_cookies (val, is_survive) VALUES (%s, %s)", (cookie_string, survive_status))
                 connection.commit()
-                print("成功添加新cookie到数据库")
+                self.cookie_cache.invalidate()
+                logger.info("成功添加新cookie到数据库")
                 return True
         except Exception as e:
-            print.error(f"添加cookie失败: {e}")
+            logger.error(f"添加cookie失败: {e}")
             return False
         finally:
             connection.close()
@@ -204,116 +688,163 @@ class DatabaseCookieManager:
                 result = cursor.fetchone()
                 return result['count'] if result else 0
         except Exception as e:
-            print.error(f"获取cookie数量失败: {e}")
+            logger.error(f"获取cookie数量失败: {e}")
             return 0
         finally:
             connection.close()
     
-    def save_to_monitor_comments(self, merged_data):
-            """将合并后的数据保存到monitor_comments数据库表中
-            Args:
-                merged_data (list): merge_note_info_with_comments函数返回的合并数据
+    def save_to_monitor_comments(self, merged_data, batch_size: int = None) -> bool:
+        """将合并后的数据保存到monitor_comments数据库表中
+        Args:
+            merged_data (list): merge_note_info_with_comments函数返回的合并数据
+            batch_size (int): 每批写入的行数，默认DB_SAVE_BATCH_SIZE
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        return self.save_monitor_comments_batched(merged_data, batch_size)['success']
 
-                
-            Returns:
-                bool: 保存是否成功
-            """
+    def save_monitor_comments_batched(self, merged_data, batch_size: int = None) -> Dict:
+        """分批写入monitor_comments表，每批一次executemany（pymysql会合并为一条多行INSERT）并单独提交
+
+        Args:
+            merged_data (list): merge_note_info_with_comments函数返回的合并数据
+            batch_size (int): 每批写入的行数，默认DB_SAVE_BATCH_SIZE
+
+        Returns:
+            dict: success、总行数、成功/失败行数与每批的统计（行数、影响行数、耗时、错误）；
+                  影响行数中新插入的行计1，刷新了计数的已有行计2，没有变化的已有行计0。
+                  既没有note_id也无法从note_url中取得的行不写入，计为失败（rejected）
+        """
+        batch_size = batch_size or MONITOR_SAVE_BATCH_SIZE
+        stats = {'success': True, 'rows': len(merged_data), 'saved': 0, 'failed': 0, 'batches': []}
+        if not merged_data:
+            return stats
+
+        connection = self.get_connection()
+        if not connection:
+            stats.update(success=False, failed=len(merged_data))
+            return stats
+
+        # 同一批数据的时间大多相同，解析结果按原值缓存，避免逐行strptime
+        now = datetime.now()
+        time_cache = {}
+        rows = []
+        for item in merged_data:
+            row = self._monitor_comment_row(item, time_cache, now)
+            if row[0]:
+                rows.append(row)
+        rejected = len(merged_data) - len(rows)
+        if rejected:
+            # 空note_id会让不同笔记的评论在唯一键 ('', comment_id) 上互相覆盖
+            logger.warning(f"{rejected}条数据缺少note_id且无法从note_url中取得，不写入数据库")
+            stats.update(success=False, failed=rejected, rejected=rejected)
+        try:
+            with connection.cursor() as cursor:
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    began = time.perf_counter()
+                    batch_stats = {'batch': start // batch_size, 'rows': len(batch)}
+                    try:
+                        batch_stats['affected'] = cursor.executemany(INSERT_MONITOR_COMMENT_SQL, batch)
+                        connection.commit()
+                        stats['saved'] += len(batch)
+                    except Exception as e:
+                        connection.rollback()
+                        batch_stats['error'] = str(e)
+                        stats['failed'] += len(batch)
+                        stats['success'] = False
+                        logger.error(f"保存第{batch_stats['batch']}批数据到数据库时出错: {e}")
+                    batch_stats['elapsed_ms'] = round((time.perf_counter() - began) * 1000, 2)
+                    stats['batches'].append(batch_stats)
+        finally:
+            connection.close()
+
+        logger.info(f"成功保存 {stats['saved']}/{stats['rows']} 条数据到 monitor_comments 表，共{len(stats['batches'])}批")
+        return stats
+
+    @staticmethod
+    def _to_datetime(value, cache: Dict, default: datetime) -> datetime:
+        """把datetime、时间戳（秒或毫秒）或"%Y-%m-%d %H:%M:%S"字符串转换为datetime，无法解析时返回default"""
+        if isinstance(value, datetime):
+            return value
+        try:
+            return cache[value]
+        except KeyError:
+            pass
+        except TypeError:
+            return default
+        if isinstance(value, (int, float)) and value > 0:
+            parsed = datetime.fromtimestamp(value / 1000 if value > 1e11 else value)
+        else:
             try:
-                connection = self.get_connection()
-                with connection.cursor() as cursor:
-                    # 准备插入SQL语句
-                    insert_sql = """
-                    INSERT INTO monitor_comments (
-                        keyword, title, note_author, userInfo, content, 
-                        likes, collects, comments, note_url, collect_time, 
-                        note_time, note_location, note_type, comment_location, 
-                        comment_id, comment_author
-                    ) VALUES (
-                        %(keyword)s, %(title)s, %(note_author)s, %(userInfo)s, %(content)s,
-                        %(likes)s, %(collects)s, %(comments)s, %(note_url)s, %(collect_time)s,
-                        %(note_time)s, %(note_location)s, %(note_type)s, %(comment_location)s,
-                        %(comment_id)s, %(comment_author)s
-                    )
-                    """
-                    
-                    # 批量插入数据
-                    for item in merged_data:
-                        # 处理时间格式
-                        collect_time = item.get('collect_time')
-                        note_time = item.get('note_time')
-                        
-                        # 如果时间是字符串格式，转换为datetime对象
-                        if isinstance(collect_time, str):
-                            try:
-                                collect_time = datetime.strptime(collect_time, "%Y-%m-%d %H:%M:%S")
-                            except:
-                                collect_time = datetime.now()
-                        
-                        if isinstance(note_time, str):
-                            try:
-                                note_time = datetime.strptime(note_time, "%Y-%m-%d %H:%M:%S")
-                            except:
-                                note_time = datetime.now()
-                        
-                        # 准备插入数据
-                        data = {
-                            'keyword': item.get('keyword', ''),
-                            'title': item.get('title', ''),
-                            'note_author': item.get('note_author', ''),
-                            'userInfo': item.get('userInfo', ''),
-                            'content': item.get('content', ''),
-                            'likes': item.get('likes', 0),
-                            'collects': item.get('collects', 0),
-                            'comments': item.get('comments', 0),
-                            'note_url': item.get('note_url', ''),
-                            'collect_time': collect_time,
-                            'note_time': note_time,
-                            'note_location': item.get('note_location', ''),
-                            'note_type': item.get('note_type', ''),
-                            'comment_location': item.get('comment_location', ''),
-                            'comment_id': item.get('comment_id', ''),
-                            'comment_author': item.get('commenter_nickname', '')
-                        }
-                        
-                        cursor.execute(insert_sql, data)
-                    
-                    # 提交事务
-                    connection.commit()
-                    print(f"成功保存 {len(merged_data)} 条数据到 monitor_comments 表")
-                    return True
-                    
-            except Exception as e:
-                print(f"保存数据到数据库时出错: {e}")
-                if 'connection' in locals():
-                    connection.rollback()
-                return False
-                
-            finally:
-                if 'connection' in locals():
-                    connection.close()
+                parsed = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+            except (TypeError, ValueError):
+                parsed = default
+        cache[value] = parsed
+        return parsed
+
+    def _monitor_comment_row(self, item, time_cache: Dict, now: datetime) -> tuple:
+        """把一条合并数据（MonitorRecord或同样键的字典）转换为INSERT_MONITOR_COMMENT_SQL的参数
+
+        没有note_id时从note_url中取，仍然取不到时第一个参数为空字符串
+        """
+        if isinstance(item, MonitorRecord):
+            values = item.db_values()
+            return (
+                values[0] or note_id_from_url(values[10]),
+                *values[1:11],
+                epoch_ms_to_datetime(values[11]) or now,
+                # 笔记时间暂未解析（空字符串）时直接使用当前时间，不做字符串解析
+                self._to_datetime(values[12], time_cache, now) if values[12] else now,
+                *values[13:],
+            )
+        return (
+            item.get('note_id') or note_id_from_url(item.get('note_url')),
+            item.get('keyword', ''),
+            item.get('title', ''),
+            item.get('note_author', ''),
+            item.get('userInfo', ''),
+            item.get('content', ''),
+            item.get('likes', 0),
+            item.get('collects', 0),
+            item.get('comments', 0),
+            item.get('comment_likes', 0),
+            item.get('note_url', ''),
+            self._to_datetime(item.get('collect_time'), time_cache, now),
+            self._to_datetime(item.get('note_time'), time_cache, now),
+            item.get('note_location', ''),
+            item.get('note_type', ''),
+            item.get('comment_location', ''),
+            item.get('comment_id', ''),
+            item.get('commenter_nickname', ''),
+        )
 
     def test_connection(self) -> bool:
         """测试数据库连接"""
         connection = self.get_connection()
         if connection:
             connection.close()
-            print("数据库连接测试成功")
+            logger.info("数据库连接测试成功")
             return True
         else:
-            print.error("数据库连接测试失败")
+            logger.error("数据库连接测试失败")
             return False
 
-# 创建数据库表的SQL语句（仅供参考）
+# xhs_cookies 表结构（与 database_schema.sql 一致）
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS xhs_cookies (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    cookie_string TEXT NOT NULL,
-    status ENUM('active', 'invalid', 'expired') DEFAULT 'active',
-    last_used DATETIME NULL,
-    created_at DATETIME NOT NULL,
-    updated_at DATETIME NOT NULL,
-    INDEX idx_status (status),
-    INDEX idx_last_used (last_used)
+    id int NOT NULL AUTO_INCREMENT,
+    create_time datetime DEFAULT CURRENT_TIMESTAMP,
+    is_survive int DEFAULT NULL,
+    val text,
+    val_hash char(64) DEFAULT NULL,
+    last_used datetime DEFAULT NULL,
+    use_count int NOT NULL DEFAULT 0,
+    fail_count int NOT NULL DEFAULT 0,
+    PRIMARY KEY (id),
+    INDEX idx_val_hash (val_hash),
+    INDEX idx_survive_last_used (is_survive, last_used)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 """
 
@@ -1,24 +1,193 @@
-from fastapi import FastAPI, HTTPException, Query, Body
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Body, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
 import uvicorn
 import os
 from dotenv import load_dotenv
+from loguru import logger
 from xhs_api_class import XhsAPI
+from xhs_async_api import AsyncXhsAPI
+from monitor_scheduler import MonitorScheduler
+from xhs_utils.crawl_progress import CrawlProgress
+from xhs_utils.models import serialize
+from xhs_utils import json_codec
 from db_manager import DatabaseCookieManager
+from xhs_utils.log_util import setup_logging
+from xhs_utils.xhs_util import get_sign_stats
 
 # 加载环境变量
 load_dotenv()
+setup_logging()
+
+# 阻塞调用（XhsAPI、数据库）统一放到有界线程池中执行，避免阻塞事件循环
+API_WORKER_THREADS = int(os.getenv('API_WORKER_THREADS', '16'))
+# 每个路由同时执行与排队的请求上限，超过时直接返回503
+API_ROUTE_QUEUE_LIMIT = int(os.getenv('API_ROUTE_QUEUE_LIMIT', '8'))
+# 单个请求的超时时间（秒），超时返回504
+API_REQUEST_TIMEOUT = float(os.getenv('API_REQUEST_TIMEOUT', '600'))
+# 事件循环延迟的采样间隔（秒）
+LOOP_LAG_INTERVAL = 0.5
+
+executor = ThreadPoolExecutor(max_workers=API_WORKER_THREADS, thread_name_prefix='xhs-api')
+route_pending = {}
+loop_lag = {'last_ms': 0.0, 'max_ms': 0.0, 'avg_ms': 0.0}
+
+async def monitor_loop_lag():
+    """周期性测量事件循环的调度延迟"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag_ms = max(0.0, (loop.time() - start - LOOP_LAG_INTERVAL) * 1000)
+        loop_lag['last_ms'] = round(lag_ms, 2)
+        loop_lag['max_ms'] = round(max(loop_lag['max_ms'], lag_ms), 2)
+        loop_lag['avg_ms'] = round(loop_lag['avg_ms'] * 0.9 + lag_ms * 0.1, 2)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lag_task = asyncio.create_task(monitor_loop_lag())
+    monitor_scheduler.start()
+    yield
+    lag_task.cancel()
+    await asyncio.to_thread(monitor_scheduler.stop)
+    # 关闭连接池前写回累计的cookie使用统计
+    await asyncio.to_thread(db_manager.usage_writer.flush)
+    db_manager.pool.close()
+    await async_xhs_api.close()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_blocking(route: str, func, *args, **kwargs):
+    """在线程池中执行阻塞函数
+    
+    Args:
+        route: 路由名称，用于按路由限制排队数量
+        func: 阻塞函数
+        
+    Returns:
+        func的返回值
+    """
+    if route_pending.get(route, 0) >= API_ROUTE_QUEUE_LIMIT:
+        raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+    route_pending[route] = route_pending.get(route, 0) + 1
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, partial(func, *args, **kwargs))
+    # 超时后线程仍会继续执行到结束，因此在线程真正结束时才释放路由名额
+    future.add_done_callback(lambda f: route_pending.__setitem__(route, route_pending[route] - 1))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=API_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"{route} 处理超过{API_REQUEST_TIMEOUT}秒，返回504")
+        raise HTTPException(status_code=504, detail="请求处理超时")
+
+# 流式接口检查客户端是否断开的最小间隔（秒）；断开后写入失败也会结束响应
+STREAM_DISCONNECT_CHECK_INTERVAL = 1.0
+
+STREAM_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+def encode_record(fmt: str, event: str, data: dict) -> str:
+    """把一条记录编码为NDJSON行或SSE事件"""
+    if fmt == 'sse':
+        return f"event: {event}\ndata: {json_codec.dumps(data)}\n\n"
+    return json_codec.dumps({"type": event, "data": data}) + "\n"
+
+class RouteSlotStreamingResponse(StreamingResponse):
+    """流式响应，响应结束时（包括响应体从未开始输出的情况）执行finish"""
+
+    def __init__(self, content, finish, **kwargs):
+        super().__init__(content, **kwargs)
+        self.finish = finish
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.finish()
+
+def stream_comments(request: Request, route: str, fmt: str, comments, summary):
+    """把评论异步生成器包装为流式响应
+
+    每解析出一条评论就发送一条记录，最后发送一条summary记录。
+    StreamingResponse 在上一条写入完成后才会向生成器要下一条，客户端读得慢时爬取也随之放慢；
+    客户端断开后关闭生成器，停止继续翻页。
+    路由名额在检查排队上限时立即占用，与run_blocking一致；输出结束时释放，
+    响应体从未开始输出（如客户端在响应开始前断开）时在响应结束时释放。
+
+    Args:
+        request: 当前请求，用于检测客户端断开
+        route: 路由名称，与run_blocking共用排队上限
+        fmt: ndjson 或 sse
+        comments: 产出评论的异步生成器
+        summary: 无参函数，返回summary记录的内容
+    """
+    if route_pending.get(route, 0) >= API_ROUTE_QUEUE_LIMIT:
+        raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+    route_pending[route] = route_pending.get(route, 0) + 1
+    finished = False
+
+    async def finish():
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        route_pending[route] -= 1
+        await comments.aclose()
+
+    async def records():
+        loop = asyncio.get_running_loop()
+        next_check = loop.time() + STREAM_DISCONNECT_CHECK_INTERVAL
+        error = None
+        try:
+            async for comment in comments:
+                # 按时间间隔检查断开，不在每条评论上都等待一次
+                if loop.time() >= next_check:
+                    if await request.is_disconnected():
+                        return
+                    next_check = loop.time() + STREAM_DISCONNECT_CHECK_INTERVAL
+                yield encode_record(fmt, 'comment', serialize(comment))
+        except Exception as e:
+            logger.exception(f"{route} 流式输出中断")
+            error = str(e)
+        finally:
+            await finish()
+        record = summary()
+        if error:
+            record['error'] = error
+        yield encode_record(fmt, 'summary', record)
+
+    try:
+        return RouteSlotStreamingResponse(
+            records(),
+            finish,
+            media_type=STREAM_MEDIA_TYPES[fmt],
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except Exception:
+        route_pending[route] -= 1
+        raise
 
 # 创建FastAPI应用实例
 app = FastAPI(
     title="小红书API服务",
     description="基于FastAPI封装的小红书数据获取API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # 安装了orjson时用orjson序列化响应
+    default_response_class=ORJSONResponse if json_codec.orjson is not None else JSONResponse
 )
 
 # 创建XhsAPI实例
 xhs_api = XhsAPI()
+# 流式接口使用的异步实例，会话在首次请求时于事件循环中创建
+async_xhs_api = AsyncXhsAPI()
 
 # 初始化数据库管理器
 db_user = os.getenv('DB_USER')
@@ -30,10 +199,17 @@ db_manager = DatabaseCookieManager(
 
 def get_cookies_str() -> str:
     """获取随机cookies字符串"""
-    cookies_str = db_manager.get_random_cookie()
-    if not cookies_str:
+    selected = db_manager.get_cookie()
+    if not selected:
         raise HTTPException(status_code=500, detail="无法获取有效的cookies")
-    return cookies_str
+    return selected[1]
+
+# 多笔记定时监控，新评论直接写入monitor_comments表
+monitor_scheduler = MonitorScheduler(
+    xhs_api,
+    cookie_provider=lambda: get_cookies_str(),
+    on_result=lambda note, merged: db_manager.save_to_monitor_comments(merged)
+)
 
 # 请求模型定义
 class CommentRequest(BaseModel):
@@ -44,6 +220,11 @@ class SearchRequest(BaseModel):
     keyword: str
     num: int = 10
 
+class CommentStreamRequest(BaseModel):
+    note_url: str
+    cursor: Optional[str] = ""
+    max_comments: Optional[int] = None
+
 class NoteInfoRequest(BaseModel):
     note_url: str
 
@@ -53,6 +234,15 @@ class MonitorRequest(BaseModel):
     keyword: str
     interval: Optional[int] = 60
 
+class WatchRequest(BaseModel):
+    note_url: str
+    user_info: str
+    keyword: str
+    interval: Optional[int] = None
+
+class CookieStatusRequest(BaseModel):
+    is_survive: int = Field(..., ge=0, le=1)
+
 class ReplyRequest(BaseModel):
     note_url: str
     comment_id: str
@@ -67,10 +257,14 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/comments - 获取笔记评论",
+            "/get_comments/stream - 流式获取笔记评论（NDJSON/SSE）",
+            "/search_comments_by_keyword/stream - 流式搜索评论（NDJSON/SSE）",
             "/search - 搜索笔记",
             "/note-info - 获取笔记信息",
             "/monitor - 监控笔记评论",
-            "/reply - 回复评论"
+            "/monitor/watch - 定时监控笔记（添加/取消/列表）",
+            "/reply - 回复评论",
+            "/cookies/{cookie_id}/status - 按id标记cookie有效/无效"
         ]
     }
 
@@ -85,22 +279,27 @@ async def get_comments(request: CommentRequest):
         评论列表
     """
     try:
-        cookies_str = get_cookies_str()
-        comments_list = []
-        result = xhs_api.get_comments(
-            cookies_str=cookies_str,
-            ori_url=request.note_url,
-            cursor=request.cursor,
-            comments_list=comments_list
-        )
+        result = await run_blocking("get_comments", fetch_comments, request.note_url, request.cursor)
         return {
             "success": True,
-            "data": result,
+            "data": serialize(result),
             "count": len(result) if result else 0
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("获取评论失败")
         raise HTTPException(status_code=500, detail=f"获取评论失败: {str(e)}")
 
+def fetch_comments(note_url: str, cursor: str):
+    cookies_str = get_cookies_str()
+    return xhs_api.get_comments(
+        cookies_str=cookies_str,
+        ori_url=note_url,
+        cursor=cursor,
+        comments_list=[]
+    )
+
 @app.post("/search_comments_by_keyword")
 async def search_comments_by_keyword(request: SearchRequest):
     """根据关键词搜索笔记下的评论
@@ -112,23 +311,78 @@ async def search_comments_by_keyword(request: SearchRequest):
         评论列表
     """
     try:
-        cookies_str = get_cookies_str()
-        # 清空之前的搜索结果
-        xhs_api.comments_list = []
-        xhs_api.comments_list = xhs_api.search_comments_by_keyword(
-            cookies_str=cookies_str,
-            keyword=request.keyword,
-            num=request.num,
-            comments_list=xhs_api.comments_list
-        )
+        comments_list = await run_blocking("search_comments_by_keyword", search_comments, request.keyword, request.num)
         return {
             "success": True,
-            "data": xhs_api.comments_list if xhs_api.comments_list else [],
-            "count": len(xhs_api.comments_list) if xhs_api.comments_list else 0
+            "data": serialize(comments_list) if comments_list else [],
+            "count": len(comments_list) if comments_list else 0
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("搜索失败")
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
+def search_comments(keyword: str, num: int):
+    cookies_str = get_cookies_str()
+    # 每个请求使用独立的结果列表，避免并发请求互相覆盖
+    return xhs_api.search_comments_by_keyword(
+        cookies_str=cookies_str,
+        keyword=keyword,
+        num=num,
+        comments_list=[]
+    )
+
+@app.post("/get_comments/stream")
+async def get_comments_stream(
+    request: Request,
+    body: CommentStreamRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """流式获取小红书笔记评论
+    
+    Args:
+        body: 包含note_url, cursor, max_comments的请求体
+        format: ndjson 或 sse
+        
+    Returns:
+        逐条评论，最后是包含count与cursor的summary记录
+    """
+    cookies_str = await run_blocking("get_comments_stream", get_cookies_str)
+    progress = CrawlProgress(cursor=body.cursor or '')
+    comments = async_xhs_api.aiter_comments(
+        cookies_str, body.note_url, max_comments=body.max_comments, progress=progress
+    )
+    return stream_comments(request, "get_comments_stream", format, comments, progress.to_dict)
+
+@app.post("/search_comments_by_keyword/stream")
+async def search_comments_by_keyword_stream(
+    request: Request,
+    body: SearchRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """流式搜索关键词笔记下的评论
+    
+    Args:
+        body: 包含keyword, num的请求体
+        format: ndjson 或 sse
+        
+    Returns:
+        逐条评论，最后是包含count与各笔记进度的summary记录
+    """
+    cookies_str = await run_blocking("search_comments_stream", get_cookies_str)
+    progresses = []
+    comments = async_xhs_api.aiter_search_comments(cookies_str, body.keyword, body.num, progresses)
+
+    def summary():
+        return {
+            "count": sum(p.count for p in progresses),
+            "cursor": progresses[-1].cursor if progresses else "",
+            "notes": [p.to_dict() for p in progresses]
+        }
+
+    return stream_comments(request, "search_comments_stream", format, comments, summary)
+
 @app.post("/search_notes")
 async def search_notes(request: SearchRequest):
     """根据关键词搜索笔记
@@ -140,22 +394,29 @@ async def search_notes(request: SearchRequest):
         搜索结果
     """
     try:
-        cookies_str = get_cookies_str()
-        # 清空之前的搜索结果
-        xhs_api.note_list = []
-        xhs_api.search_notes_by_keyword(
-            cookies_str=cookies_str,
-            keyword=request.keyword,
-            num=request.num
-        )
+        note_list = await run_blocking("search_notes", search_note_list, request.keyword, request.num)
         return {
             "success": True,
-            "data": xhs_api.note_list,
-            "count": len(xhs_api.note_list)
+            "data": note_list,
+            "count": len(note_list)
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("搜索失败")
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
+def search_note_list(keyword: str, num: int):
+    cookies_str = get_cookies_str()
+    # search_notes_by_keyword 把结果写在实例的note_list上，每个请求使用独立实例，共用连接池
+    api = XhsAPI(session=xhs_api.session)
+    api.search_notes_by_keyword(
+        cookies_str=cookies_str,
+        keyword=keyword,
+        num=num
+    )
+    return api.note_list
+
 @app.post("/get_note_info")
 async def get_note_info(request: NoteInfoRequest):
     """获取笔记详细信息
@@ -167,21 +428,27 @@ async def get_note_info(request: NoteInfoRequest):
         笔记信息
     """
     try:
-        cookies_str = get_cookies_str()
-        result = xhs_api.get_note_info(
-            cookies_str=cookies_str,
-            url=request.note_url
-        )
+        result = await run_blocking("get_note_info", fetch_note_info, request.note_url)
         if result:
             return {
                 "success": True,
-                "data": result
+                "data": serialize(result)
             }
         else:
             raise HTTPException(status_code=404, detail="笔记信息获取失败")
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("获取笔记信息失败")
         raise HTTPException(status_code=500, detail=f"获取笔记信息失败: {str(e)}")
 
+def fetch_note_info(note_url: str):
+    cookies_str = get_cookies_str()
+    return xhs_api.get_note_info(
+        cookies_str=cookies_str,
+        url=note_url
+    )
+
 @app.post("/monitor")
 async def monitor_comments(request: MonitorRequest):
     """监控笔记评论变化
@@ -193,18 +460,18 @@ async def monitor_comments(request: MonitorRequest):
         监控结果
     """
     try:
-        cookies_str = get_cookies_str()
-        result = xhs_api.monitor_comments(
-            cookies_str=cookies_str,
-            note_url=request.note_url,
-            userInfo=request.user_info,
-            keyword=request.keyword,
-            interval=request.interval
+        result = await run_blocking(
+            "monitor",
+            run_monitor,
+            request.note_url,
+            request.user_info,
+            request.keyword,
+            request.interval
         )
         if result:
             return {
                 "success": True,
-                "data": result,
+                "data": serialize(result),
                 "count": len(result)
             }
         else:
@@ -212,9 +479,62 @@ async def monitor_comments(request: MonitorRequest):
                 "success": False,
                 "message": "没有获取到评论数据"
             }
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("监控失败")
         raise HTTPException(status_code=500, detail=f"监控失败: {str(e)}")
 
+def run_monitor(note_url: str, user_info: str, keyword: str, interval: int):
+    cookies_str = get_cookies_str()
+    return xhs_api.monitor_comments(
+        cookies_str=cookies_str,
+        note_url=note_url,
+        userInfo=user_info,
+        keyword=keyword,
+        interval=interval
+    )
+
+@app.post("/monitor/watch")
+async def add_watch(request: WatchRequest):
+    """添加定时监控的笔记，立即检查一次，之后按自适应间隔检查
+    
+    Args:
+        request: 包含note_url, user_info, keyword, interval（初始间隔，秒）的请求体
+        
+    Returns:
+        笔记的调度状态
+    """
+    try:
+        note = monitor_scheduler.add(request.note_url, request.user_info, request.keyword, request.interval)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"添加监控失败: {str(e)}")
+    return {
+        "success": True,
+        "data": note.to_dict()
+    }
+
+@app.delete("/monitor/watch/{note_id}")
+async def remove_watch(note_id: str):
+    """取消监控笔记"""
+    if not monitor_scheduler.remove(note_id):
+        raise HTTPException(status_code=404, detail="该笔记不在监控列表中")
+    return {
+        "success": True,
+        "message": "已取消监控"
+    }
+
+@app.get("/monitor/watch")
+async def list_watches():
+    """列出所有定时监控的笔记，按下次检查时间排序"""
+    notes = monitor_scheduler.list()
+    return {
+        "success": True,
+        "data": notes,
+        "count": len(notes),
+        "stats": monitor_scheduler.stats()
+    }
+
 @app.post("/reply_comment")
 async def reply_comment(request: ReplyRequest):
     """回复评论
@@ -226,24 +546,51 @@ async def reply_comment(request: ReplyRequest):
         回复结果
     """
     try:
-        cookies_str = get_cookies_str()
-        result = xhs_api.reply_comment(
-            cookies_str=cookies_str,
-            note_url=request.note_url,
-            comment_id=request.comment_id,
-            content=request.content
-        )
+        await run_blocking("reply_comment", send_reply, request.note_url, request.comment_id, request.content)
         return {
             "success": True,
             "message": "回复成功"
         }
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("回复失败")
         raise HTTPException(status_code=500, detail=f"回复失败: {str(e)}")
 
+def send_reply(note_url: str, comment_id: str, content: str):
+    cookies_str = get_cookies_str()
+    return xhs_api.reply_comment(
+        cookies_str=cookies_str,
+        note_url=note_url,
+        comment_id=comment_id,
+        content=content
+    )
+
+@app.put("/cookies/{cookie_id}/status")
+async def set_cookie_status(cookie_id: int, body: CookieStatusRequest):
+    """按id标记cookie有效或无效，失效的cookie立即不再被选中"""
+    updated = await run_blocking("cookie_status", db_manager.mark_cookie_status_by_id, cookie_id, body.is_survive)
+    if not updated:
+        raise HTTPException(status_code=404, detail="未找到该cookie或更新失败")
+    return {
+        "success": True,
+        "message": "已标记为有效" if body.is_survive else "已标记为无效"
+    }
+
 @app.get("/health")
 async def health_check():
     """健康检查接口"""
-    return {"status": "healthy", "service": "小红书API服务"}
+    return {
+        "status": "healthy",
+        "service": "小红书API服务",
+        "event_loop_lag_ms": loop_lag,
+        "pending": route_pending,
+        "db_pool": db_manager.pool_stats(),
+        "cookie_cache": db_manager.cookie_cache.stats(),
+        "cookie_usage": db_manager.usage_writer.stats(),
+        # 每个签名进程的耗时、错误与重启次数，以及trace-id池的余量与回退次数
+        "sign": get_sign_stats()
+    }
 
 if __name__ == "__main__":
     # 启动服务器
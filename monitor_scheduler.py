@@ -0,0 +1,236 @@
+"""
+多笔记评论监控调度器
+所有被监控的笔记按下次检查时间放在一个最小堆中，调度线程只在最早的笔记到期时醒来，
+把到期的笔记交给有界线程池执行增量检查（XhsAPI.monitor_comments）。
+
+检查间隔自适应：有新评论时缩短，连续没有新评论或检查失败时逐步拉长，
+大量冷门笔记只占很少的请求，活跃笔记则更及时。
+"""
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from xhs_utils.url_converter import convert_discovery_to_explore_url
+
+# 同时执行检查的笔记数量
+MONITOR_WORKERS = int(os.getenv('XHS_MONITOR_WORKERS', '4'))
+# 检查间隔的上下限（秒）
+MONITOR_MIN_INTERVAL = float(os.getenv('XHS_MONITOR_MIN_INTERVAL', '60'))
+MONITOR_MAX_INTERVAL = float(os.getenv('XHS_MONITOR_MAX_INTERVAL', '3600'))
+# 有新评论时间隔乘以 SPEEDUP，没有新评论时乘以 BACKOFF
+INTERVAL_SPEEDUP = 0.5
+INTERVAL_BACKOFF = 1.5
+# 下次检查时间的随机抖动比例，避免同时添加的笔记一直同时到期
+INTERVAL_JITTER = 0.1
+
+
+class WatchedNote:
+    """一篇被监控的笔记及其调度状态"""
+
+    def __init__(self, note_id, note_url, user_info, keyword, interval, min_interval, max_interval):
+        self.note_id = note_id
+        self.note_url = note_url
+        self.user_info = user_info
+        self.keyword = keyword
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.next_due = 0.0
+        self.last_check = None
+        self.last_new = 0
+        self.checks = 0
+        self.total_new = 0
+        self.errors = 0
+        self.last_error = None
+        self.running = False
+        self.version = 0  # 每次重新入堆加一，堆中版本不一致的旧条目直接丢弃
+
+    def adapt_interval(self, new_count, failed=False):
+        """根据本次检查结果调整检查间隔"""
+        if failed or not new_count:
+            self.interval = min(self.max_interval, self.interval * INTERVAL_BACKOFF)
+        else:
+            self.interval = max(self.min_interval, self.interval * INTERVAL_SPEEDUP)
+
+    def to_dict(self):
+        return {
+            'note_id': self.note_id,
+            'note_url': self.note_url,
+            'user_info': self.user_info,
+            'keyword': self.keyword,
+            'interval': round(self.interval, 1),
+            'next_due_in': round(max(0.0, self.next_due - time.time()), 1),
+            'last_check': self.last_check,
+            'last_new': self.last_new,
+            'checks': self.checks,
+            'total_new': self.total_new,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'running': self.running,
+        }
+
+
+class MonitorScheduler:
+    """按下次检查时间调度的多笔记监控服务"""
+
+    def __init__(self, api, cookie_provider, on_result=None, workers=MONITOR_WORKERS,
+                 min_interval=MONITOR_MIN_INTERVAL, max_interval=MONITOR_MAX_INTERVAL):
+        """
+        Args:
+            api: XhsAPI 实例，可在多个线程中共用
+            cookie_provider: 无参函数，每次检查前调用以获取cookies字符串
+            on_result: 有新评论时调用 on_result(note, merged_data)，例如保存到数据库
+            workers (int): 同时执行检查的笔记数量
+            min_interval (float): 检查间隔下限（秒）
+            max_interval (float): 检查间隔上限（秒）
+        """
+        self.api = api
+        self.cookie_provider = cookie_provider
+        self.on_result = on_result
+        self.workers = workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._notes = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        """启动调度线程"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='xhs-monitor')
+            self._thread = threading.Thread(target=self._run, name='xhs-monitor-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止调度，正在执行的检查会执行完"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread, executor = self._thread, self._executor
+            self._thread = self._executor = None
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def add(self, note_url, user_info, keyword, interval=None):
+        """添加或更新一篇被监控的笔记，立即安排一次检查
+
+        无法从note_url中取得note_id（不是explore链接或discovery链接转换失败）时抛出ValueError，
+        不以None为键加入调度。
+
+        Returns:
+            WatchedNote: 笔记的调度状态
+        """
+        if "discovery" in note_url:
+            # 转换失败时返回None，保留原链接，下面取不到note_id时拒绝
+            note_url = convert_discovery_to_explore_url(note_url) or note_url
+        note_id = self.api.extract_url_params(note_url)['note_id']
+        if not note_id:
+            raise ValueError(f"无法从链接中解析笔记ID: {note_url}")
+        interval = min(self.max_interval, max(self.min_interval, interval or self.min_interval))
+        with self._cond:
+            note = self._notes.get(note_id)
+            if note is None:
+                note = WatchedNote(note_id, note_url, user_info, keyword, interval, self.min_interval, self.max_interval)
+                self._notes[note_id] = note
+            else:
+                note.note_url, note.user_info, note.keyword, note.interval = note_url, user_info, keyword, interval
+            if not note.running:
+                self._push(note, time.time())
+        return note
+
+    def remove(self, note_id):
+        """取消监控，返回是否存在该笔记；堆中的条目在到期时丢弃"""
+        with self._cond:
+            return self._notes.pop(note_id, None) is not None
+
+    def list(self):
+        with self._cond:
+            return [note.to_dict() for note in sorted(self._notes.values(), key=lambda n: n.next_due)]
+
+    def stats(self):
+        with self._cond:
+            return {
+                'watched': len(self._notes),
+                'inflight': self._inflight,
+                'workers': self.workers,
+                'next_due_in': round(max(0.0, self._heap[0][0] - time.time()), 1) if self._heap else None,
+            }
+
+    def _push(self, note, due):
+        note.version += 1
+        note.next_due = due
+        heapq.heappush(self._heap, (due, next(self._seq), note.note_id, note.version))
+        self._cond.notify()
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                if not self._heap or self._inflight >= self.workers:
+                    self._cond.wait()
+                    continue
+                due, _, note_id, version = self._heap[0]
+                note = self._notes.get(note_id)
+                if note is None or note.version != version:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                note.running = True
+                self._inflight += 1
+                self._executor.submit(self._check, note)
+
+    def _check(self, note):
+        new_count, failed = 0, False
+        try:
+            merged = self.api.monitor_comments(
+                cookies_str=self.cookie_provider(),
+                note_url=note.note_url,
+                userInfo=note.user_info,
+                keyword=note.keyword,
+                interval=0
+            )
+            if merged is None:
+                failed, note.last_error = True, "获取笔记信息失败"
+            elif merged:
+                new_count = len(merged)
+                if self.on_result is not None:
+                    self.on_result(note, merged)
+        except Exception as e:
+            failed, note.last_error = True, str(e)
+            logger.error(f"监控笔记{note.note_id}失败: {e}")
+        finally:
+            with self._cond:
+                note.running = False
+                note.checks += 1
+                note.last_check = time.time()
+                note.last_new = new_count
+                note.total_new += new_count
+                note.errors += failed
+                if not failed:
+                    note.last_error = None
+                note.adapt_interval(new_count, failed)
+                self._inflight -= 1
+                if self._notes.get(note.note_id) is note:
+                    jitter = random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+                    self._push(note, time.time() + note.interval * jitter)
+                self._cond.notify()
@@ -0,0 +1,75 @@
+// 常驻签名进程：一次性加载签名脚本，通过 stdin/stdout 按行收发 JSON 请求
+// 用法: node sign_worker.js <script_path>
+// 请求: {"id": 1, "fn": "get_request_headers_params", "args": [...]}
+//       {"id": 2, "op": "batch", "fn": "traceId", "count": 100, "args": []}
+//       {"id": 3, "op": "ping"}
+// 响应: {"id": 1, "result": ...} 或 {"id": 1, "error": "..."}
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const readline = require('readline');
+const { createRequire } = require('module');
+
+// 签名脚本中存在大量 console.log 调试输出，统一转到 stderr，stdout 只用于协议
+const protocolWrite = process.stdout.write.bind(process.stdout);
+console.log = console.info = console.debug = console.warn = console.error;
+
+function send(message) {
+    protocolWrite(JSON.stringify(message) + '\n');
+}
+
+const scriptPath = path.resolve(process.argv[2]);
+try {
+    // 以脚本所在目录解析 require，保证 './xhs_xray_pack1.js' 与 jsdom 都能找到
+    global.require = createRequire(scriptPath);
+    vm.runInThisContext(fs.readFileSync(scriptPath, 'utf8'), { filename: scriptPath });
+} catch (e) {
+    send({ ready: false, error: String(e && e.message || e) });
+    process.exit(1);
+}
+
+function invoke(fn, args) {
+    const target = globalThis[fn];
+    if (typeof target !== 'function') {
+        throw new Error('function not found: ' + fn);
+    }
+    return target.apply(globalThis, args || []);
+}
+
+function handle(request) {
+    switch (request.op) {
+        case 'ping':
+            return { pid: process.pid, memory: process.memoryUsage().rss };
+        case 'batch': {
+            const results = [];
+            for (let i = 0; i < request.count; i++) {
+                results.push(invoke(request.fn, request.args));
+            }
+            return results;
+        }
+        default:
+            return invoke(request.fn, request.args);
+    }
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+rl.on('line', (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (e) {
+        send({ id: null, error: 'invalid request: ' + e.message });
+        return;
+    }
+    try {
+        send({ id: request.id, result: handle(request) });
+    } catch (e) {
+        send({ id: request.id, error: String(e && e.stack || e) });
+    }
+});
+rl.on('close', () => process.exit(0));
+
+send({ ready: true, pid: process.pid });
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评论爬取断点测试
+
+用固定的分页数据代替真实接口，验证每次只爬一小段、从断点继续时，
+拼起来的结果与一次爬完完全一致，既不重复也不遗漏。
+
+使用示例：
+python -m pytest -q test_checkpoint_store.py
+"""
+
+import asyncio
+import random
+from collections import Counter
+
+import xhs_api_class
+import xhs_async_api
+from xhs_api_class import XhsAPI
+from xhs_async_api import AsyncXhsAPI
+from xhs_utils.checkpoint_store import SQLiteCheckpointStore
+from xhs_utils.crawl_progress import CrawlProgress
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/abc?xsec_token=t"
+
+
+def _comment(cid, sub=False, more=False):
+    return {
+        'id': cid,
+        'content': cid,
+        'create_time': 1700000000000,
+        'sub_comments': [{'id': f'{cid}-s', 'content': '', 'create_time': 1700000000000}] if sub else [],
+        'sub_comment_has_more': more,
+        'sub_comment_cursor': f'{cid}:0',
+    }
+
+
+class FakePagesAPI(XhsAPI):
+    """固定分页数据：8页一级评论，部分评论带可展开的二级评论"""
+
+    def fetch_comment_page(self, cookies_str, note_params, cursor=''):
+        page = int(cursor or 0)
+        return {
+            'comments': [_comment(f'{page}-{j}', sub=j % 3 == 0, more=j % 4 == 1) for j in range(10)],
+            'cursor': str(page + 1),
+            'has_more': page < 7,
+        }
+
+    def fetch_sub_comment_page(self, cookies_str, note_id, root_comment_id, cursor, xsec_token):
+        page = int(cursor.rsplit(':', 1)[1])
+        return {
+            'comments': [{'id': f'{root_comment_id}-{page}-{k}', 'content': '', 'create_time': 1700000000000} for k in range(3)],
+            'cursor': f'{root_comment_id}:{page + 1}',
+            'has_more': page < 2,
+        }
+
+
+class FakeAsyncPagesAPI(AsyncXhsAPI):
+    """与FakePagesAPI相同的分页数据"""
+
+    async def fetch_comment_page(self, cookies_str, note_params, cursor=''):
+        return FakePagesAPI.fetch_comment_page(self, cookies_str, note_params, cursor)
+
+    async def fetch_sub_comment_page(self, cookies_str, note_id, root_comment_id, cursor, xsec_token):
+        return FakePagesAPI.fetch_sub_comment_page(self, cookies_str, note_id, root_comment_id, cursor, xsec_token)
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    store = SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    progress = CrawlProgress('abc', 'c1', sub_cursors={'r1': 's1'}, count=12, page_offset=3, sub_offsets={'r1': 2})
+    store.save(progress)
+    assert store.load('abc').to_dict() == progress.to_dict()
+
+    progress.has_more = False
+    progress.sub_cursors.clear()
+    store.commit(progress)  # 已完成的进度不再保留
+    assert store.load('abc') is None
+
+
+def test_resume_matches_full_crawl(tmp_path, monkeypatch):
+    monkeypatch.setattr(xhs_api_class.time, 'sleep', lambda seconds: None)
+    api = FakePagesAPI()
+    full = [c['comment_id'] for c in api.iter_comments('a1=x', NOTE_URL)]
+
+    store = SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    rng = random.Random(7)
+    resumed = []
+    while True:
+        resumed += [c['comment_id'] for c in api.iter_comments('a1=x', NOTE_URL, max_comments=rng.randint(1, 15), checkpoint=store)]
+        if store.load('abc') is None:
+            break
+
+    assert len(resumed) == len(full)
+    assert Counter(resumed) == Counter(full)
+
+
+def test_async_pagination_matches_sync(monkeypatch):
+    monkeypatch.setattr(xhs_api_class.time, 'sleep', lambda seconds: None)
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(xhs_async_api.asyncio, 'sleep', no_sleep)
+    full = [c['comment_id'] for c in FakePagesAPI().iter_comments('a1=x', NOTE_URL)]
+
+    async def crawl():
+        return [c['comment_id'] async for c in FakeAsyncPagesAPI().aiter_comments('a1=x', NOTE_URL)]
+
+    assert asyncio.run(crawl()) == full
+    # 异步实例不继承同步的请求方法
+    assert not hasattr(AsyncXhsAPI, 'monitor_comments') and not hasattr(AsyncXhsAPI, 'reply_comment')
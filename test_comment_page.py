@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评论分页解码测试
+
+各解码方式对同一份响应得到的评论、子评论与分页字段必须一致，
+只是 msgspec 方式不构造未使用的字段。
+
+使用示例：
+python -m pytest -q test_comment_page.py
+"""
+
+import json
+
+import pytest
+
+from xhs_api_class import XhsAPI
+from xhs_utils.comment_page import DECODERS
+from xhs_utils.crawl_progress import CrawlProgress
+
+
+def _raw_comment(cid, sub_comments=()):
+    return {
+        'id': cid,
+        'note_id': 'n1',
+        'content': f'内容{cid}',
+        'like_count': '7',
+        'ip_location': '广东',
+        'create_time': 1700000000000,
+        'user_info': {'nickname': f'用户{cid}', 'image': 'https://sns-avatar.example/a.jpg', 'user_id': 'u1'},
+        'pictures': [{'url_default': 'https://sns-img.example/p.jpg', 'height': 100, 'width': 100}],
+        'at_users': [{'nickname': 'x', 'user_id': 'y'}],
+        'status': 0,
+        'sub_comments': list(sub_comments),
+        'sub_comment_has_more': bool(sub_comments),
+        'sub_comment_cursor': f'{cid}-cursor',
+    }
+
+
+PAGE = json.dumps({
+    'code': 0,
+    'success': True,
+    'msg': '成功',
+    'data': {
+        'comments': [_raw_comment('c1', [_raw_comment('c1-s1')]), _raw_comment('c2', [])],
+        'cursor': 'next',
+        'has_more': True,
+        'time': 1700000000000,
+        'xsec_token': 't',
+    },
+}, ensure_ascii=False).encode('utf-8')
+
+
+def _summary(page):
+    api = XhsAPI()
+    comments = page.get('comments', [])
+    return {
+        'cursor': page.get('cursor', ''),
+        'has_more': page.get('has_more') == True,
+        'comments': [
+            (
+                api.format_comment(comment).to_dict(),
+                [api.format_comment(sub).to_dict() for sub in comment.get('sub_comments', [])],
+                comment.get('sub_comment_has_more') == True,
+                comment.get('sub_comment_cursor', ''),
+                comment.get('note_id', 'fallback'),
+            )
+            for comment in comments
+        ],
+    }
+
+
+@pytest.mark.parametrize('decoder', sorted(DECODERS))
+def test_decoders_extract_the_same_fields(decoder):
+    decode = DECODERS[decoder]
+    assert _summary(decode(PAGE)) == _summary(DECODERS['json'](PAGE))
+
+
+@pytest.mark.parametrize('decoder', sorted(DECODERS))
+def test_missing_or_empty_data(decoder):
+    decode = DECODERS[decoder]
+    assert decode(b'{"code": -1, "msg": "fail"}') is None
+    empty = decode(b'{"data": null}')
+    assert empty.get('comments', []) == [] and empty.get('has_more') is None
+    # 缺少的字段返回默认值，与字典的 get 行为一致
+    page = decode(b'{"data": {"comments": [{"id": "c"}]}}')
+    assert page.get('comments')[0].get('note_id', 'fallback') == 'fallback'
+
+
+@pytest.mark.parametrize('decoder', sorted(DECODERS))
+def test_null_sub_comments(decoder):
+    page = DECODERS[decoder](b'{"data": {"comments": [{"id": "c", "sub_comments": null}], "has_more": false}}')
+    progress = CrawlProgress('n1')
+    items = list(XhsAPI()._walk_comment_page(progress, page.get('comments', [])))
+    assert [item['comment_id'] for item, expand in items] == ['c'] and progress.count == 1
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存cookie池测试
+
+使用示例：
+python -m pytest -q test_cookie_cache.py
+"""
+
+import threading
+
+from xhs_utils.cookie_cache import CookieCache
+
+
+def make_rows(ids):
+    return [{'id': i, 'cookie_string': f'a1=v{i}'} for i in ids]
+
+
+def test_choice_loads_once_and_remove_is_immediate():
+    loads = []
+    cache = CookieCache(lambda: loads.append(1) or make_rows(range(1, 6)), ttl=60)
+
+    picked = {cache.choice()[0] for _ in range(300)}
+    assert picked == {1, 2, 3, 4, 5}
+    assert len(loads) == 1
+
+    assert cache.remove_value('a1=v3') == 1
+    assert cache.remove(5)
+    assert not cache.remove(5)
+    assert {cache.choice()[0] for _ in range(300)} == {1, 2, 4}
+
+
+def test_removal_during_refresh_is_not_undone():
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)  # 第二次加载读到的是标记失效之前的数据
+        return make_rows(range(1, 4))
+
+    cache = CookieCache(loader, ttl=60)
+    cache.choice()
+    cache.invalidate()
+    cache.remove(2)
+    release.set()
+    for _ in range(100):
+        if cache.stats()['refreshes'] == 2:
+            break
+        threading.Event().wait(0.01)
+
+    assert cache.stats()['refreshes'] == 2
+    assert {cache.choice()[0] for _ in range(200)} == {1, 3}
+
+
+def test_cold_start_loads_once_for_concurrent_callers():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return make_rows(range(1, 4))
+
+    cache = CookieCache(loader, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.choice())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    threading.Event().wait(0.05)  # 其余线程已在等待第一次加载
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is not None for result in results)
+
+
+def test_refresh_joins_background_refresh_without_undoing_removal():
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return make_rows(range(1, 4))
+
+    cache = CookieCache(loader, ttl=60)
+    cache.choice()
+    cache.invalidate()
+    cache.remove(2)
+    threading.Timer(0.05, release.set).start()
+    cache.refresh()  # 等待后台加载结束，而不是清掉加载期间的移除记录再加载一次
+
+    assert len(calls) == 2
+    assert {cache.choice()[0] for _ in range(200)} == {1, 3}
+
+
+def test_invalidate_during_refresh_reloads_again():
+    release = threading.Event()
+    rows = [make_rows(range(1, 3))]
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) == 2:
+            snapshot = rows[0]
+            release.wait(5)  # 读表发生在数据变化之前
+            return snapshot
+        return rows[0]
+
+    cache = CookieCache(loader, ttl=60)
+    cache.choice()
+    cache.invalidate()
+    rows[0] = make_rows(range(1, 4))  # 加载进行中时恢复了cookie 3
+    cache.invalidate()
+    release.set()
+    for _ in range(100):
+        if cache.stats()['refreshes'] == 3:
+            break
+        threading.Event().wait(0.01)
+
+    assert len(calls) == 3
+    assert {cache.choice()[0] for _ in range(200)} == {1, 2, 3}
+
+
+def test_failed_first_load_returns_none():
+    def loader():
+        raise ConnectionError("数据库不可用")
+
+    cache = CookieCache(loader)
+    assert cache.choice() is None
+    assert cache.stats()['refresh_failures'] == 1
+
+
+def test_least_used_rotates_from_oldest():
+    from datetime import datetime, timedelta
+
+    base = datetime(2024, 1, 1)
+    rows = [
+        {'id': 1, 'cookie_string': 'a1=v1', 'last_used': base + timedelta(hours=2)},
+        {'id': 2, 'cookie_string': 'a1=v2', 'last_used': None},
+        {'id': 3, 'cookie_string': 'a1=v3', 'last_used': base},
+    ]
+    cache = CookieCache(lambda: rows, ttl=60)
+
+    # 从未使用的排最前，之后按最后使用时间，再之后轮流使用
+    assert [cache.least_used()[0] for _ in range(3)] == [2, 3, 1]
+    cache.remove(2)
+    assert [cache.least_used()[0] for _ in range(4)] == [3, 1, 3, 1]
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cookie解析测试
+
+使用示例：
+python -m pytest -q test_cookie_util.py
+"""
+
+from xhs_utils.cookie_util import parse_cookies, trans_cookies
+
+
+def test_parse_cookies_keeps_values_with_equals_and_is_cached():
+    cookies_str = 'a1=abc; web_session=x=y==; unread={%22ub%22:%22z%22}'
+    parsed = parse_cookies(cookies_str)
+
+    assert parsed.a1 == 'abc'
+    assert parsed.cookies == {'a1': 'abc', 'web_session': 'x=y==', 'unread': '{%22ub%22:%22z%22}'}
+    assert parsed.header == cookies_str
+    assert parse_cookies(cookies_str) is parsed
+
+
+def test_trans_cookies_returns_copy_and_accepts_bare_semicolons():
+    cookies = trans_cookies('a1=abc;webId=1')
+    assert cookies == {'a1': 'abc', 'webId': '1'}
+    cookies['a1'] = 'changed'
+    assert parse_cookies('a1=abc;webId=1').a1 == 'abc'
+    assert parse_cookies('webId=1').a1 is None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池测试
+
+用不连接数据库的连接对象代替pymysql连接，验证连接复用、最大连接数、
+借出前的存活检查、等待超时、归还时回滚未提交的事务与创建时预先建立min_size个连接。
+
+使用示例：
+python -m pytest -q test_db_pool.py
+"""
+
+import threading
+import time
+
+import pytest
+from pymysql.constants import SERVER_STATUS
+
+from db_manager import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.server_status = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.server_status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def ping(self, reconnect=False):
+        if not self.open:
+            raise ConnectionError("连接已断开")
+
+    def close(self):
+        self.open = False
+
+
+class FakePool(ConnectionPool):
+    def _connect(self):
+        self._metrics['created'] += 1
+        return FakeConnection()
+
+
+def test_pool_reuses_connections_under_concurrency():
+    pool = FakePool(min_size=1, max_size=3, timeout=5)
+    peak = []
+
+    def work():
+        for _ in range(30):
+            connection = pool.acquire()
+            peak.append(pool.stats()['in_use'])
+            time.sleep(0.001)
+            connection.close()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert stats['created'] <= 3
+    assert max(peak) <= 3
+    assert stats['checkouts'] == 240
+    assert stats['in_use'] == 0
+
+
+def test_pool_drops_dead_connections_and_times_out():
+    pool = FakePool(min_size=0, max_size=2, ping_interval=0, timeout=0.2)
+    first = pool.acquire()
+    raw = first._connection
+    first.close()
+    raw.open = False  # 空闲期间连接被服务端断开
+
+    second = pool.acquire()
+    assert second._connection is not raw
+    assert pool.stats()['ping_failures'] == 1
+
+    third = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    second.close()
+    third.close()
+    assert pool.stats()['idle'] == 2
+
+
+def test_release_rolls_back_open_transactions():
+    pool = FakePool(min_size=0, max_size=1)
+    connection = pool.acquire()
+    raw = connection._connection
+    connection.close()
+    assert raw.rollbacks == 0  # 没有进行中的事务时不多一次往返
+
+    connection = pool.acquire()
+    raw.server_status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS  # 写入失败后未提交
+    connection.close()
+    assert raw.rollbacks == 1 and pool.stats()['idle'] == 1
+
+
+def test_pool_prewarms_min_size_connections():
+    pool = FakePool(min_size=2, max_size=3)
+    stats = pool.stats()
+    assert (stats['created'], stats['size'], stats['idle'], stats['in_use']) == (2, 2, 2, 0)
+    connection = pool.acquire()
+    assert pool.stats()['created'] == 2  # 复用预先建立的连接
+    connection.close()
+
+
+def test_failed_prewarm_does_not_break_the_pool():
+    class FlakyPool(FakePool):
+        failures = 1
+
+        def _connect(self):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("数据库不可用")
+            return super()._connect()
+
+    pool = FlakyPool(min_size=2, max_size=2)
+    assert pool.stats()['size'] == 0
+    pool.acquire().close()
+    assert pool.stats()['idle'] == 1
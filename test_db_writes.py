@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库写入路径测试
+
+用记录调用顺序的连接、游标与cookie池代替MySQL，验证cookie状态更新与内存cookie池的先后顺序，
+以及monitor_comments的分批写入：按batch_size分批、每批统计相加一致、时间直接转换为datetime，
+缺少note_id的行不写入并计数，插入语句使用行别名而不是已弃用的VALUES()。
+
+使用示例：
+python -m pytest -q test_db_writes.py
+"""
+
+import re
+from datetime import datetime
+
+from db_manager import INSERT_MONITOR_COMMENT_SQL, DatabaseCookieManager
+from xhs_api_class import XhsAPI
+from xhs_utils.models import Comment, NoteInfo
+from xhs_utils.time_util import epoch_ms_to_datetime
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.db.events.append(('execute', sql))
+        self.rowcount = 1
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        self.db.events.append(('executemany', sql, rows))
+        if len(self.db.batches) in self.db.failing_batches:
+            self.db.batches.append(None)
+            raise RuntimeError("写入失败")
+        self.db.batches.append(rows)
+        return len(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.events.append(('commit',))
+
+    def rollback(self):
+        self.db.events.append(('rollback',))
+
+    def close(self):
+        pass
+
+
+class FakeCookieCache:
+    def __init__(self, db):
+        self.db = db
+
+    def invalidate(self):
+        self.db.events.append(('invalidate',))
+
+    def remove(self, cookie_id):
+        self.db.events.append(('remove', cookie_id))
+
+    def ids_of(self, cookie_string):
+        return []
+
+
+class FakeManager(DatabaseCookieManager):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+        self.failures = []
+        self.batches = []
+        self.failing_batches = set()
+
+    def get_connection(self):
+        return FakeConnection(self)
+
+    @property
+    def cookie_cache(self):
+        return FakeCookieCache(self)
+
+    def record_cookie_failure(self, cookie_id):
+        self.failures.append(cookie_id)
+
+
+def test_reenabled_cookie_reloads_pool_after_commit():
+    manager = FakeManager()
+    assert manager.mark_cookie_status_by_id(7, 1)
+    assert manager.mark_cookie_status(1, 'a1=v')
+    # 重新加载在提交之后才开始，读不到提交前的 is_survive = 0
+    assert [event[0] for event in manager.events] == ['execute', 'commit', 'invalidate'] * 2
+
+    manager.events.clear()
+    assert manager.mark_cookie_status_by_id(7, 0)
+    assert [event[0] for event in manager.events] == ['remove', 'execute', 'commit']
+    assert manager.failures == [7]
+
+
+def make_records(count, note_id='n1'):
+    note = NoteInfo(note_id=note_id, title='标题', note_url=f'https://www.xiaohongshu.com/explore/{note_id}?xsec_token=t')
+    comments = [Comment(f'评论{i}', i, f'用户{i}', f'c{i}', '上海') for i in range(count)]
+    return XhsAPI().merge_note_info_with_comments(note, comments, 'user', 'kw')
+
+
+def test_monitor_rows_are_written_in_batches():
+    manager = FakeManager()
+    stats = manager.save_monitor_comments_batched(make_records(7), batch_size=3)
+
+    assert [len(rows) for rows in manager.batches] == [3, 3, 1]
+    assert [event[0] for event in manager.events].count('commit') == 3
+    assert [batch['rows'] for batch in stats['batches']] == [3, 3, 1]
+    assert [batch['batch'] for batch in stats['batches']] == [0, 1, 2]
+    assert sum(batch['affected'] for batch in stats['batches']) == 7
+    assert (stats['success'], stats['rows'], stats['saved'], stats['failed']) == (True, 7, 7, 0)
+    assert [row[16] for rows in manager.batches for row in rows] == [f'c{i}' for i in range(7)]
+
+
+def test_failed_batch_is_rolled_back_and_counted():
+    manager = FakeManager()
+    manager.failing_batches = {1}
+    stats = manager.save_monitor_comments_batched(make_records(7), batch_size=3)
+
+    assert 'rollback' in [event[0] for event in manager.events]
+    assert [batch.get('error') is not None for batch in stats['batches']] == [False, True, False]
+    assert (stats['success'], stats['saved'], stats['failed']) == (False, 4, 3)
+    assert stats['saved'] + stats['failed'] == stats['rows']
+
+
+def test_monitor_record_times_become_datetimes_without_strings(monkeypatch):
+    parsed = []
+    to_datetime = DatabaseCookieManager._to_datetime
+
+    def spy(value, cache, default):
+        parsed.append(value)
+        return to_datetime(value, cache, default)
+
+    monkeypatch.setattr(DatabaseCookieManager, '_to_datetime', staticmethod(spy))
+    records = make_records(2)
+    manager = FakeManager()
+    manager.save_monitor_comments_batched(records)
+
+    for row in manager.batches[0]:
+        assert isinstance(row[11], datetime) and isinstance(row[12], datetime)
+        assert row[11] == epoch_ms_to_datetime(records[0].collect_ms)
+    # 收集时间从毫秒时间戳直接转换，不经过格式化后的字符串
+    assert not any(isinstance(value, str) for value in parsed)
+
+
+def test_rows_without_note_id_are_skipped_and_counted():
+    manager = FakeManager()
+    records = make_records(3)
+    orphans = [
+        {'comment_id': 'x1', 'content': '没有笔记链接'},
+        {'comment_id': 'x2', 'note_id': '', 'note_url': ''},
+    ]
+    stats = manager.save_monitor_comments_batched(records + orphans)
+
+    # 不会以空note_id写入，避免不同笔记的评论在 ('', comment_id) 上互相覆盖
+    written = [row for rows in manager.batches for row in rows]
+    assert [row[16] for row in written] == ['c0', 'c1', 'c2']
+    assert all(row[0] == 'n1' for row in written)
+    assert (stats['success'], stats['rows'], stats['saved']) == (False, 5, 3)
+    assert stats['failed'] == stats['rejected'] == 2
+
+
+def test_upsert_uses_row_alias():
+    manager = FakeManager()
+    manager.save_monitor_comments_batched(make_records(1))
+    sql = next(event[1] for event in manager.events if event[0] == 'executemany')
+    assert sql == INSERT_MONITOR_COMMENT_SQL
+
+    assert re.search(r'\)\s+AS new\s+ON DUPLICATE KEY UPDATE', sql)
+    updates = sql.split('ON DUPLICATE KEY UPDATE')[1]
+    assert 'VALUES(' not in updates.replace(' ', '')
+    assignments = re.findall(r'(\w+) = (\S+?),?$', updates, re.M)
+    assert assignments and all(value == f'new.{column}' for column, value in assignments)
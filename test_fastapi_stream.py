@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式接口路由名额测试
+
+不启动服务，直接调用stream_comments，验证名额在检查时即被占用，
+响应正常结束或响应体从未开始输出时都会释放。
+
+使用示例：
+python -m pytest -q test_fastapi_stream.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import fastapi_app
+
+ROUTE = 'test_stream'
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+async def fake_comments():
+    for i in range(3):
+        yield {'comment_id': f'c{i}'}
+
+
+def make_response():
+    return fastapi_app.stream_comments(FakeRequest(), ROUTE, 'ndjson', fake_comments(), lambda: {'done': True})
+
+
+def test_burst_of_streams_is_limited_before_any_body_starts(monkeypatch):
+    monkeypatch.setattr(fastapi_app, 'API_ROUTE_QUEUE_LIMIT', 2)
+    monkeypatch.setitem(fastapi_app.route_pending, ROUTE, 0)
+
+    responses = [make_response(), make_response()]
+    with pytest.raises(HTTPException) as excinfo:
+        make_response()
+    assert excinfo.value.status_code == 503
+    assert fastapi_app.route_pending[ROUTE] == 2
+
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    async def broken_send(message):
+        raise OSError("连接已断开")
+
+    scope = {'type': 'http', 'asgi': {'spec_version': '2.4'}}
+    # 正常输出完毕
+    asyncio.run(responses[0](scope, receive, send))
+    assert b'"summary"' in sent[-2]['body']
+    assert fastapi_app.route_pending[ROUTE] == 1
+    # 发送响应头时就失败，响应体从未开始输出
+    with pytest.raises(Exception):
+        asyncio.run(responses[1](scope, receive, broken_send))
+    assert fastapi_app.route_pending[ROUTE] == 0
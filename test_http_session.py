@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP会话构建测试
+
+只创建会话、不发请求，验证安装的curl_cffi接受XhsAPI与AsyncXhsAPI使用的会话参数；
+requirements.txt中的版本下限过低时这里会抛出TypeError。
+
+使用示例：
+python -m pytest -q test_http_session.py
+"""
+
+import asyncio
+
+from xhs_api_class import XhsAPI
+from xhs_async_api import AsyncXhsAPI
+
+
+def test_sync_session_builds():
+    api = XhsAPI(pool_size=4)
+    try:
+        session = api.session
+        assert session is api.session  # 复用同一个会话
+    finally:
+        api.close()
+
+
+def test_async_session_builds():
+    async def build():
+        async with AsyncXhsAPI(max_concurrency=2) as api:
+            session = api.session
+            assert session is api.session
+            assert api._semaphore is not None
+
+    asyncio.run(build())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码测试
+
+请求体参与签名，各后端编码结果必须与标准库的紧凑格式逐字节一致。
+
+使用示例：
+python -m pytest -q test_json_codec.py
+"""
+
+import json
+
+import pytest
+
+from xhs_api_class import XhsAPI
+from xhs_utils import json_codec
+
+PAYLOADS = [
+    XhsAPI().build_search_params('猫咪 🐱'),
+    {"note_id": "abc", "target_comment_id": "c1", "content": "回复\n\"引号\" \\ /  ", "at_users": []},
+    {"source_note_id": "n1", "image_formats": ["jpg", "webp", "avif"], "extra": {"need_body_topic": "1"}, "num": 10, "flag": True, "none": None},
+]
+
+
+@pytest.mark.parametrize('backend', sorted(json_codec.BACKENDS))
+def test_backends_encode_like_compact_stdlib(backend):
+    loads, dumps, dumps_bytes = json_codec.BACKENDS[backend]
+    for payload in PAYLOADS:
+        expected = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+        assert dumps(payload) == expected
+        assert dumps_bytes(payload) == expected.encode('utf-8')
+        assert loads(expected.encode('utf-8')) == payload
+        assert loads(expected) == payload
+
+
+def test_request_body_is_encoded_once(monkeypatch):
+    from xhs_utils import xhs_util
+
+    monkeypatch.setattr(xhs_util, 'generate_xs_xs_common', lambda a1, api, data: ('xs', 1, 'xsc'))
+    monkeypatch.setattr(xhs_util, 'generate_xray_traceid', lambda: '0' * 32)
+    for payload in PAYLOADS:
+        _, data = xhs_util.generate_headers('a1', '/api/sns/web/v1/search/notes', payload)
+        # 直接得到可发送的UTF-8字节，调用方不再encode
+        assert data == json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    assert xhs_util.generate_headers('a1', '/api/sns/web/v2/comment/page')[1] == ''
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评论与笔记信息模型测试
+
+验证模型按字典方式读取的结果与原来的字典一致，合并数据共用同一个笔记信息，
+序列化后可以直接JSON编码，写入数据库的参数顺序与插入语句一致。
+
+使用示例：
+python -m pytest -q test_models.py
+"""
+
+import json
+from datetime import datetime
+
+from db_manager import DatabaseCookieManager
+from xhs_api_class import XhsAPI
+from xhs_utils.models import Comment, MonitorRecord, NoteInfo, serialize
+
+RAW_COMMENT = {
+    'id': 'c1',
+    'content': '好看',
+    'like_count': '3',
+    'ip_location': '上海',
+    'create_time': 1700000000000,
+    'user_info': {'nickname': '小红'},
+}
+
+FEED_RESPONSE = {
+    'code': 0,
+    'data': {'items': [{
+        'model_type': 'note',
+        'note_card': {
+            'note_id': 'n1',
+            'title': '标题',
+            'ip_location': '北京',
+            'interact_info': {'liked_count': '10', 'collected_count': '2', 'comment_count': '5'},
+            'user': {'nickname': '作者'},
+        },
+    }]},
+}
+
+
+def test_comment_reads_like_the_old_dict():
+    comment = XhsAPI().format_comment(RAW_COMMENT)
+    assert isinstance(comment, Comment)
+    assert comment == {
+        'content': '好看',
+        'like_count': '3',
+        'nickname': '小红',
+        'comment_id': 'c1',
+        'comment_location': '上海',
+        'note_time': datetime.fromtimestamp(1700000000).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    assert comment['comment_id'] == comment.get('comment_id') == 'c1'
+    assert comment.get('missing', 'x') == 'x'
+    assert json.loads(json.dumps(serialize([comment]), ensure_ascii=False))[0]['nickname'] == '小红'
+
+
+def test_merged_records_share_note_info_and_match_db_columns():
+    api = XhsAPI()
+    note = api.parse_note_info(FEED_RESPONSE, 'https://www.xiaohongshu.com/explore/n1?xsec_token=t', {'xsec_token': 't'})
+    assert isinstance(note, NoteInfo)
+    assert note['comment_count'] == '5' and note['author'] == '作者'
+
+    comments = [api.format_comment(dict(RAW_COMMENT, id=f'c{i}')) for i in range(3)]
+    merged = api.merge_note_info_with_comments(note, comments, 'user', 'kw')
+    assert all(isinstance(item, MonitorRecord) and item.note is note for item in merged)
+
+    item = merged[1]
+    assert item['note_id'] == 'n1' and item['comment_id'] == 'c1' and item['likes'] == '10'
+    assert item['commenter_nickname'] == '小红' and item['comment_likes'] == '3'
+
+    # 模型与同样内容的字典转换出的数据库参数相同
+    manager = DatabaseCookieManager()
+    now = datetime.now()
+    assert manager._monitor_comment_row(item, {}, now) == manager._monitor_comment_row(item.to_dict(), {}, now)
+
+    # 缺少note_id的字典从note_url中取，不同笔记的评论不会在 ('', comment_id) 上互相覆盖
+    row = item.to_dict()
+    del row['note_id']
+    assert manager._monitor_comment_row(row, {}, now)[0] == 'n1'
+    assert manager._monitor_comment_row({'comment_id': 'c1'}, {}, now)[0] == ''
+
+
+def test_malformed_create_time_does_not_break_the_page():
+    api = XhsAPI()
+    comments = [api.format_comment(dict(RAW_COMMENT, create_time=value))
+                for value in ('', None, 'abc', '1700000000000', 1700000000000.0, 10 ** 20)]
+    assert [c.create_time for c in comments[:5]] == [None, None, None, 1700000000000, 1700000000000]
+    assert [c['note_time'] for c in comments[:3]] == ['', '', '']
+    assert comments[3]['note_time'] == comments[4]['note_time'] == datetime.fromtimestamp(1700000000).strftime("%Y-%m-%d %H:%M:%S")
+    assert comments[5]['note_time'] == ''
+    no_time = dict(RAW_COMMENT)
+    del no_time['create_time']
+    assert api.format_comment(no_time)['note_time'] == ''
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多笔记监控调度器测试
+
+用不发请求的 monitor_comments 代替真实检查，验证并发不超过线程池大小，
+持续有新评论的笔记比没有新评论的笔记检查得更频繁，取消后不再检查。
+
+使用示例：
+python -m pytest -q test_monitor_scheduler.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from monitor_scheduler import MonitorScheduler, WatchedNote
+from xhs_api_class import XhsAPI
+
+
+class CountingAPI(XhsAPI):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.inflight = 0
+        self.max_inflight = 0
+
+    def monitor_comments(self, cookies_str, note_url, userInfo, keyword, interval=60):
+        note_id = self.extract_url_params(note_url)['note_id']
+        with self.lock:
+            self.calls[note_id] = self.calls.get(note_id, 0) + 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+        time.sleep(0.005)
+        with self.lock:
+            self.inflight -= 1
+        return [{'comment_id': 'new'}] if note_id.startswith('hot') else []
+
+
+def test_adapt_interval_bounds():
+    note = WatchedNote('n', 'url', 'u', 'k', interval=100, min_interval=60, max_interval=300)
+    note.adapt_interval(new_count=5)
+    assert note.interval == 60
+    for _ in range(10):
+        note.adapt_interval(new_count=0)
+    assert note.interval == 300
+
+
+def test_scheduler_prefers_active_notes():
+    api = CountingAPI()
+    results = []
+    scheduler = MonitorScheduler(api, lambda: 'a1=x', on_result=lambda note, merged: results.append(note.note_id),
+                                 workers=3, min_interval=0.02, max_interval=0.5)
+    scheduler.start()
+    try:
+        for i in range(40):
+            scheduler.add(f'https://www.xiaohongshu.com/explore/cold{i}?xsec_token=t', 'u', 'k', 0.1)
+        for i in range(4):
+            scheduler.add(f'https://www.xiaohongshu.com/explore/hot{i}?xsec_token=t', 'u', 'k', 0.1)
+        time.sleep(1.5)
+        assert scheduler.remove('hot0')
+        # 取消前已交给线程池的一次检查仍会执行，等它结束后再计数
+        time.sleep(0.1)
+        removed_calls = api.calls['hot0']
+        time.sleep(0.2)
+    finally:
+        scheduler.stop()
+
+    assert api.max_inflight <= 3
+    assert api.calls['hot0'] == removed_calls
+    hot = sum(v for k, v in api.calls.items() if k.startswith('hot')) / 4
+    cold = sum(v for k, v in api.calls.items() if k.startswith('cold')) / 40
+    assert hot > 2 * cold
+    assert set(results) == {f'hot{i}' for i in range(4)}
+
+
+def test_add_rejects_urls_without_note_id():
+    scheduler = MonitorScheduler(CountingAPI(), lambda: 'a1=x', workers=1)
+    for url in ('https://www.xiaohongshu.com/user/profile/abc', 'https://www.xiaohongshu.com/discovery/', 'not a url'):
+        with pytest.raises(ValueError):
+            scheduler.add(url, 'u', 'k')
+    # 不会以None为键加入调度，否则永远无法通过note_id取消
+    assert scheduler.list() == []
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量评论监控测试
+
+用按时间倒序分页的固定评论代替真实接口，验证 monitor_comments 只返回新评论，
+评论数不变时不翻页，遇到已见过的一页即停止；已见过的一级评论下的新回复也能发现。
+
+使用示例：
+python -m pytest -q test_seen_index.py
+"""
+
+import xhs_api_class
+from xhs_api_class import XhsAPI
+from xhs_utils import checkpoint_store
+from xhs_utils.seen_index import BloomFilter, SeenCommentIndex
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/abc?xsec_token=t"
+
+
+class FakeNoteAPI(XhsAPI):
+    """评论按时间倒序每页10条，comment_ids 末尾为最新评论"""
+
+    def __init__(self, count):
+        super().__init__(page_delay=0)
+        self.comment_ids = [f'c{i}' for i in range(count)]
+        self.replies = {}  # 一级评论ID -> 回复ID列表，只通过二级评论接口返回
+        self.page_fetches = 0
+        self.sub_fetches = 0
+
+    def get_note_info(self, cookies_str, url):
+        # 评论数包含回复
+        count = len(self.comment_ids) + sum(len(r) for r in self.replies.values())
+        return {'title': 'note', 'comment_count': str(count)}
+
+    def fetch_comment_page(self, cookies_str, note_params, cursor=''):
+        self.page_fetches += 1
+        start = int(cursor or 0)
+        newest_first = self.comment_ids[::-1]
+        return {
+            'comments': [{
+                'id': cid,
+                'content': cid,
+                'create_time': 1700000000000,
+                'sub_comment_count': str(len(self.replies.get(cid, []))),
+                'sub_comment_has_more': bool(self.replies.get(cid)),
+                'sub_comment_cursor': '',
+            } for cid in newest_first[start:start + 10]],
+            'cursor': str(start + 10),
+            'has_more': start + 10 < len(newest_first),
+        }
+
+    def fetch_sub_comment_page(self, cookies_str, note_id, root_comment_id, cursor, xsec_token):
+        self.sub_fetches += 1
+        return {
+            'comments': [{'id': rid, 'content': rid, 'create_time': 1700000000000} for rid in self.replies[root_comment_id]],
+            'has_more': False,
+        }
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    keys = [f'id{i}' for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f'other{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_monitor_returns_only_new_comments(tmp_path, monkeypatch):
+    monkeypatch.setattr(xhs_api_class.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(checkpoint_store, 'CHECKPOINT_BACKEND', 'none')
+    index = SeenCommentIndex(str(tmp_path / 'seen.db'))
+    api = FakeNoteAPI(95)
+
+    first = api.monitor_comments('a1=x', NOTE_URL, 'user', 'kw', interval=0, seen_index=index)
+    assert len(first) == 95
+
+    api.page_fetches = 0
+    assert api.monitor_comments('a1=x', NOTE_URL, 'user', 'kw', interval=0, seen_index=index) == []
+    assert api.page_fetches == 0  # 评论数没变，不翻页
+
+    api.comment_ids += [f'new{i}' for i in range(13)]
+    api.page_fetches = 0
+    new = api.monitor_comments('a1=x', NOTE_URL, 'user', 'kw', interval=0, seen_index=index)
+    assert sorted(item['comment_id'] for item in new) == sorted(f'new{i}' for i in range(13))
+    assert api.page_fetches == 3  # 两页含新评论，第三页全部见过即停止
+
+    # 重新打开索引后仍然记得已见过的评论
+    reopened = SeenCommentIndex(index.path)
+    assert reopened.contains('abc', 'new5')
+    assert not reopened.contains('abc', 'unknown')
+
+
+def test_monitor_finds_new_replies_under_seen_comments(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint_store, 'CHECKPOINT_BACKEND', 'none')
+    index = SeenCommentIndex(str(tmp_path / 'seen.db'))
+    api = FakeNoteAPI(95)
+    api.replies = {'c90': ['r0'], 'c20': ['r1']}
+    first = api.monitor_comments('a1=x', NOTE_URL, 'user', 'kw', interval=0, seen_index=index)
+    assert len(first) == 97
+
+    # 第1页和第8页的旧评论收到新回复，中间各页没有变化
+    api.replies['c90'].append('r2')
+    api.replies['c20'] += ['r3', 'r4']
+    api.page_fetches = api.sub_fetches = 0
+    new = api.monitor_comments('a1=x', NOTE_URL, 'user', 'kw', interval=0, seen_index=index)
+    assert sorted(item['comment_id'] for item in new) == ['r2', 'r3', 'r4']
+    assert api.sub_fetches == 2  # 只展开回复数增加了的两条
+    assert api.page_fetches == 9  # 找够评论数增量后，第9页全部已见即停止，不再翻到末页
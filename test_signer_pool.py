@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+签名进程池测试
+
+用不启动node的假进程代替NodeWorkerBackend，验证调用分发给在途请求最少的进程、
+健康检查跳过忙碌或正在检查的进程、进程退出后的重启计数，以及失败的调用换一个进程重试。
+
+使用示例：
+python -m pytest -q test_signer_pool.py
+"""
+
+import threading
+
+import pytest
+
+from xhs_utils.sign_engine import SignError, SignerPool
+
+
+class FakeWorker:
+    def __init__(self, index):
+        self.index = index
+        self.alive = False
+        self.crashed = False
+        self.pid = None
+        self.start_failures = 0
+        self.calls = 0
+        self.pings = 0
+        self.starts = 0
+        self.fail = False
+        self.gate = None
+
+    def start(self):
+        self.alive, self.crashed = True, False
+        self.starts += 1
+
+    def close(self):
+        self.alive = False
+
+    def die(self):
+        self.alive, self.crashed = False, True
+
+    def ping(self):
+        self.pings += 1
+
+    def call(self, fn, *args):
+        if not self.alive:
+            self.start()  # 与NodeWorkerBackend一样，调用时自动重启
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise SignError(f"进程{self.index}调用失败")
+        return (self.index, fn)
+
+
+def make_pool(size=3):
+    pool = SignerPool('unused.js', size=size, health_interval=0)
+    pool.workers = [FakeWorker(i) for i in range(size)]
+    pool.start()
+    return pool
+
+
+def test_calls_go_to_least_loaded_worker():
+    pool = make_pool()
+    gate = threading.Event()
+    for worker in pool.workers[:2]:
+        worker.gate = gate
+    threads = [threading.Thread(target=pool.call, args=('f',)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for _ in range(100):
+        if sum(pool._inflight) == 2:
+            break
+        threading.Event().wait(0.01)
+
+    # 进程0、1各有一个在途调用，新的调用交给空闲的进程2
+    assert pool._inflight == [1, 1, 0]
+    assert pool.call('f') == (2, 'f')
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert [stats['calls'] for stats in pool.stats()] == [1, 1, 1]
+    assert pool._inflight == [0, 0, 0]
+
+
+def test_health_check_skips_busy_and_checking_workers():
+    pool = make_pool()
+    busy = pool._acquire()
+    pool._checking.add(2)
+    pool.health_check()
+    assert [worker.pings for worker in pool.workers] == [0, 1, 0]
+    assert busy == 0
+
+    # 正在检查的进程只在没有其他进程可用时才接收调用
+    assert pool._acquire() == 1
+
+
+def test_dead_worker_is_restarted_and_counted():
+    pool = make_pool(size=2)
+    pool.workers[1].die()
+    pool.health_check()
+    assert pool.workers[1].alive and pool.workers[1].starts == 2
+    assert [stats['restarts'] for stats in pool.stats()] == [0, 1]
+
+    # 调用时发现进程已退出，重启同样计数
+    pool.workers[0].die()
+    assert pool.call('f') == (0, 'f')
+    assert [stats['restarts'] for stats in pool.stats()] == [1, 1]
+
+
+def test_failed_call_is_retried_on_another_worker():
+    pool = make_pool()
+    pool.workers[0].fail = True
+    assert pool.call('f') == (1, 'f')
+    stats = pool.stats()
+    assert (stats[0]['calls'], stats[0]['errors']) == (1, 1)
+    assert (stats[1]['calls'], stats[1]['errors']) == (1, 0)
+
+    for worker in pool.workers:
+        worker.fail = True
+    with pytest.raises(SignError):
+        pool.call('f')
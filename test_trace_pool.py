@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+x-xray-traceid 池测试
+
+用记录调用的假签名引擎验证低水位触发补充、池为空时回退到本地算法并计数，
+以及本地算法与 static/xhs_xray.js 的 traceId 格式一致（没有node时跳过比较）。
+
+使用示例：
+python -m pytest -q test_trace_pool.py
+"""
+
+import os
+import re
+import shutil
+import time
+
+import pytest
+
+from xhs_utils.sign_engine import STATIC_DIR, NodeWorkerBackend
+from xhs_utils.trace_pool import TraceIdPool, local_trace_id
+
+TRACE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class FakeEngine:
+    def __init__(self):
+        self.batches = []
+
+    def call_batch(self, fn, count):
+        self.batches.append(count)
+        return [local_trace_id() for _ in range(count)]
+
+
+def make_pool(**kwargs):
+    pool = TraceIdPool(FakeEngine(), **kwargs)
+    pool._ensure_thread = lambda: None  # 不启动后台线程，补充由测试显式调用
+    return pool
+
+
+def test_refill_triggers_below_low_water():
+    pool = make_pool(capacity=8, low_water=4, batch_size=3)
+    pool.refill()
+    assert len(pool) == 8 and pool.engine.batches == [3, 3, 2]
+
+    for _ in range(4):
+        pool.get()
+    assert not pool._refill_event.is_set()  # 剩余4个，还没有低于低水位
+    pool.get()
+    assert pool._refill_event.is_set()
+
+    pool.refill()
+    assert len(pool) == 8 and pool.engine.batches[3:] == [3, 2]
+    assert pool.fallback_count == 0
+
+
+def test_empty_pool_falls_back_to_local_id():
+    pool = make_pool(capacity=8, low_water=4)
+    trace_id = pool.get()
+    assert TRACE_ID.match(trace_id)
+    assert pool.fallback_count == 1 and pool._refill_event.is_set()
+    assert pool.engine.batches == []
+
+
+def test_background_thread_refills_pool():
+    pool = TraceIdPool(FakeEngine(), capacity=8, low_water=4, batch_size=4)
+    pool.get()
+    for _ in range(100):
+        if len(pool) == 8:
+            break
+        time.sleep(0.01)
+    assert len(pool) == 8
+
+
+def assert_trace_id_format(trace_id):
+    assert TRACE_ID.match(trace_id), trace_id
+    # 前16位为 (毫秒时间戳 << 23 | 序号)
+    assert abs((int(trace_id[:16], 16) >> 23) - time.time() * 1000) < 60_000
+
+
+def test_local_id_matches_js_format():
+    local_ids = [local_trace_id() for _ in range(3)]
+    for trace_id in local_ids:
+        assert_trace_id_format(trace_id)
+    assert len(set(local_ids)) == 3
+
+    if shutil.which('node') is None:
+        pytest.skip("没有node，跳过与JS的比较")
+    worker = NodeWorkerBackend(os.path.join(STATIC_DIR, 'xhs_xray.js'))
+    try:
+        js_ids = worker.call_batch('traceId', 3)
+    finally:
+        worker.close()
+    for trace_id in js_ids:
+        assert_trace_id_format(trace_id)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+x-s / x-s-common Python 实现与 JS 的一致性测试
+
+用固定随机种子生成 (api, data, a1) 输入，分别交给 static/xhs_xs_xsc_56.js 与
+xhs_utils/xs_encoder.py 计算并逐条比较。用例数量可通过 XHS_PARITY_CASES 调整。
+
+使用示例：
+python -m pytest -q test_xs_encoder.py
+"""
+
+import base64
+import json
+import os
+import random
+import shutil
+import string
+import subprocess
+
+import pytest
+
+from xhs_utils import xs_encoder
+from xhs_utils.sign_engine import STATIC_DIR, NodeWorkerBackend, SignError
+
+PARITY_CASES = int(os.getenv('XHS_PARITY_CASES', '2000'))
+SCRIPT_PATH = os.path.join(STATIC_DIR, 'xhs_xs_xsc_56.js')
+
+# 只加载脚本中不依赖 jsdom 的编码函数与 XsCommon，逐条计算后输出 JSON
+HELPER_HARNESS = r"""
+const fs = require('fs');
+const vm = require('vm');
+const source = fs.readFileSync(process.argv[1], 'utf8');
+function slice(start, end) {
+    const i = source.indexOf(start);
+    return source.slice(i, source.indexOf(end, i));
+}
+vm.runInThisContext(slice('var esm_typeof', '\nfunction L(h, b)'));
+vm.runInThisContext(slice('const fff', 'function get_request_headers_params'));
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+const results = cases.map((c) => {
+    const body = JSON.stringify(c.data);
+    return {
+        b64: encrypt_b64Encode(encrypt_encodeUtf8(body)),
+        mcr: encrypt_mcr(c.api + body),
+        xs_common: XsCommon(c.a1, c.xs, c.xt),
+    };
+});
+process.stdout.write(JSON.stringify(results));
+"""
+
+APIS = [
+    "/api/sns/web/v2/comment/page",
+    "/api/sns/web/v2/comment/sub/page",
+    "/api/sns/web/v1/search/notes",
+    "/api/sns/web/v1/feed",
+    "/api/sns/web/v1/comment/post",
+]
+TEXT_POOL = string.ascii_letters + string.digits + " +/=&?%_-" + "小红书评论测试中文。，！" + "😀🍜"
+
+
+def _random_text(rng, max_len=24):
+    return ''.join(rng.choice(TEXT_POOL) for _ in range(rng.randint(0, max_len)))
+
+
+def generate_cases(count, seed=20240601):
+    """生成固定的 (api, data, a1) 用例"""
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        api = rng.choice(APIS)
+        if rng.random() < 0.5:
+            api += "?note_id=" + ''.join(rng.choice('0123456789abcdef') for _ in range(24)) + "&cursor=" + _random_text(rng, 8)
+        data = {
+            "keyword": _random_text(rng),
+            "page": rng.randint(1, 50),
+            "note_id": ''.join(rng.choice('0123456789abcdef') for _ in range(24)),
+            "image_formats": ["jpg", "webp", "avif"],
+            "extra": {"need_body_topic": str(rng.randint(0, 1))},
+        }
+        # x-s 只作为 XsCommon 的输入，按 get_xs 的格式用随机 payload 拼出
+        payload = ''.join(rng.choice('0123456789abcdef') for _ in range(rng.choice([64, 128, 256])))
+        envelope = {"signSvn": "56", "signType": "x2", "appId": "xhs-pc-web", "signVersion": "1", "payload": payload}
+        xt = rng.randint(1_600_000_000_000, 1_900_000_000_000)
+        cases.append({
+            "api": api,
+            "data": data,
+            "a1": ''.join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(52)),
+            "xs": 'XYW_' + base64.b64encode(json.dumps(envelope, separators=(',', ':')).encode()).decode(),
+            "xt": xt,
+        })
+    return cases
+
+
+def test_known_vectors():
+    """与 JS 运行结果记录下来的固定值比较"""
+    assert xs_encoder.ENCRYPT_LOOKUP == "ZmserbBoHQtNP+wOcza/LpngG8yJq42KWYj0DSfdikx3VT16IlUAFM97hECvuRX5"
+    assert xs_encoder.mcr('abc') == -660815134
+    assert xs_encoder.mcr('hello world 中文') == 306706323
+    assert xs_encoder.b64_encode(xs_encoder.encode_utf8('{"a":"中文 x+y"}')) == '2UQYH0ijENjTEkyoHoW32aQR'
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="需要 node")
+def test_helpers_parity_with_js():
+    """编码函数与 XsCommon 的逐条一致性"""
+    cases = generate_cases(PARITY_CASES)
+    output = subprocess.run(
+        ['node', '-e', HELPER_HARNESS, SCRIPT_PATH],
+        input=json.dumps(cases), capture_output=True, text=True, encoding='utf-8', check=True,
+    ).stdout
+    expected = json.loads(output)
+    assert len(expected) == len(cases)
+
+    for case, js in zip(cases, expected):
+        body = json.dumps(case['data'], separators=(',', ':'), ensure_ascii=False)
+        assert xs_encoder.b64_encode(xs_encoder.encode_utf8(body)) == js['b64'], case
+        assert xs_encoder.mcr(case['api'] + body) == js['mcr'], case
+        assert xs_encoder.xs_common(case['a1'], case['xs'], case['xt']) == js['xs_common'], case
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="需要 node")
+def test_full_signature_parity_with_js():
+    """完整签名：JS 生成的 x-s-common 与用同一组 x-s/x-t 在 Python 中计算的结果一致"""
+    worker = NodeWorkerBackend(SCRIPT_PATH)
+    try:
+        worker.start()
+    except SignError as e:
+        pytest.skip(f"签名脚本无法加载（通常是缺少 jsdom）: {e}")
+    try:
+        for case in generate_cases(min(PARITY_CASES, 200)):
+            ret = worker.call('get_request_headers_params', case['api'], case['data'], case['a1'])
+            assert xs_encoder.xs_common(case['a1'], ret['xs'], ret['xt']) == ret['xs_common'], case
+    finally:
+        worker.close()
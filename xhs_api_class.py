@@ -2,27 +2,56 @@ import json
 import time
 import os
 from pathlib import Path
-from curl_cffi import requests
+from curl_cffi import requests, CurlOpt
 from urllib.parse import urlencode, urlparse, parse_qs
 import csv
 from datetime import datetime
 from mimetypes import guess_extension
 import math
 import random
+from itertools import islice
+from loguru import logger
 from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
 from xhs_utils.url_converter import convert_discovery_to_explore_url
+from xhs_utils.crawl_progress import CrawlProgress
+from xhs_utils.checkpoint_store import get_checkpoint_store
+from xhs_utils.seen_index import get_seen_index
+from xhs_utils.models import Comment, NoteInfo, MonitorRecord
+from xhs_utils.time_util import now_ms
+from xhs_utils import json_codec
+from xhs_utils.comment_page import decode_comment_page
+
+# 每个会话保持的最大连接数
+HTTP_POOL_SIZE = int(os.getenv('XHS_HTTP_POOL_SIZE', '16'))
+# HTTP版本：v2tls 表示在TLS上优先协商HTTP/2，不支持时回退HTTP/1.1
+HTTP_VERSION = os.getenv('XHS_HTTP_VERSION', 'v2tls')
+# 展开二级评论及二级评论翻页前的等待时间（秒），设为0不等待
+PAGE_DELAY = float(os.getenv('XHS_PAGE_DELAY', '2'))
+# 翻页摘要的采样间隔：第一页及之后每N页按INFO记录，其余页按DEBUG记录
+LOG_PAGE_EVERY = max(1, int(os.getenv('XHS_LOG_PAGE_EVERY', '10')))
+
+def _sub_comment_count(comment):
+    """一级评论的回复数，接口返回字符串，缺失或无法解析时为0"""
+    try:
+        return int(comment.get('sub_comment_count') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class XhsAPIBase:
+    """XhsAPI 与 AsyncXhsAPI 共用的部分
+
+    只包含URL与请求参数的构造、响应解析以及翻页进度的推进，不发起任何请求；
+    同步与异步实例各自实现请求、翻页循环与会话管理。
+    """
+
+    API_HOST = "https://edith.xiaohongshu.com"
+    COMMENT_PAGE_URI = "/api/sns/web/v2/comment/page"
+    SUB_COMMENT_PAGE_URI = "/api/sns/web/v2/comment/sub/page"
+    NOTE_FEED_URI = "/api/sns/web/v1/feed"
+    SEARCH_NOTES_URI = "/api/sns/web/v1/search/notes"
+    page_delay = PAGE_DELAY
 
-class XhsAPI():
-    """小红书API类，封装了获取评论、搜索笔记等功能"""
-    
-    def __init__(self):
-        """初始化XhsAPI类
-        
-        Args:
-            
-        """
-        self.note_list = []
-        
     def extract_url_params(self, url):
         """从URL中提取参数
         
@@ -46,112 +75,491 @@ class XhsAPI():
             "xsec_source": query_params.get("xsec_source", [""])[0]
         }
         return params
+
+    def build_search_params(self, keyword):
+        """构造搜索笔记接口的请求体
+        
+        Args:
+            keyword (str): 搜索关键词
+            
+        Returns:
+            dict: 请求体
+        """
+        return {
+            "keyword": keyword,
+            "page": 1,
+            "page_size": 20,
+            "search_id": generate_x_b3_traceid(21),
+            "sort": "general",
+            "note_type": 0,
+            "ext_flags": [],
+            "filters": [
+                {
+                    "tags": [
+                        "general"
+                    ],
+                    "type": "sort_type"
+                },
+                {
+                    "tags": [
+                        "不限"
+                    ],
+                    "type": "filter_note_type"
+                },
+                {
+                    "tags": [
+                        "不限"
+                    ],
+                    "type": "filter_note_time"
+                },
+                {
+                    "tags": [
+                        "不限"
+                    ],
+                    "type": "filter_note_range"
+                },
+                {
+                    "tags": [
+                        "不限"
+                    ],
+                    "type": "filter_pos_distance"
+                }
+            ],
+            "geo": "",
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ]
+        }
+
+    def format_comment(self, comment):
+        """将接口返回的单条评论整理为输出格式
+        
+        Args:
+            comment (dict): 接口返回的评论
+            
+        Returns:
+            Comment: 整理后的评论，可按字典方式读取
+        """
+        return Comment.from_api(comment)
+
+    def parse_note_info(self, response, url, note_params):
+        """从笔记详情接口的响应中提取笔记信息
+        
+        Args:
+            response (dict): /api/sns/web/v1/feed 的响应
+            url (str): 笔记URL
+            note_params (dict): extract_url_params 的结果
+            
+        Returns:
+            NoteInfo: 笔记信息，可按字典方式读取；获取失败时返回None
+        """
+        if response.get('code') == 0 :
+            info_data = NoteInfo.from_feed(response.get('data', {}).get('items', {})[0], url, note_params['xsec_token'])
+            logger.debug("获取笔记信息成功: {}", info_data)
+            return info_data
+        else:
+            logger.warning(f"获取笔记信息失败: {response.get('message', '未知错误')}")
+            return None
   
-    def get_comments(self, cookies_str, ori_url, cursor='',comments_list: list = [], max_comments=None):
-        """获取小红书笔记下的评论
+    def merge_note_info_with_comments(self, note_info, comments_list,userInfo,kerword):
+        """将笔记信息与评论列表合并
         
         Args:
-            ori_url (str): 笔记URL
-            cursor (str): 分页游标，默认为空
+            note_info (NoteInfo): get_note_info函数返回的笔记信息
+            comments_list (list): get_comments函数返回的评论列表
+            userInfo (str): 客户标识
+            
+        Returns:
+            list: 合并后的MonitorRecord列表，每个元素引用同一个笔记信息与单条评论，可按字典方式读取
         """
-        # 生成加密参数
-        if "discovery" in  ori_url:
-            ori_url=convert_discovery_to_explore_url(ori_url)
-            print(ori_url)
-        note_params = self.extract_url_params(ori_url)
-        uri = "/api/sns/web/v2/comment/page"
-        params = {
+        if not isinstance(note_info, NoteInfo):
+            note_info = NoteInfo(**{key: note_info.get(key, '') for key in NoteInfo.__slots__})
+        collect_ms = now_ms()  # 同一批评论使用同一个收集时间
+        return [
+            MonitorRecord(
+                note_info,
+                comment if isinstance(comment, Comment) else Comment(
+                    comment.get('content', ''), comment.get('like_count', 0), comment.get('nickname', ''),
+                    comment.get('comment_id', ''), comment.get('comment_location', '')
+                ),
+                kerword,
+                userInfo,
+                collect_ms
+            )
+            for comment in comments_list
+        ]
+
+    def _resolve_note_url(self, url):
+        """把discovery链接转换为explore链接，返回 (url, extract_url_params的结果)"""
+        if "discovery" in url:
+            url = convert_discovery_to_explore_url(url)
+        return url, self.extract_url_params(url)
+
+    def _comment_page_params(self, note_params, cursor=''):
+        """一级评论分页接口的查询参数"""
+        return {
             "note_id": note_params['note_id'],
             "cursor": cursor,
             "top_comment_id": "",
             "image_formats": "jpg,webp,avif",
             "xsec_token": note_params['xsec_token'],
         }
+
+    def _sub_comment_page_api(self, note_id, root_comment_id, cursor, xsec_token):
+        """二级评论分页接口带查询参数的路径，签名时使用同一个字符串"""
+        params = {
+            "note_id": note_id,
+            "root_comment_id": root_comment_id,
+            "num": "10",
+            "cursor": cursor,
+            "image_formats": "jpg,webp,avif",
+            "top_comment_id": "",
+            "xsec_token": xsec_token
+        }
+        return splice_str(self.SUB_COMMENT_PAGE_URI, params)
+
+    def _note_feed_params(self, note_params):
+        """笔记详情接口的请求体"""
+        return {
+            "source_note_id": note_params['note_id'],
+            "xsec_token": note_params['xsec_token'],
+            "xsec_source": note_params['xsec_source'],
+            "image_formats": [
+                "jpg",
+                "webp",
+                "avif"
+            ],
+            "extra": {
+                "need_body_topic": "1"
+            }
+        }
+
+    def _parse_search_notes(self, response):
+        """从搜索笔记接口的响应中取出带note_card的条目，响应异常时返回None"""
+        if not response or not isinstance(response, dict) or 'data' not in response:
+            return None
+        notes = []
+        for item in response.get('data', {}).get('items', []):
+            if item.get('note_card'):
+                note_id = item.get('id')
+                xsec_token = item.get('xsec_token')
+                notes.append({
+                    'title': item.get('note_card').get('display_title'),
+                    'note_id': note_id,
+                    'xsec_token': xsec_token,
+                    'url': f'https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_feed'
+                })
+        return notes
+
+    def _start_progress(self, note_params, cursor='', progress=None):
+        """没有传入或读到断点时新建进度，否则补全进度中的note_id"""
+        if progress is None:
+            return CrawlProgress(note_params['note_id'], cursor)
+        if not progress.note_id:
+            progress.note_id = note_params['note_id']
+        return progress
+
+    def _walk_comment_page(self, progress, comments, expand_when=None):
+        """按进度依次给出一页一级评论中要产出的内容
+
+        产出 (评论, None) 表示一条整理后的评论，(None, 原始一级评论) 表示接着展开该评论的二级评论；
+        从断点继续时跳过当前页已经产出过的条目，page_offset、count 与 sub_cursors 在产出前更新。
+        传入expand_when时只展开它返回True的一级评论，其余只产出自带的子评论。
+        """
+        skip = progress.page_offset
+        for comment in comments:
+            items = [comment] + (comment.get('sub_comments') or [])  # 一级评论会自带一个子评论，接口可能返回null
+            if skip >= len(items):
+                # 整条已产出，其二级评论要么已展开完，要么记录在sub_cursors中已先行续爬
+                skip -= len(items)
+                continue
+            items, skip = items[skip:], 0
+
+            sub_has_more = comment.get('sub_comment_has_more') == True  # 自带的子评论是否还可展开
+            if sub_has_more and expand_when is not None:
+                sub_has_more = expand_when(comment)
+            for i, item in enumerate(items, 1):
+                if sub_has_more and i == len(items):
+                    # 产出这条评论的最后一项前登记二级评论游标，调用方恰好停在这里时续爬会先展开它
+                    progress.sub_cursors[comment.get('id', '')] = comment.get('sub_comment_cursor', '')
+                progress.page_offset += 1
+                progress.count += 1
+                yield self.format_comment(item), None
+
+            if sub_has_more:
+                yield None, comment
+
+    def _advance_comment_page(self, progress, page):
+        # 当前页处理完才推进游标，中途停止时进度仍指向当前页
+        progress.cursor = page.get('cursor', '')
+        progress.has_more = page.get('has_more') == True  # 是否有下一页
+        progress.page_offset = 0
+
+    def _walk_sub_comment_page(self, progress, root_comment_id, comments):
+        """依次给出一页二级评论中整理后的评论，从断点继续时跳过该页已经产出过的条目"""
+        for comment in comments[progress.sub_offsets.get(root_comment_id, 0):]:
+            progress.sub_offsets[root_comment_id] = progress.sub_offsets.get(root_comment_id, 0) + 1
+            yield self.format_comment(comment)
+
+    def _advance_sub_comment_page(self, progress, root_comment_id, page):
+        """一页二级评论处理完后更新进度，返回下一页的游标，没有下一页时返回None"""
+        progress.sub_offsets.pop(root_comment_id, None)
+        if page.get('has_more') != True:
+            progress.sub_cursors.pop(root_comment_id, None)
+            return None
+        cursor = page.get('cursor', '')
+        progress.sub_cursors[root_comment_id] = cursor
+        return cursor
+
+    def _log_comment_page(self, progress, pages, page_size):
+        # 按页记录摘要而不是逐条输出评论，INFO级别再按页采样；参数延迟格式化，级别关闭时几乎没有开销
+        level = 'INFO' if pages == 1 or pages % LOG_PAGE_EVERY == 0 else 'DEBUG'
+        logger.log(level, "笔记{}第{}页获取{}条一级评论，此前累计{}条", progress.note_id, pages, page_size, progress.count)
+
+    def _log_comment_summary(self, progress, pages):
+        if pages:
+            logger.info("笔记{}评论获取结束：共{}页，累计{}条，{}", progress.note_id, pages, progress.count,
+                        "已到末页" if progress.finished else "未到末页")
+
+
+class XhsAPI(XhsAPIBase):
+    """小红书API类，封装了获取评论、搜索笔记等功能"""
+    
+    def __init__(self, session=None, pool_size=HTTP_POOL_SIZE, http_version=HTTP_VERSION, page_delay=PAGE_DELAY):
+        """初始化XhsAPI类
         
-        # 使用硬编码的cookies字符串（与search_by_keyword相同的逻辑）
+        Args:
+            session (requests.Session): 共享的会话，默认由实例自行创建并在close时关闭
+            pool_size (int): 会话保持的最大连接数
+            http_version (str): HTTP版本，如v2tls、v1_1
+            page_delay (float): 展开二级评论及二级评论翻页前的等待时间（秒），0表示不等待
+        """
+        self.note_list = []
+        self.pool_size = pool_size
+        self.http_version = http_version
+        self.page_delay = page_delay
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def session(self):
+        """复用连接的会话，首次使用时创建
+
+        同一个会话内保持与 edith.xiaohongshu.com 和图片CDN的长连接，
+        每页评论不再重新进行TLS握手。curl句柄按线程隔离，可在多线程中共用。
+        """
+        if self._session is None:
+            self._session = requests.Session(
+                http_version=self.http_version,
+                # 不同请求使用不同账号的cookies，响应中的cookies不写回会话
+                discard_cookies=True,
+                curl_options={
+                    CurlOpt.MAXCONNECTS: self.pool_size,
+                    CurlOpt.TCP_KEEPALIVE: 1,
+                },
+            )
+        return self._session
+
+    def close(self):
+        """关闭自行创建的会话，释放连接"""
+        if self._session is not None and self._owns_session:
+            self._session.close()
+        self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
         
+    def fetch_comment_page(self, cookies_str, note_params, cursor=''):
+        """请求一页一级评论
         
-        headers, cookies, data = generate_request_params(cookies_str, uri, params)
-        url = "https://edith.xiaohongshu.com/api/sns/web/v2/comment/page"
+        Args:
+            cookies_str (str): Cookies字符串
+            note_params (dict): extract_url_params 的结果
+            cursor (str): 分页游标
+            
+        Returns:
+            dict: 响应中的data部分（msgspec解码时为可按字典方式读取的分页对象），请求失败或数据异常时返回None
+        """
+        params = self._comment_page_params(note_params, cursor)
+        headers, cookies, data = generate_request_params(cookies_str, self.COMMENT_PAGE_URI, params)
+        try:
+            page = decode_comment_page(self.session.get(self.API_HOST + self.COMMENT_PAGE_URI, headers=headers, cookies=cookies, params=params).content)
+            if page is None:
+                logger.warning("API响应数据异常，停止获取评论")
+                return None
+        except Exception as e:
+            logger.error(f"获取评论时发生异常: {e}，停止获取评论")
+            return None
+        return page
 
+    def fetch_sub_comment_page(self, cookies_str, note_id, root_comment_id, cursor, xsec_token):
+        """请求一页二级评论
+        
+        Args:
+            note_id (str): 笔记ID
+            root_comment_id (str): 根评论ID
+            cursor (str): 分页游标
+            xsec_token (str): 安全令牌
+            
+        Returns:
+            dict: 响应中的data部分（msgspec解码时为可按字典方式读取的分页对象），请求失败或数据异常时返回None
+        """
+        splice_api = self._sub_comment_page_api(note_id, root_comment_id, cursor, xsec_token)
+        headers, cookies, data = generate_request_params(cookies_str, splice_api)
         try:
-            response = requests.get(url, headers=headers, cookies=cookies, params=params).json()
-            if not response or not isinstance(response, dict) or 'data' not in response:
-                print("API响应数据异常，返回当前评论列表")
-                return comments_list
-            comments = response.get('data', {}).get('comments', [])
+            page = decode_comment_page(self.session.get(self.API_HOST + splice_api, headers=headers, cookies=cookies).content)
+            if page is None:
+                logger.warning("二级评论API响应数据异常，停止获取二级评论")
+                return None
         except Exception as e:
-            print(f"获取评论时发生异常: {e}，返回当前评论列表")
-            return comments_list
+            logger.error(f"获取二级评论时发生异常: {e}，停止获取二级评论")
+            return None
+        return page
+
+    def iter_comments(self, cookies_str, ori_url, cursor='', max_comments=None, progress=None, checkpoint=None, stop_when=None, expand_when=None):
+        """逐页获取笔记评论，每解析一条就产出一条
         
-        print(f"成功获取{len(comments)}条评论")
+        以循环代替递归翻页，内存中只保留当前页；达到max_comments后立即停止，不再请求后续页面。
         
-        for comment in comments:
-            # 检查是否已达到最大评论数量
-            if max_comments and len(comments_list) >= max_comments:
-                return comments_list
-                
-            format_dict = {
-                'content': comment.get('content', ''),  # 内容
-                'like_count': comment.get('like_count', 0),  # 点赞数
-                'nickname': comment.get('user_info', {}).get('nickname', ''),  # 昵称
-                'comment_id': comment.get('id', ''),  # 评论ID
-                'comment_location': comment.get('ip_location', ''),  # IP位置
-                'note_time': datetime.fromtimestamp(int(int(comment.get('create_time', ''))/1000)).strftime("%Y-%m-%d %H:%M:%S")  # 笔记创建时间
-            }
-            comments_list.append(format_dict)
-            print(comments_list)  # 打印评论list
-            # 检查是否已达到最大评论数量
-            if max_comments and len(comments_list) >= max_comments:
-                return comments_list 
+        Args:
+            cookies_str (str): Cookies字符串
+            ori_url (str): 笔记URL
+            cursor (str): 起始分页游标，默认为空
+            max_comments (int): 最多产出的评论数量
+            progress (CrawlProgress): 爬取进度，翻页时就地更新；传入已有进度时从该进度继续
+            checkpoint (CheckpointStore): 断点存储；未传入progress时从断点继续，每翻一页及停止时保存进度
+            stop_when (callable): 接收一页原始一级评论列表，返回True时不再产出该页并结束翻页
+            expand_when (callable): 接收一条还有更多回复的原始一级评论，返回False时不翻页展开它的二级评论
             
-            # if comment.get('pictures'):
-            #     for image_list in comment.get('pictures'):
-            #         image_url = image_list.get('url_default', '')  # 获取图片链接
-            #         self.download_image_with_date(image_url, date_format="%Y%m%d_%H%M%S")
-    
-            for sub_comment in comment['sub_comments']:  # 一级评论会自带一个子评论
-                # 检查是否已达到最大评论数量
-                if max_comments and len(comments_list) >= max_comments:
-                    return comments_list 
-                    
-                format_dict = {
-                    'content': sub_comment.get('content', ''),  # 内容
-                    'like_count': sub_comment.get('like_count', 0),  # 点赞数
-                    'nickname': sub_comment.get('user_info', {}).get('nickname', ''),  # 昵称
-                    'comment_id': sub_comment.get('id', ''),  # 评论ID
-                    'comment_location': sub_comment.get('ip_location', ''),  # IP位置
-                    'note_time': datetime.fromtimestamp(int(int(sub_comment.get('create_time', ''))/1000)).strftime("%Y-%m-%d %H:%M:%S")  # 笔记创建时间
-                }
-                comments_list.append(format_dict)
-                print(comments_list)  # 打印评论list
-                
-            if comment.get('sub_comment_has_more') == True:  # 自带的子评论是否还可展开
-                # 检查是否已达到最大评论数量
-                if max_comments and len(comments_list) >= max_comments:
-                    return comments_list
-                    
-                time.sleep(2)
-                self.get_sub_comments(
-                    cookies_str,
-                    comment.get('note_id', note_params['note_id']),
-                    comment.get('id', ''),
-                    comment.get('sub_comment_cursor', ''),
-                    note_params['xsec_token'],
-                    comments_list,
-                    max_comments
-                )
+        Yields:
+            dict: 整理后的评论
+        """
+        comments = self._iter_comment_pages(cookies_str, ori_url, cursor, progress, checkpoint, stop_when, expand_when)
+        if max_comments:
+            comments = islice(comments, max_comments)
+        return comments
+
+    def _iter_comment_pages(self, cookies_str, ori_url, cursor, progress, checkpoint=None, stop_when=None, expand_when=None):
+        ori_url, note_params = self._resolve_note_url(ori_url)
+        if progress is None and checkpoint is not None:
+            progress = checkpoint.load(note_params['note_id'])
+            if progress is not None:
+                logger.info(f"从断点继续爬取评论: {progress.to_dict()}")
+        progress = self._start_progress(note_params, cursor, progress)
+        pages = 0
+
+        try:
+            # 先把上次未展开完的二级评论取完
+            for root_comment_id, sub_cursor in list(progress.sub_cursors.items()):
+                for item in self._iter_sub_comment_pages(cookies_str, note_params['note_id'], root_comment_id, sub_cursor, note_params['xsec_token'], progress, checkpoint):
+                    progress.count += 1
+                    yield item
+
+            while progress.has_more:
+                page = self.fetch_comment_page(cookies_str, note_params, progress.cursor)
+                if page is None:
+                    return
+                comments = page.get('comments', [])
+                pages += 1
+                self._log_comment_page(progress, pages, len(comments))
+                if stop_when is not None and progress.page_offset == 0 and stop_when(comments):
+                    progress.has_more = False
+                    return
+
+                for item, expand in self._walk_comment_page(progress, comments, expand_when):
+                    if expand is None:
+                        yield item
+                        continue
+                    time.sleep(self.page_delay)
+                    for item in self._iter_sub_comment_pages(
+                        cookies_str,
+                        expand.get('note_id', note_params['note_id']),
+                        expand.get('id', ''),
+                        expand.get('sub_comment_cursor', ''),
+                        note_params['xsec_token'],
+                        progress,
+                        checkpoint
+                    ):
+                        progress.count += 1
+                        yield item
+
+                self._advance_comment_page(progress, page)
+                if checkpoint is not None:
+                    checkpoint.commit(progress)
+        finally:
+            # 出错、达到数量上限或调用方提前停止时都记录断点
+            if checkpoint is not None:
+                checkpoint.commit(progress)
+            self._log_comment_summary(progress, pages)
+
+    def iter_sub_comments(self, cookies_str, note_id, root_comment_id, cursor, xsec_token, max_comments=None, progress=None):
+        """逐页获取某条评论下的二级评论，每解析一条就产出一条
+        
+        Args:
+            note_id (str): 笔记ID
+            root_comment_id (str): 根评论ID
+            cursor (str): 分页游标
+            xsec_token (str): 安全令牌
+            max_comments (int): 最多产出的评论数量
+            progress (CrawlProgress): 爬取进度，翻页时更新其中的二级评论游标
+            
+        Yields:
+            dict: 整理后的评论
+        """
+        comments = self._iter_sub_comment_pages(cookies_str, note_id, root_comment_id, cursor, xsec_token, progress)
+        if max_comments:
+            comments = islice(comments, max_comments)
+        return comments
+
+    def _iter_sub_comment_pages(self, cookies_str, note_id, root_comment_id, cursor, xsec_token, progress=None, checkpoint=None):
+        if progress is None:
+            progress = CrawlProgress(note_id, cursor)
+        progress.sub_cursors[root_comment_id] = cursor
+        while True:
+            page = self.fetch_sub_comment_page(cookies_str, note_id, root_comment_id, cursor, xsec_token)
+            if page is None:
+                return
+            comments = page.get('comments', [])
+            logger.debug(f"获取二级评论成功，共{len(comments)}条")
+            yield from self._walk_sub_comment_page(progress, root_comment_id, comments)
+
+            cursor = self._advance_sub_comment_page(progress, root_comment_id, page)
+            if checkpoint is not None:
+                checkpoint.commit(progress)
+            if cursor is None:
+                return
+            time.sleep(self.page_delay)
+
+    def get_comments(self, cookies_str, ori_url, cursor='', comments_list: list = None, max_comments=None, checkpoint=None):
+        """获取小红书笔记下的评论
         
-        if response.get('data').get('has_more') == True:  # 是否有下一页
-            # 检查是否已达到最大评论数量
-            if max_comments and len(comments_list) >= max_comments:
+        Args:
+            ori_url (str): 笔记URL
+            cursor (str): 分页游标，默认为空
+            comments_list (list): 追加结果的列表，默认新建
+            max_comments (int): comments_list的最大长度
+            checkpoint (CheckpointStore): 断点存储，传入时从上次中断的位置继续
+            
+        Returns:
+            list: 评论列表
+        """
+        if comments_list is None:
+            comments_list = []
+        if max_comments:
+            remaining = max_comments - len(comments_list)
+            if remaining <= 0:
                 return comments_list
-                
-            new_cursor = response.get('data', {}).get('cursor', '')
-            self.get_comments(cookies_str,ori_url, new_cursor,comments_list, max_comments)
+            comments_list.extend(self.iter_comments(cookies_str, ori_url, cursor, max_comments=remaining, checkpoint=checkpoint))
+        else:
+            comments_list.extend(self.iter_comments(cookies_str, ori_url, cursor, checkpoint=checkpoint))
         return comments_list
             
-    def get_sub_comments(self, cookies_str, note_id, root_comment_id, cursor, xsec_token,comments_list: list = [], max_comments=None):
+    def get_sub_comments(self, cookies_str, note_id, root_comment_id, cursor, xsec_token, comments_list: list = None, max_comments=None):
         """获取小红书笔记的二级评论
         
         Args:
@@ -159,66 +567,21 @@ class XhsAPI():
             root_comment_id (str): 根评论ID
             cursor (str): 分页游标
             xsec_token (str): 安全令牌
-        """
-        # 生成加密参数
-        uri = "/api/sns/web/v2/comment/sub/page"
-        params = {
-            "note_id": note_id,
-            "root_comment_id": root_comment_id,
-            "num": "10",
-            "cursor": cursor,
-            "image_formats": "jpg,webp,avif",
-            "top_comment_id": "",
-            "xsec_token": xsec_token
-        }
-        splice_api = splice_str(uri, params)
-        headers, cookies, data = generate_request_params(cookies_str, splice_api)
-        # url = "https://edith.xiaohongshu.com/api/sns/web/v2/comment/sub/page"
-        
-        
-        try:
-            response = requests.get("https://edith.xiaohongshu.com"+splice_api, headers=headers, cookies=cookies).json()
-            if not response or not isinstance(response, dict) or 'data' not in response:
-                print("二级评论API响应数据异常，返回当前评论列表")
-                return comments_list
-            print(f"获取二级评论成功，共{len(response.get('data', {}).get('comments', []))}条")
-            comments = response.get('data', {}).get('comments', [])
-        except Exception as e:
-            print(f"获取二级评论时发生异常: {e}，返回当前评论列表")
-            return comments_list
-        for comment in comments:
-            # 检查是否已达到最大评论数量
-            if max_comments and len(comments_list) >= max_comments:
-                return 
-                
-            format_dict = {
-                'content': comment.get('content', ''),  # 内容
-                'like_count': comment.get('like_count', 0),  # 点赞数
-                'nickname': comment.get('user_info', {}).get('nickname', ''),  # 昵称
-                'comment_id': comment.get('id', ''),  # 评论ID,
-                'comment_location': comment.get('ip_location', ''),  # IP位置
-                'note_time': datetime.fromtimestamp(int(int(comment.get('create_time', ''))/1000)).strftime("%Y-%m-%d %H:%M:%S")  # 笔记创建时间
-            }
+            comments_list (list): 追加结果的列表，默认新建
+            max_comments (int): comments_list的最大长度
             
-            comments_list.append(format_dict)
-            print(format_dict)
-            
-            if comment.get('pictures'):
-                for image_list in comment.get('pictures'):
-                    image_url = image_list.get('url_default', '')  # 获取图片链接
-                    #图片下载
-                    # self.download_image_with_date(image_url, date_format="%Y%m%d_%H%M%S")
-        
-        time.sleep(2)
-        # 如果还有更多评论，继续获取
-        # print(f'二级评论response{response}')
-        if response and response.get('data').get('has_more') == True:
-            # 检查是否已达到最大评论数量
-            if max_comments and len(comments_list) >= max_comments:
+        Returns:
+            list: 评论列表
+        """
+        if comments_list is None:
+            comments_list = []
+        if max_comments:
+            remaining = max_comments - len(comments_list)
+            if remaining <= 0:
                 return comments_list
-                
-            new_sub_cursor = response.get('data', {}).get('cursor', '')
-            self.get_sub_comments(cookies_str,note_id, root_comment_id, new_sub_cursor, xsec_token,comments_list, max_comments)
+            comments_list.extend(self.iter_sub_comments(cookies_str, note_id, root_comment_id, cursor, xsec_token, max_comments=remaining))
+        else:
+            comments_list.extend(self.iter_sub_comments(cookies_str, note_id, root_comment_id, cursor, xsec_token))
         return comments_list
     
     def download_image_with_date(self, url, save_dir="images", date_format="%Y%m%d_%H%M%S", 
@@ -237,7 +600,7 @@ class XhsAPI():
         """
         try:
             os.makedirs(save_dir, exist_ok=True)
-            response = requests.get(url, stream=True, timeout=10)
+            response = self.session.get(url, stream=True, timeout=10)
             response.raise_for_status()
 
             # 生成基础日期部分
@@ -270,12 +633,13 @@ class XhsAPI():
                 for chunk in response.iter_content():
                     if chunk:
                         f.write(chunk)
+            response.close()
 
-            print(f"保存成功: {save_path}")
+            logger.info(f"保存成功: {save_path}")
             return True
 
         except Exception as e:
-            print(f"错误: {str(e)}")
+            logger.error(f"错误: {str(e)}")
             return False
 
     def search_notes_by_keyword(self, cookies_str, keyword, num):
@@ -287,72 +651,26 @@ class XhsAPI():
         """
         for p in range(1000):
             uri = "/api/sns/web/v1/search/notes"
-            params = {
-                "keyword": keyword,
-                "page": 1,
-                "page_size": 20,
-                "search_id": generate_x_b3_traceid(21),
-                "sort": "general",
-                "note_type": 0,
-                "ext_flags": [],
-                "filters": [
-                    {
-                        "tags": [
-                            "general"
-                        ],
-                        "type": "sort_type"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_note_type"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_note_time"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_note_range"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_pos_distance"
-                    }
-                ],
-                "geo": "",
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ]
-            }
+            params = self.build_search_params(keyword)
             
             final_uri = f"{uri}?{params}"
-            print(final_uri)
+            logger.debug(final_uri)
             
             # 这里需要实现具体的搜索逻辑
             # 暂时使用硬编码的cookies字符串
             headers, cookies, data = generate_request_params(cookies_str, uri, params)
             url = "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes"
             try:
-                response_obj = requests.post(url, headers=headers, cookies=cookies, data=data.encode('utf-8'))
-                response = response_obj.json()
-                print(f"API响应状态码: {response_obj.status_code}")
-                print(f"API响应内容: {response}")
+                response_obj = self.session.post(url, headers=headers, cookies=cookies, data=data)
+                response = json_codec.loads(response_obj.content)
+                logger.debug(f"API响应状态码: {response_obj.status_code}")
+                logger.debug(f"API响应内容: {response}")
             except Exception as e:
-                print(f"API请求失败: {e}")
+                logger.error(f"API请求失败: {e}")
                 continue
                 
             if not response or not isinstance(response, dict):
-                print("API响应为空或格式错误")
+                logger.warning("API响应为空或格式错误")
                 continue
                 
             for item in response.get('data', {}).get('items', []):
@@ -365,83 +683,39 @@ class XhsAPI():
                         'xsec_token': xsec_token,
                         'url': f'https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_feed'
                     }
-                    print(format_dict)
+                    logger.debug(format_dict)
                     self.note_list.append({'title': format_dict['title'], 'url': format_dict['url']})
                     if len(self.note_list) >= num:
                         return self.note_list
 
-    def search_comments_by_keyword(self, cookies_str, keyword, num, comments_list: list = []):
+    def search_comments_by_keyword(self, cookies_str, keyword, num, comments_list: list = None):
         """根据关键词搜索的笔记下面的评论
         
         Args:
             keyword (str): 搜索关键词
             num (int): 搜索的评论数量
         """
+        if comments_list is None:
+            comments_list = []
         
         for p in range(1000):
             uri = "/api/sns/web/v1/search/notes"
-            params = {
-                "keyword": keyword,
-                "page": 1,
-                "page_size": 20,
-                "search_id": generate_x_b3_traceid(21),
-                "sort": "general",
-                "note_type": 0,
-                "ext_flags": [],
-                "filters": [
-                    {
-                        "tags": [
-                            "general"
-                        ],
-                        "type": "sort_type"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_note_type"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_note_time"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_note_range"
-                    },
-                    {
-                        "tags": [
-                            "不限"
-                        ],
-                        "type": "filter_pos_distance"
-                    }
-                ],
-                "geo": "",
-                "image_formats": [
-                    "jpg",
-                    "webp",
-                    "avif"
-                ]
-            }
+            params = self.build_search_params(keyword)
             
             final_uri = f"{uri}?{params}"
-            print(final_uri)
+            logger.debug(final_uri)
             
             # 这里需要实现具体的搜索逻辑
             # 暂时使用硬编码的cookies字符串
             headers, cookies, data = generate_request_params(cookies_str, uri, params)
             url = "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes"
             try:
-                response = requests.post(url, headers=headers, cookies=cookies, data=data.encode('utf-8')).json()
+                response = json_codec.loads(self.session.post(url, headers=headers, cookies=cookies, data=data).content)
                 if not response or not isinstance(response, dict) or 'data' not in response:
-                    print("搜索笔记API响应数据异常，返回当前评论列表")
+                    logger.warning("搜索笔记API响应数据异常，返回当前评论列表")
                     return comments_list
             except Exception as e:
-                print(f"搜索笔记时发生异常: {e}，返回当前评论列表")
+                logger.error(f"搜索笔记时发生异常: {e}，返回当前评论列表")
                 return comments_list
             for item in response.get('data', {}).get('items', []):
                 note_id = item.get('id')
@@ -453,7 +727,7 @@ class XhsAPI():
                         'xsec_token': xsec_token,
                         'url': f'https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_feed'
                     }
-                    print(format_dict)
+                    logger.debug(format_dict)
                     
                     # 每爬一篇笔记，就立即爬取该笔记下的评论
                     # 计算还需要多少条评论
@@ -467,50 +741,6 @@ class XhsAPI():
         # 如果循环结束仍未收集到足够的评论，返回已收集到的评论
         return comments_list
 
-    def merge_note_info_with_comments(self, note_info, comments_list,userInfo,kerword):
-        """将笔记信息与评论列表合并
-        
-        Args:
-            note_info (dict): get_note_info函数返回的笔记信息字典
-            comments_list (list): get_comments函数返回的评论列表
-            userInfo (str): 客户标识
-            
-        Returns:
-            list: 合并后的数据列表，每个元素包含笔记信息和单条评论信息
-        """
-        merged_data = []
-        
-        for comment in comments_list:
-            # 创建合并后的数据字典
-            merged_item = {
-                # 笔记信息
-                'keyword':kerword,
-                'title': note_info.get('title', ''),
-                'note_author': note_info.get('author', ''),
-                'userInfo': userInfo,  # 客户标识
-                'content': comment.get('content', ''),
-                'likes': note_info.get('like_count', 0),
-                'collects': note_info.get('collected_count', 0),
-                'comments': note_info.get('comment_count', 0),
-                'note_url': note_info.get('note_url', ''),
-                'collect_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # 收藏时间
-                'note_time': note_info.get('note_time', ''),  # 笔记创建时间
-                'note_location': note_info.get('location', ''),
-                'note_type': note_info.get('note_type', ''),
-                
-                # 评论信息
-                'comment_location': comment.get('comment_location', ''),
-                'comment_id': comment.get('comment_id', ''),
-                'commenter_nickname': comment.get('nickname', ''),
-                
-                
-                
-            }
-            merged_data.append(merged_item)
-            
-        return merged_data
- 
-    
     def get_note_info(self, cookies_str, url):
         """获取小红书笔记信息
         Args:
@@ -518,71 +748,108 @@ class XhsAPI():
             note_id (str): 笔记ID
             xsec_token (str): 安全令牌
         """
-        if "discovery" in  url:
-            url=convert_discovery_to_explore_url(url)
-        note_params = self.extract_url_params(url)
-        uri = "/api/sns/web/v1/feed"
-        params = {
-            "source_note_id": note_params['note_id'],
-            "xsec_token": note_params['xsec_token'],
-            "xsec_source": note_params['xsec_source'],
-            "image_formats": [
-                "jpg",
-                "webp",
-                "avif"
-            ],
-            "extra": {
-                "need_body_topic": "1"
-            }
-        }
-        # splice_api = splice_str(uri, params)
-        headers, cookies, data = generate_request_params(cookies_str, uri, params)
-        response = requests.post("https://edith.xiaohongshu.com"+uri, headers=headers, cookies=cookies, data=data.encode('utf-8')).json()
-        
-        if response.get('code') == 0 :
-            info_data={
-                'note_type': response.get('data', {}).get('items', {})[0].get('model_type', {}),#笔记类型
-                'note_id': response.get('data', {}).get('items', {})[0].get('note_card').get('note_id', ''),  # 笔记ID
-                'title': response.get('data', {}).get('items', {})[0].get('note_card').get('title', ''),  # 笔记标题
-                'like_count': response.get('data', {}).get('items', {})[0].get('note_card').get('interact_info').get('liked_count', 0),  # 点赞数
-                'collected_count': response.get('data', {}).get('items', {})[0].get('note_card').get('interact_info').get('collected_count', 0),  # 收藏数
-                'comment_count': response.get('data', {}).get('items', {})[0].get('note_card').get('interact_info').get('comment_count', 0),  # 评论数
-                'note_url': url,  # 笔记URL
-                'xsec_token': note_params['xsec_token'],  # 安全令牌
-                'location': response.get('data', {}).get('items', {})[0].get('note_card').get('ip_location', ''),  # 位置
-                'author': response.get('data', {}).get('items', {})[0].get('note_card', {}).get('user', '').get('nickname'),  # 作者昵称
-            }
-            print(f"获取笔记信息成功: {info_data}")
-            return info_data
-        else:
-            print(f"获取笔记信息失败: {response.get('message', '未知错误')}")
-            return None
-        print(response)
+        url, note_params = self._resolve_note_url(url)
+        headers, cookies, data = generate_request_params(cookies_str, self.NOTE_FEED_URI, self._note_feed_params(note_params))
+        response = json_codec.loads(self.session.post(self.API_HOST + self.NOTE_FEED_URI, headers=headers, cookies=cookies, data=data).content)
+        return self.parse_note_info(response, url, note_params)
     
-    def monitor_comments(self, cookies_str, note_url,userInfo,keyword, interval=60):
-        """监控笔记评论变化
+    def monitor_comments(self, cookies_str, note_url,userInfo,keyword, interval=60, seen_index=None):
+        """增量监控笔记评论，只返回上次检查之后新出现的评论
+        
+        先比较笔记的评论数（包含回复）与上次快照，没有变化时不翻页；有变化时从第一页开始翻页。
+        每条一级评论的回复数记录在已见索引中，只展开新出现或回复数增加了的一级评论；
+        遇到一级评论全部已见过、回复数都没变、且找到的新评论已经补足评论数增量的一页即停止。
+        上次翻页中断时从断点继续。
+        
         Args:
             cookies_str (str): Cookies字符串
             note_url (str): 笔记URL
             userInfo (str): 客户标识
             keyword (str): 关键词
-            interval (int): 检查间隔时间（秒）
+            interval (int): 检查间隔时间（秒），距上次检查不足该时间时直接返回空列表
+            seen_index (SeenCommentIndex): 已见评论索引，默认使用 XHS_SEEN_INDEX_PATH
+            
+        Returns:
+            list: 新评论与笔记信息合并后的数据；没有新评论时返回空列表，获取失败时返回None
         """
+        if seen_index is None:
+            seen_index = get_seen_index()
+        if "discovery" in note_url:
+            note_url = convert_discovery_to_explore_url(note_url)
+        note_id = self.extract_url_params(note_url)['note_id']
+
+        snapshot = seen_index.get_snapshot(note_id)
+        if snapshot is not None and interval and time.time() - snapshot[1] < interval:
+            logger.debug(f"距上次检查不足{interval}秒，跳过")
+            return []
+
         #笔记基本信息
         note_info=self.get_note_info(cookies_str,note_url)
-        # if note_info.get('comment_count', 0) != xxx: 如果笔记的评论数和上一次获取的评论数不同，才监控
-        
-          
-        #笔记的评论内容
+        if not note_info:
+            return None
+        comment_count = str(note_info.get('comment_count', ''))
+        checkpoint = get_checkpoint_store()
+        progress = checkpoint.load(note_id) if checkpoint is not None else None
+        resuming = progress is not None
+        if snapshot is not None and snapshot[0] == comment_count and not resuming:
+            logger.info(f"评论数没有变化（{comment_count}），跳过")
+            seen_index.set_snapshot(note_id, comment_count)
+            return []
+
+        #笔记的评论内容，只保留没见过的
+        if progress is None:
+            progress = CrawlProgress(note_id)
+        # 两次检查之间评论数的增量；新评论还没找够时，已见区域之后仍可能有收到新回复的一级评论
+        expected_new = None
+        if snapshot is not None and not resuming:
+            try:
+                expected_new = int(comment_count) - int(snapshot[0])
+            except (TypeError, ValueError):
+                pass
         comments_list = []
-        comments_list = self.get_comments(cookies_str, note_url, comments_list=comments_list)
-        print(f'一共收集到{len(comments_list)}条评论')
-        merge_info = self.merge_note_info_with_comments(note_info, comments_list,userInfo,keyword)
-        
-        print(merge_info)
+        root_counts = {}   # 本次翻到的一级评论 -> 回复数
+        known_counts = {}  # 一级评论上次记录的回复数
+        reached_seen = []
+
+        def replies_grown(comment):
+            # 没有记录过的一级评论（新评论或索引中缺少回复数）按有新回复处理
+            comment_id = comment.get('id', '')
+            return comment_id not in known_counts or root_counts.get(comment_id, 0) > known_counts[comment_id]
+
+        def all_seen(comments):
+            ids = [c.get('id', '') for c in comments]
+            known_counts.update(seen_index.sub_comment_counts(note_id, ids))
+            for comment in comments:
+                root_counts[comment.get('id', '')] = _sub_comment_count(comment)
+            if not comments or not all(seen_index.contains(note_id, i) for i in ids):
+                return False
+            if any(replies_grown(c) for c in comments):
+                return False
+            if expected_new is not None and len(comments_list) < expected_new:
+                return False
+            reached_seen.append(True)
+            return True
+
+        for comment in self.iter_comments(cookies_str, note_url, progress=progress, checkpoint=checkpoint,
+                                          stop_when=all_seen, expand_when=replies_grown):
+            if not seen_index.contains(note_id, comment['comment_id']):
+                comments_list.append(comment)
+        seen_index.add(note_id, [c['comment_id'] for c in comments_list])
+        # 回复已经全部展开的一级评论才记录回复数，没展开完的下次仍按有新回复处理
+        seen_index.set_sub_comment_counts(note_id, {
+            comment_id: count for comment_id, count in root_counts.items() if comment_id not in progress.sub_cursors
+        })
+        logger.info(f'一共收集到{len(comments_list)}条新评论')
+
+        # 从第一页完整处理到末尾或已见区域时才更新快照；断点续爬跳过了期间新增的头部评论，留到下次检查
+        if not resuming and (reached_seen or progress.finished):
+            seen_index.set_snapshot(note_id, comment_count)
+
         if not comments_list:
-            print("没有获取到评论")
-            return None
+            logger.info("没有新评论")
+            return []
+        merge_info = self.merge_note_info_with_comments(note_info, comments_list,userInfo,keyword)
+        logger.debug("合并数据: {}", merge_info)
         return merge_info
     
     def reply_comment(self,cookies_str, note_url, comment_id, content):
@@ -606,12 +873,12 @@ class XhsAPI():
         headers, cookies, data = generate_request_params(cookies_str, uri, params)
         url = "https://edith.xiaohongshu.com/api/sns/web/v1/comment/post"
         
-        response = requests.post(url, headers=headers, cookies=cookies, data=data.encode('utf-8')).json()
-        print(f"回复评论请求: {response}")
+        response = json_codec.loads(self.session.post(url, headers=headers, cookies=cookies, data=data).content)
+        logger.debug(f"回复评论请求: {response}")
         if response.get('code') == 0:
-            print("回复成功")
+            logger.info("回复成功")
         else:
-            print(f"回复失败: {response.get('message', '未知错误')}")
+            logger.warning(f"回复失败: {response.get('message', '未知错误')}")
 # 使用示例
 if __name__ == "__main__":
     # 创建XhsAPI实例
@@ -682,4 +949,4 @@ if __name__ == "__main__":
     print("XhsAPI类已创建，请根据需要调用相应方法")
     
     # 记得在使用完毕后关闭资源
-    # xhs_api.close()
\ No newline at end of file
+    # xhs_api.close()
@@ -0,0 +1,347 @@
+import asyncio
+import os
+from curl_cffi.requests import AsyncSession
+from loguru import logger
+from xhs_api_class import XhsAPIBase, HTTP_VERSION, PAGE_DELAY
+from xhs_utils.xhs_util import generate_request_params
+from xhs_utils.crawl_progress import CrawlProgress
+from xhs_utils import json_codec
+from xhs_utils.comment_page import decode_comment_page
+
+# 全局并发上限：同时在途的请求数量
+ASYNC_MAX_CONCURRENCY = int(os.getenv('XHS_ASYNC_MAX_CONCURRENCY', '10'))
+
+
+class AsyncXhsAPI(XhsAPIBase):
+    """小红书异步API类，提供评论、笔记信息与搜索的协程版本，基于共享的curl_cffi AsyncSession
+
+    参数构造、响应解析与翻页进度的推进与XhsAPI共用XhsAPIBase；
+    所有请求复用同一个会话的连接，并受全局并发上限限制；
+    调用方取消任务时正在进行的请求会随之取消。
+    """
+
+    def __init__(self, max_concurrency=ASYNC_MAX_CONCURRENCY, timeout=30, http_version=HTTP_VERSION, page_delay=PAGE_DELAY):
+        """初始化AsyncXhsAPI类
+
+        Args:
+            max_concurrency (int): 同时在途的最大请求数
+            timeout (int): 单个请求的超时时间（秒）
+            http_version (str): HTTP版本，如v2tls、v1_1
+            page_delay (float): 展开二级评论及二级评论翻页前的等待时间（秒），0表示不等待
+        """
+        self.http_version = http_version
+        self.page_delay = page_delay
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session = None
+        self._semaphore = None
+
+    @property
+    def session(self):
+        # AsyncSession 与信号量都绑定事件循环，首次使用时在当前循环中创建
+        if self._session is None:
+            self._session = AsyncSession(
+                max_clients=self.max_concurrency,
+                timeout=self.timeout,
+                http_version=self.http_version,
+                discard_cookies=True,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        """关闭会话，释放连接"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _sign(self, cookies_str, api, data=''):
+        # 签名是阻塞的进程间调用，放到线程中执行，避免阻塞事件循环
+        return await asyncio.to_thread(generate_request_params, cookies_str, api, data)
+
+    async def _request(self, method, url, decode=json_codec.loads, **kwargs):
+        session = self.session
+        async with self._semaphore:
+            response = await session.request(method, url, **kwargs)
+        return decode(response.content)
+
+    async def fetch_comment_page(self, cookies_str, note_params, cursor=''):
+        """请求一页一级评论，返回响应中的data部分，失败时返回None"""
+        params = self._comment_page_params(note_params, cursor)
+        headers, cookies, data = await self._sign(cookies_str, self.COMMENT_PAGE_URI, params)
+        try:
+            page = await self._request('GET', self.API_HOST + self.COMMENT_PAGE_URI, decode=decode_comment_page, headers=headers, cookies=cookies, params=params)
+            if page is None:
+                logger.warning("API响应数据异常，停止获取评论")
+                return None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"获取评论时发生异常: {e}，停止获取评论")
+            return None
+        return page
+
+    async def fetch_sub_comment_page(self, cookies_str, note_id, root_comment_id, cursor, xsec_token):
+        """请求一页二级评论，返回响应中的data部分，失败时返回None"""
+        splice_api = self._sub_comment_page_api(note_id, root_comment_id, cursor, xsec_token)
+        headers, cookies, data = await self._sign(cookies_str, splice_api)
+        try:
+            page = await self._request('GET', self.API_HOST + splice_api, decode=decode_comment_page, headers=headers, cookies=cookies)
+            if page is None:
+                logger.warning("二级评论API响应数据异常，停止获取二级评论")
+                return None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"获取二级评论时发生异常: {e}，停止获取二级评论")
+            return None
+        return page
+
+    async def aiter_comments(self, cookies_str, ori_url, cursor='', max_comments=None, progress=None, checkpoint=None):
+        """逐页获取笔记评论的异步生成器，每解析一条就产出一条
+
+        Args:
+            cookies_str (str): Cookies字符串
+            ori_url (str): 笔记URL
+            cursor (str): 起始分页游标，默认为空
+            max_comments (int): 最多产出的评论数量
+            progress (CrawlProgress): 爬取进度，翻页时就地更新；传入已有进度时从该进度继续
+            checkpoint (CheckpointStore): 断点存储；未传入progress时从断点继续，每翻一页及停止时保存进度
+
+        Yields:
+            dict: 整理后的评论
+        """
+        ori_url, note_params = self._resolve_note_url(ori_url)
+        if progress is None and checkpoint is not None:
+            progress = await asyncio.to_thread(checkpoint.load, note_params['note_id'])
+            if progress is not None:
+                logger.info(f"从断点继续爬取评论: {progress.to_dict()}")
+        progress = self._start_progress(note_params, cursor, progress)
+        emitted = 0
+        pages = 0
+
+        try:
+            # 先把上次未展开完的二级评论取完
+            for root_comment_id, sub_cursor in list(progress.sub_cursors.items()):
+                async for item in self._aiter_sub_comment_pages(cookies_str, note_params['note_id'], root_comment_id, sub_cursor, note_params['xsec_token'], progress, checkpoint):
+                    progress.count += 1
+                    emitted += 1
+                    yield item
+                    if max_comments and emitted >= max_comments:
+                        return
+
+            while progress.has_more:
+                page = await self.fetch_comment_page(cookies_str, note_params, progress.cursor)
+                if page is None:
+                    return
+                comments = page.get('comments', [])
+                pages += 1
+                self._log_comment_page(progress, pages, len(comments))
+
+                for item, expand in self._walk_comment_page(progress, comments):
+                    if expand is None:
+                        emitted += 1
+                        yield item
+                        if max_comments and emitted >= max_comments:
+                            return
+                        continue
+                    await asyncio.sleep(self.page_delay)
+                    async for item in self._aiter_sub_comment_pages(
+                        cookies_str,
+                        expand.get('note_id', note_params['note_id']),
+                        expand.get('id', ''),
+                        expand.get('sub_comment_cursor', ''),
+                        note_params['xsec_token'],
+                        progress,
+                        checkpoint
+                    ):
+                        progress.count += 1
+                        emitted += 1
+                        yield item
+                        if max_comments and emitted >= max_comments:
+                            return
+
+                self._advance_comment_page(progress, page)
+                if checkpoint is not None:
+                    await asyncio.to_thread(checkpoint.commit, progress)
+        finally:
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.commit, progress)
+            self._log_comment_summary(progress, pages)
+
+    async def aiter_sub_comments(self, cookies_str, note_id, root_comment_id, cursor, xsec_token, max_comments=None, progress=None):
+        """逐页获取某条评论下二级评论的异步生成器
+
+        Args:
+            note_id (str): 笔记ID
+            root_comment_id (str): 根评论ID
+            cursor (str): 分页游标
+            xsec_token (str): 安全令牌
+            max_comments (int): 最多产出的评论数量
+            progress (CrawlProgress): 爬取进度，翻页时更新其中的二级评论游标
+
+        Yields:
+            dict: 整理后的评论
+        """
+        emitted = 0
+        async for item in self._aiter_sub_comment_pages(cookies_str, note_id, root_comment_id, cursor, xsec_token, progress):
+            emitted += 1
+            yield item
+            if max_comments and emitted >= max_comments:
+                return
+
+    async def _aiter_sub_comment_pages(self, cookies_str, note_id, root_comment_id, cursor, xsec_token, progress=None, checkpoint=None):
+        if progress is None:
+            progress = CrawlProgress(note_id, cursor)
+        progress.sub_cursors[root_comment_id] = cursor
+        while True:
+            page = await self.fetch_sub_comment_page(cookies_str, note_id, root_comment_id, cursor, xsec_token)
+            if page is None:
+                return
+            comments = page.get('comments', [])
+            logger.debug(f"获取二级评论成功，共{len(comments)}条")
+            for item in self._walk_sub_comment_page(progress, root_comment_id, comments):
+                yield item
+
+            cursor = self._advance_sub_comment_page(progress, root_comment_id, page)
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.commit, progress)
+            if cursor is None:
+                return
+            await asyncio.sleep(self.page_delay)
+
+    async def get_comments(self, cookies_str, ori_url, cursor='', comments_list: list = None, max_comments=None):
+        """获取小红书笔记下的评论
+
+        Args:
+            ori_url (str): 笔记URL
+            cursor (str): 分页游标，默认为空
+            comments_list (list): 追加结果的列表，默认新建
+            max_comments (int): comments_list的最大长度
+        """
+        if comments_list is None:
+            comments_list = []
+        remaining = max_comments - len(comments_list) if max_comments else None
+        if remaining is not None and remaining <= 0:
+            return comments_list
+        async for item in self.aiter_comments(cookies_str, ori_url, cursor, max_comments=remaining):
+            comments_list.append(item)
+        return comments_list
+
+    async def get_sub_comments(self, cookies_str, note_id, root_comment_id, cursor, xsec_token, comments_list: list = None, max_comments=None):
+        """获取小红书笔记的二级评论
+
+        Args:
+            note_id (str): 笔记ID
+            root_comment_id (str): 根评论ID
+            cursor (str): 分页游标
+            xsec_token (str): 安全令牌
+            comments_list (list): 追加结果的列表，默认新建
+            max_comments (int): comments_list的最大长度
+        """
+        if comments_list is None:
+            comments_list = []
+        remaining = max_comments - len(comments_list) if max_comments else None
+        if remaining is not None and remaining <= 0:
+            return comments_list
+        async for item in self.aiter_sub_comments(cookies_str, note_id, root_comment_id, cursor, xsec_token, max_comments=remaining):
+            comments_list.append(item)
+        return comments_list
+
+    async def get_note_info(self, cookies_str, url):
+        """获取小红书笔记信息
+        Args:
+            cookies_str (str): Cookies字符串
+            url (str): 笔记URL
+        """
+        url, note_params = self._resolve_note_url(url)
+        headers, cookies, data = await self._sign(cookies_str, self.NOTE_FEED_URI, self._note_feed_params(note_params))
+        response = await self._request('POST', self.API_HOST + self.NOTE_FEED_URI, headers=headers, cookies=cookies, data=data)
+        return self.parse_note_info(response, url, note_params)
+
+    async def _search_notes_page(self, cookies_str, keyword):
+        """请求一页搜索结果，返回带note_card的条目"""
+        headers, cookies, data = await self._sign(cookies_str, self.SEARCH_NOTES_URI, self.build_search_params(keyword))
+        response = await self._request('POST', self.API_HOST + self.SEARCH_NOTES_URI, headers=headers, cookies=cookies, data=data)
+        return self._parse_search_notes(response)
+
+    async def search_notes_by_keyword(self, cookies_str, keyword, num):
+        """根据关键词搜索笔记
+
+        Args:
+            keyword (str): 搜索关键词
+            num (int): 搜索数量
+        """
+        note_list = []
+        for p in range(1000):
+            try:
+                notes = await self._search_notes_page(cookies_str, keyword)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"API请求失败: {e}")
+                continue
+            if notes is None:
+                logger.warning("API响应为空或格式错误")
+                continue
+            for note in notes:
+                note_list.append({'title': note['title'], 'url': note['url']})
+                if len(note_list) >= num:
+                    return note_list
+        return note_list
+
+    async def aiter_search_comments(self, cookies_str, keyword, num, progresses: list = None):
+        """根据关键词搜索笔记，逐条产出笔记下评论的异步生成器
+
+        Args:
+            keyword (str): 搜索关键词
+            num (int): 最多产出的评论数量
+            progresses (list): 每开始爬一篇笔记就追加该笔记的CrawlProgress
+
+        Yields:
+            dict: 整理后的评论
+        """
+        emitted = 0
+        for p in range(1000):
+            try:
+                notes = await self._search_notes_page(cookies_str, keyword)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"搜索笔记时发生异常: {e}，停止搜索")
+                return
+            if notes is None:
+                logger.warning("搜索笔记API响应数据异常，停止搜索")
+                return
+            for note in notes:
+                # 每爬一篇笔记，就立即爬取该笔记下的评论
+                progress = CrawlProgress(note['note_id'])
+                if progresses is not None:
+                    progresses.append(progress)
+                async for item in self.aiter_comments(cookies_str, note['url'], max_comments=num - emitted, progress=progress):
+                    emitted += 1
+                    yield item
+                if emitted >= num:
+                    return
+
+    async def search_comments_by_keyword(self, cookies_str, keyword, num, comments_list: list = None):
+        """根据关键词搜索的笔记下面的评论
+
+        Args:
+            keyword (str): 搜索关键词
+            num (int): 搜索的评论数量
+        """
+        if comments_list is None:
+            comments_list = []
+        if num - len(comments_list) <= 0:
+            return comments_list
+        async for item in self.aiter_search_comments(cookies_str, keyword, num - len(comments_list)):
+            comments_list.append(item)
+        return comments_list
@@ -0,0 +1,165 @@
+"""
+评论爬取断点存储
+按 note_id 保存 CrawlProgress（一级评论游标、当前页偏移、各根评论的二级评论游标），
+爬取中断后可从断点继续，不必重新请求、重新签名已经爬过的页面。
+
+默认使用本地 SQLite 文件，也可以通过 XHS_CHECKPOINT_BACKEND=mysql 存到 MySQL 的
+crawl_checkpoints 表（表结构见 database_schema.sql）。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from loguru import logger
+
+from xhs_utils import json_codec
+from xhs_utils.crawl_progress import CrawlProgress
+
+# 断点存储后端：sqlite、mysql 或 none（不保存断点）
+CHECKPOINT_BACKEND = os.getenv('XHS_CHECKPOINT_BACKEND', 'sqlite')
+# SQLite 断点文件路径
+CHECKPOINT_PATH = os.getenv('XHS_CHECKPOINT_PATH', os.path.join('datas', 'checkpoints.db'))
+
+
+class CheckpointStore(ABC):
+    """断点存储接口"""
+
+    @abstractmethod
+    def load(self, note_id):
+        """读取笔记的爬取进度，没有断点时返回None"""
+
+    @abstractmethod
+    def save(self, progress):
+        """保存爬取进度"""
+
+    @abstractmethod
+    def delete(self, note_id):
+        """删除笔记的断点"""
+
+    def commit(self, progress):
+        """保存进度；爬取已完成时删除断点，下次从头开始"""
+        if not progress.note_id:
+            return
+        try:
+            if progress.finished:
+                self.delete(progress.note_id)
+            else:
+                self.save(progress)
+        except Exception as e:
+            # 断点只是加速续爬的手段，保存失败不影响本次爬取
+            logger.warning(f"保存爬取断点失败: {e}")
+
+    def close(self):
+        pass
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """基于本地 SQLite 文件的断点存储，同一实例可在多个线程中使用"""
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                note_id TEXT PRIMARY KEY,
+                progress TEXT NOT NULL,
+                update_time REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def load(self, note_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT progress FROM crawl_checkpoints WHERE note_id = ?", (note_id,)
+            ).fetchone()
+        return CrawlProgress.from_dict(json_codec.loads(row[0])) if row else None
+
+    def save(self, progress):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crawl_checkpoints (note_id, progress, update_time) VALUES (?, ?, ?)",
+                (progress.note_id, json_codec.dumps(progress.to_dict()), time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, note_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM crawl_checkpoints WHERE note_id = ?", (note_id,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MySQLCheckpointStore(CheckpointStore):
+    """存放在 MySQL crawl_checkpoints 表中的断点，适合多台机器共享进度"""
+
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager: DatabaseCookieManager 实例，用于获取数据库连接
+        """
+        self.db_manager = db_manager
+
+    def _execute(self, sql, args, fetch=False):
+        connection = self.db_manager.get_connection()
+        if not connection:
+            raise ConnectionError("数据库连接失败")
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, args)
+                if fetch:
+                    return cursor.fetchone()
+            connection.commit()
+        finally:
+            connection.close()
+
+    def load(self, note_id):
+        row = self._execute(
+            "SELECT progress FROM crawl_checkpoints WHERE note_id = %s", (note_id,), fetch=True
+        )
+        return CrawlProgress.from_dict(json_codec.loads(row['progress'])) if row else None
+
+    def save(self, progress):
+        self._execute(
+            """
+            INSERT INTO crawl_checkpoints (note_id, progress) VALUES (%s, %s) AS new
+            ON DUPLICATE KEY UPDATE progress = new.progress
+            """,
+            (progress.note_id, json_codec.dumps(progress.to_dict()))
+        )
+
+    def delete(self, note_id):
+        self._execute("DELETE FROM crawl_checkpoints WHERE note_id = %s", (note_id,))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """按 XHS_CHECKPOINT_BACKEND 创建（并缓存）默认的断点存储，配置为 none 时返回None"""
+    global _default_store
+    if CHECKPOINT_BACKEND == 'none':
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            if CHECKPOINT_BACKEND == 'mysql':
+                from dotenv import load_dotenv
+                from db_manager import DatabaseCookieManager
+                load_dotenv()
+                _default_store = MySQLCheckpointStore(DatabaseCookieManager(
+                    user=os.getenv('DB_USER'),
+                    password=os.getenv('DB_PASSWORD')
+                ))
+            else:
+                _default_store = SQLiteCheckpointStore(CHECKPOINT_PATH)
+    return _default_store
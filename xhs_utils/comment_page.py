@@ -0,0 +1,83 @@
+"""
+评论分页响应解码
+安装了 msgspec 时按只包含所需字段的 Struct 解码：评论的内容、点赞数、昵称、ID、IP位置、时间，
+以及子评论、回复数、分页游标等翻页所需字段；pictures、at_users、用户头像等其他字段在解析时直接跳过，
+不会构造嵌套的字典。未安装时使用 json_codec 完整解码。XHS_COMMENT_DECODER=json 可强制完整解码。
+
+两种方式返回的分页数据都可以像字典一样用 .get(key, default) 读取，缺少的字段返回default。
+"""
+
+import os
+from typing import Any, List, Union
+
+from loguru import logger
+
+from xhs_utils import json_codec
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _decode_full(content):
+    response = json_codec.loads(content)
+    if not response or not isinstance(response, dict) or 'data' not in response:
+        return None
+    return response.get('data') or {}
+
+
+DECODERS = {'json': _decode_full}
+
+if msgspec is not None:
+    from msgspec import UNSET, UnsetType
+
+    class _Fields(msgspec.Struct, gc=False):
+        """只保留声明的字段，按字典方式读取；接口没有返回的字段为UNSET"""
+
+        def get(self, key, default=None):
+            value = getattr(self, key, UNSET)
+            return default if value is UNSET else value
+
+    class _UserInfo(_Fields):
+        nickname: Any = UNSET
+
+    class _Comment(_Fields):
+        id: Any = UNSET
+        note_id: Any = UNSET
+        content: Any = UNSET
+        like_count: Any = UNSET
+        ip_location: Any = UNSET
+        create_time: Any = UNSET
+        user_info: Union[_UserInfo, None, UnsetType] = UNSET
+        sub_comments: Union[List['_Comment'], None, UnsetType] = UNSET
+        sub_comment_count: Any = UNSET
+        sub_comment_has_more: Any = UNSET
+        sub_comment_cursor: Any = UNSET
+
+    class _PageData(_Fields):
+        comments: Union[List[_Comment], None, UnsetType] = UNSET
+        cursor: Any = UNSET
+        has_more: Any = UNSET
+
+    class _PageResponse(msgspec.Struct, gc=False):
+        data: Union[_PageData, None, UnsetType] = UNSET
+
+    _page_decoder = msgspec.json.Decoder(_PageResponse)
+
+    def _decode_selected(content):
+        data = _page_decoder.decode(content).data
+        if data is UNSET:
+            return None
+        return data or {}
+
+    DECODERS['msgspec'] = _decode_selected
+
+COMMENT_DECODER = os.getenv('XHS_COMMENT_DECODER', 'msgspec' if msgspec is not None else 'json')
+if COMMENT_DECODER not in DECODERS:
+    logger.warning(f"评论解码方式 {COMMENT_DECODER} 不可用，使用完整解码")
+    COMMENT_DECODER = 'json'
+
+# decode_comment_page(content) 返回响应中的data部分，响应不是包含data的对象时返回None；
+# 一级评论与二级评论分页的响应格式相同
+decode_comment_page = DECODERS[COMMENT_DECODER]
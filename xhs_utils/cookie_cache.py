@@ -0,0 +1,208 @@
+"""
+内存中的可用Cookie池
+一次性从数据库加载全部可用cookie，选择时直接在内存中随机取或取最久未使用的，不再每次请求都查表。
+超过TTL后由后台线程重新加载，加载期间仍使用旧数据；标记失效的cookie立即从池中移除。
+同一时间只有一次加载，冷启动时并发的请求等待第一个请求的加载结果，不会各自查表。
+"""
+
+import heapq
+import random
+import threading
+import time
+from loguru import logger
+
+
+class CookieCache:
+    """可用cookie的内存缓存
+
+    cookie保存在列表中，另有 id -> 下标 的索引，随机选择与按id移除都是O(1)；
+    另有按最后使用时间排序的最小堆，取最久未使用的cookie是O(log n)。
+    堆中过期的条目（cookie已移除或使用时间已更新）在取堆顶时丢弃。
+    """
+
+    def __init__(self, loader, ttl=60):
+        """
+        Args:
+            loader: 无参函数，返回 [{'id': ..., 'cookie_string': ..., 'last_used': datetime或None}, ...]，
+                失败时抛出异常；没有last_used时视为从未使用
+            ttl (float): 缓存有效期（秒），过期后在后台重新加载
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self._items = []          # [(id, cookie_string)]
+        self._positions = {}      # id -> 在_items中的下标
+        self._ids_by_value = {}   # cookie_string -> {id}
+        self._last_used = {}      # id -> 最后使用时间戳
+        self._heap = []           # [(最后使用时间戳, id)]
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)  # 加载结束时通知等待者
+        self._loaded_at = None
+        self._refreshing = False
+        self._reload_pending = False  # 加载期间数据又有变化，结束后需要再加载一次
+        self._removed_during_refresh = set()
+        self._metrics = {'hits': 0, 'refreshes': 0, 'refresh_failures': 0, 'removed': 0}
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None:
+            # 首次使用时同步加载，已有加载进行中时等待其结束
+            self.refresh()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            self._refresh_in_background()
+
+    def choice(self):
+        """随机取一个可用cookie并记为已使用，返回 (id, cookie_string)，没有可用cookie时返回None"""
+        self._ensure_loaded()
+        with self._lock:
+            if not self._items:
+                return None
+            self._metrics['hits'] += 1
+            item = random.choice(self._items)
+            self._touch_locked(item[0], time.time())
+            return item
+
+    def least_used(self):
+        """取最久未使用的cookie并记为已使用，返回 (id, cookie_string)，没有可用cookie时返回None"""
+        self._ensure_loaded()
+        with self._lock:
+            while self._heap:
+                used_at, cookie_id = self._heap[0]
+                if cookie_id not in self._positions or self._last_used.get(cookie_id) != used_at:
+                    heapq.heappop(self._heap)
+                    continue
+                now = time.time()
+                self._last_used[cookie_id] = now
+                heapq.heapreplace(self._heap, (now, cookie_id))
+                self._metrics['hits'] += 1
+                return self._items[self._positions[cookie_id]]
+            return None
+
+    def _touch_locked(self, cookie_id, used_at):
+        self._last_used[cookie_id] = used_at
+        heapq.heappush(self._heap, (used_at, cookie_id))
+        if len(self._heap) > 2 * len(self._items) + 16:
+            # 随机选择留下的过期条目过多时重建
+            self._rebuild_heap_locked()
+
+    def _rebuild_heap_locked(self):
+        self._heap = [(self._last_used.get(cookie_id, 0.0), cookie_id) for cookie_id, _ in self._items]
+        heapq.heapify(self._heap)
+
+    def remove(self, cookie_id):
+        """按id移除cookie，返回是否存在"""
+        with self._lock:
+            if self._refreshing:
+                self._removed_during_refresh.add(cookie_id)
+            return self._remove_locked(cookie_id)
+
+    def ids_of(self, cookie_string):
+        """内容为cookie_string的cookie的id列表"""
+        with self._lock:
+            return list(self._ids_by_value.get(cookie_string, ()))
+
+    def remove_value(self, cookie_string):
+        """按cookie字符串移除，返回移除的数量"""
+        with self._lock:
+            ids = list(self._ids_by_value.get(cookie_string, ()))
+            if self._refreshing:
+                self._removed_during_refresh.update(ids)
+            return sum(self._remove_locked(cookie_id) for cookie_id in ids)
+
+    def _remove_locked(self, cookie_id):
+        position = self._positions.pop(cookie_id, None)
+        if position is None:
+            return False
+        _, cookie_string = self._items[position]
+        # 用最后一个元素填补空位
+        last = self._items.pop()
+        if position < len(self._items):
+            self._items[position] = last
+            self._positions[last[0]] = position
+        ids = self._ids_by_value.get(cookie_string)
+        if ids is not None:
+            ids.discard(cookie_id)
+            if not ids:
+                del self._ids_by_value[cookie_string]
+        self._metrics['removed'] += 1
+        return True
+
+    def invalidate(self):
+        """数据变化时调用，在后台重新加载；已有加载进行中时，它结束后再加载一次"""
+        self._refresh_in_background(force=True)
+
+    def _refresh_in_background(self, force=False):
+        with self._lock:
+            if self._refreshing:
+                # 进行中的加载可能在数据变化之前就已读表
+                self._reload_pending = self._reload_pending or force
+                return
+            if not force and self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl:
+                return
+            self._refreshing = True
+            self._removed_during_refresh.clear()
+        threading.Thread(target=self._refresh, name='cookie-cache-refresh', daemon=True).start()
+
+    def refresh(self):
+        """立即从数据库重新加载；已有加载进行中时不再重复加载，等待它结束"""
+        with self._lock:
+            if self._refreshing:
+                # 不能清空_removed_during_refresh，进行中的加载还要靠它过滤
+                while self._refreshing:
+                    self._refreshed.wait()
+                return
+            self._refreshing = True
+            self._removed_during_refresh.clear()
+        self._refresh()
+
+    def _refresh(self):
+        self._load()
+        with self._lock:
+            reload_pending, self._reload_pending = self._reload_pending, False
+        if reload_pending:
+            self._refresh_in_background(force=True)
+
+    def _load(self):
+        try:
+            rows = self.loader()
+        except Exception as e:
+            logger.warning(f"加载cookie池失败，继续使用旧数据: {e}")
+            with self._lock:
+                self._metrics['refresh_failures'] += 1
+                self._refreshing = False
+                if self._loaded_at is None:
+                    # 首次加载失败时也记下时间，TTL内不在请求路径上反复重试
+                    self._loaded_at = time.monotonic()
+                self._refreshed.notify_all()
+            return
+
+        with self._lock:
+            # 加载期间被标记失效的cookie不能因为读到旧数据而重新出现
+            removed = self._removed_during_refresh
+            self._items = [(row['id'], row['cookie_string']) for row in rows if row['id'] not in removed]
+            self._positions = {cookie_id: i for i, (cookie_id, _) in enumerate(self._items)}
+            self._ids_by_value = {}
+            for cookie_id, cookie_string in self._items:
+                self._ids_by_value.setdefault(cookie_string, set()).add(cookie_id)
+            # 本地的使用时间可能还没写回数据库，取两者中较新的
+            last_used = {}
+            for row in rows:
+                used_at = row.get('last_used')
+                used_at = used_at.timestamp() if used_at else 0.0
+                last_used[row['id']] = max(used_at, self._last_used.get(row['id'], 0.0))
+            self._last_used = last_used
+            self._rebuild_heap_locked()
+            self._loaded_at = time.monotonic()
+            self._refreshing = False
+            self._metrics['refreshes'] += 1
+            self._refreshed.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'age': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+                'ttl': self.ttl,
+                **self._metrics,
+            }
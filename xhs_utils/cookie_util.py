@@ -1,6 +1,38 @@
-def trans_cookies(cookies_str):
-    if '; ' in cookies_str:
-        ck = {i.split('=')[0]: '='.join(i.split('=')[1:]) for i in cookies_str.split('; ')}
-    else:
-        ck = {i.split('=')[0]: '='.join(i.split('=')[1:]) for i in cookies_str.split(';')}
+import os
+from functools import lru_cache
+
+# 缓存解析结果的cookie字符串数量，cookie池通常只有几十到几百个
+COOKIE_PARSE_CACHE_SIZE = int(os.getenv('XHS_COOKIE_PARSE_CACHE_SIZE', '256'))
+
+
+class ParsedCookies:
+    """解析后的cookie：字典、a1 与 Cookie 请求头形式，同一个cookie字符串只解析一次"""
+
+    __slots__ = ('cookies', 'a1', 'header')
+
+    def __init__(self, cookies):
+        self.cookies = cookies
+        self.a1 = cookies.get('a1')
+        self.header = '; '.join(f'{key}={value}' for key, value in cookies.items())
+
+
+def _split_cookies(cookies_str):
+    separator = '; ' if '; ' in cookies_str else ';'
+    ck = {}
+    for item in cookies_str.split(separator):
+        if not item:
+            continue
+        key, _, value = item.partition('=')
+        ck[key] = value
     return ck
+
+
+@lru_cache(maxsize=COOKIE_PARSE_CACHE_SIZE)
+def parse_cookies(cookies_str):
+    """解析cookie字符串，结果按字符串缓存，调用方不要修改返回对象中的字典"""
+    return ParsedCookies(_split_cookies(cookies_str))
+
+
+def trans_cookies(cookies_str):
+    # 返回副本，调用方可以随意修改
+    return dict(parse_cookies(cookies_str).cookies)
@@ -0,0 +1,54 @@
+"""
+评论爬取进度
+记录一级评论的下一页游标，以及正在展开的二级评论的游标，供分页引擎逐页更新。
+"""
+
+
+class CrawlProgress:
+    """一篇笔记的评论爬取进度
+
+    Attributes:
+        note_id (str): 笔记ID
+        cursor (str): 下一页一级评论的游标，当前页处理完（含其二级评论）后才前进
+        has_more (bool): 一级评论是否还有下一页
+        page_offset (int): 当前页（cursor对应的页）中已产出的条目数，续爬时跳过这些条目
+        sub_cursors (dict): 未展开完的根评论ID -> 下一页二级评论的游标
+        sub_offsets (dict): 根评论ID -> 该二级评论页中已产出的条目数
+        count (int): 已产出的评论数量
+    """
+
+    def __init__(self, note_id='', cursor='', has_more=True, sub_cursors=None, count=0, page_offset=0, sub_offsets=None):
+        self.note_id = note_id
+        self.cursor = cursor
+        self.has_more = has_more
+        self.sub_cursors = dict(sub_cursors or {})
+        self.count = count
+        self.page_offset = page_offset
+        self.sub_offsets = dict(sub_offsets or {})
+
+    @property
+    def finished(self):
+        return not self.has_more and not self.sub_cursors
+
+    def to_dict(self):
+        return {
+            'note_id': self.note_id,
+            'cursor': self.cursor,
+            'has_more': self.has_more,
+            'sub_cursors': dict(self.sub_cursors),
+            'count': self.count,
+            'page_offset': self.page_offset,
+            'sub_offsets': dict(self.sub_offsets),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            note_id=data.get('note_id', ''),
+            cursor=data.get('cursor', ''),
+            has_more=data.get('has_more', True),
+            sub_cursors=data.get('sub_cursors'),
+            count=data.get('count', 0),
+            page_offset=data.get('page_offset', 0),
+            sub_offsets=data.get('sub_offsets'),
+        )
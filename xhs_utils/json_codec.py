@@ -0,0 +1,39 @@
+"""
+JSON编解码
+安装了 orjson 时使用 orjson，否则使用标准库 json；XHS_JSON_BACKEND=json 可强制使用标准库。
+两种实现输出相同的紧凑格式（无空格、不转义非ASCII字符），与签名脚本中 JSON.stringify 的结果一致。
+"""
+
+import json
+import os
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def _json_dumps_bytes(obj):
+    return _json_dumps(obj).encode('utf-8')
+
+
+BACKENDS = {'json': (_json_loads, _json_dumps, _json_dumps_bytes)}
+if orjson is not None:
+    BACKENDS['orjson'] = (orjson.loads, lambda obj: orjson.dumps(obj).decode('utf-8'), orjson.dumps)
+
+JSON_BACKEND = os.getenv('XHS_JSON_BACKEND', 'orjson' if orjson is not None else 'json')
+if JSON_BACKEND not in BACKENDS:
+    logger.warning(f"JSON后端 {JSON_BACKEND} 不可用，使用标准库json")
+    JSON_BACKEND = 'json'
+
+# loads 接受 str 或 bytes；dumps 返回 str，dumps_bytes 返回UTF-8编码的 bytes
+loads, dumps, dumps_bytes = BACKENDS[JSON_BACKEND]
@@ -0,0 +1,22 @@
+"""
+日志配置
+统一使用 loguru，默认输出到 stderr，级别由 XHS_LOG_LEVEL 控制（默认 INFO）。
+翻页等高频日志按 DEBUG 记录，默认级别下不格式化也不输出。
+"""
+
+import os
+import sys
+from loguru import logger
+
+LOG_LEVEL = os.getenv('XHS_LOG_LEVEL', 'INFO').upper()
+# 可选：同时写入文件，按大小滚动
+LOG_FILE = os.getenv('XHS_LOG_FILE', '')
+
+
+def setup_logging(level=LOG_LEVEL, log_file=LOG_FILE):
+    """替换 loguru 的默认输出（DEBUG 级别），可重复调用"""
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+    if log_file:
+        # enqueue 在后台线程写文件，请求线程不等待磁盘
+        logger.add(log_file, level=level, rotation='100 MB', retention=5, enqueue=True, encoding='utf-8')
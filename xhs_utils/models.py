@@ -0,0 +1,181 @@
+"""
+评论与笔记信息的数据模型
+接口返回的评论统一经 Comment.from_api 整理；合并数据 MonitorRecord 只引用同一个 NoteInfo，
+不再为每条评论复制一份笔记字段。
+
+模型可以像原来的字典一样按键读取（record['comment_id']、record.get(...)、dict(record)），
+输出给接口或写入数据库时使用 to_dict / serialize / MonitorRecord.db_values。
+"""
+
+from xhs_utils.time_util import format_epoch_ms, to_epoch_ms
+
+
+class Record:
+    """按固定键读取的只读映射接口，键对应同名属性或property"""
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Comment(Record):
+    """一条一级或二级评论"""
+
+    __slots__ = ('content', 'like_count', 'nickname', 'comment_id', 'comment_location', 'create_time')
+    FIELDS = ('content', 'like_count', 'nickname', 'comment_id', 'comment_location', 'note_time')
+
+    def __init__(self, content='', like_count=0, nickname='', comment_id='', comment_location='', create_time=None):
+        self.content = content
+        self.like_count = like_count
+        self.nickname = nickname
+        self.comment_id = comment_id
+        self.comment_location = comment_location
+        self.create_time = to_epoch_ms(create_time)  # 毫秒时间戳，缺失或无法解析时为None
+
+    @classmethod
+    def from_api(cls, comment):
+        """整理接口返回的单条评论（一级评论、自带的子评论与二级评论格式相同）"""
+        return cls(
+            comment.get('content', ''),  # 内容
+            comment.get('like_count', 0),  # 点赞数
+            comment.get('user_info', {}).get('nickname', ''),  # 昵称
+            comment.get('id', ''),  # 评论ID
+            comment.get('ip_location', ''),  # IP位置
+            comment.get('create_time', ''),
+        )
+
+    @property
+    def note_time(self):
+        """评论时间，格式为 %Y-%m-%d %H:%M:%S，没有有效的create_time时为空字符串"""
+        return format_epoch_ms(self.create_time)
+
+
+class NoteInfo(Record):
+    """笔记信息"""
+
+    __slots__ = ('note_type', 'note_id', 'title', 'like_count', 'collected_count', 'comment_count',
+                 'note_url', 'xsec_token', 'location', 'author', 'note_time')
+    FIELDS = ('note_type', 'note_id', 'title', 'like_count', 'collected_count', 'comment_count',
+              'note_url', 'xsec_token', 'location', 'author')
+
+    def __init__(self, note_type='', note_id='', title='', like_count=0, collected_count=0, comment_count=0,
+                 note_url='', xsec_token='', location='', author='', note_time=''):
+        self.note_type = note_type
+        self.note_id = note_id
+        self.title = title
+        self.like_count = like_count
+        self.collected_count = collected_count
+        self.comment_count = comment_count
+        self.note_url = note_url
+        self.xsec_token = xsec_token
+        self.location = location
+        self.author = author
+        self.note_time = note_time  # 详情接口暂未解析笔记发布时间
+
+    @classmethod
+    def from_feed(cls, item, url, xsec_token):
+        """从 /api/sns/web/v1/feed 响应的 data.items[0] 整理笔记信息"""
+        note_card = item.get('note_card')
+        interact_info = note_card.get('interact_info')
+        return cls(
+            item.get('model_type', {}),  # 笔记类型
+            note_card.get('note_id', ''),  # 笔记ID
+            note_card.get('title', ''),  # 笔记标题
+            interact_info.get('liked_count', 0),  # 点赞数
+            interact_info.get('collected_count', 0),  # 收藏数
+            interact_info.get('comment_count', 0),  # 评论数
+            url,  # 笔记URL
+            xsec_token,  # 安全令牌
+            note_card.get('ip_location', ''),  # 位置
+            note_card.get('user', '').get('nickname'),  # 作者昵称
+        )
+
+
+class MonitorRecord(Record):
+    """笔记信息与单条评论的合并数据，同一篇笔记的所有评论共用一个NoteInfo"""
+
+    __slots__ = ('note', 'comment', 'keyword', 'userInfo', 'collect_ms')
+    FIELDS = ('note_id', 'keyword', 'title', 'note_author', 'userInfo', 'content', 'likes', 'collects',
+              'comments', 'note_url', 'collect_time', 'note_time', 'note_location', 'note_type',
+              'comment_location', 'comment_id', 'commenter_nickname', 'comment_likes')
+
+    def __init__(self, note, comment, keyword, userInfo, collect_ms):
+        self.note = note
+        self.comment = comment
+        self.keyword = keyword
+        self.userInfo = userInfo  # 客户标识
+        self.collect_ms = collect_ms  # 收集时间，毫秒时间戳
+
+    collect_time = property(lambda self: format_epoch_ms(self.collect_ms))
+
+    # 笔记信息
+    note_id = property(lambda self: self.note.note_id)
+    title = property(lambda self: self.note.title)
+    note_author = property(lambda self: self.note.author)
+    likes = property(lambda self: self.note.like_count)
+    collects = property(lambda self: self.note.collected_count)
+    comments = property(lambda self: self.note.comment_count)
+    note_url = property(lambda self: self.note.note_url)
+    note_time = property(lambda self: self.note.note_time)
+    note_location = property(lambda self: self.note.location)
+    note_type = property(lambda self: self.note.note_type)
+
+    # 评论信息
+    content = property(lambda self: self.comment.content)
+    comment_location = property(lambda self: self.comment.comment_location)
+    comment_id = property(lambda self: self.comment.comment_id)
+    commenter_nickname = property(lambda self: self.comment.nickname)
+    comment_likes = property(lambda self: self.comment.like_count)
+
+    def db_values(self):
+        """按 monitor_comments 插入语句的列顺序返回字段值，收集时间为毫秒时间戳，笔记时间未转换"""
+        note, comment = self.note, self.comment
+        return (
+            note.note_id, self.keyword, note.title, note.author, self.userInfo, comment.content,
+            note.like_count, note.collected_count, note.comment_count, comment.like_count, note.note_url,
+            self.collect_ms, note.note_time, note.location, note.note_type, comment.comment_location,
+            comment.comment_id, comment.nickname,
+        )
+
+
+def serialize(value):
+    """把模型（或其列表）转换为可直接JSON序列化的字典，其他值原样返回"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [item.to_dict() if isinstance(item, Record) else item for item in value]
+    return value
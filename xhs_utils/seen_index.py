@@ -0,0 +1,213 @@
+"""
+已见评论索引
+按笔记记录已经处理过的评论ID、上次检查时的评论数以及各一级评论的回复数，
+供增量监控判断哪些评论是新的、哪些已见过的一级评论下有新回复。
+
+每篇笔记在内存中有一个布隆过滤器，不在过滤器中的ID一定是新评论，无需查库；
+命中过滤器时再到 SQLite 中的精确集合确认，排除误判。过滤器与精确集合一起持久化，
+重启后不必逐条重建。
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# 已见评论索引文件路径
+SEEN_INDEX_PATH = os.getenv('XHS_SEEN_INDEX_PATH', os.path.join('datas', 'seen_comments.db'))
+# 布隆过滤器的目标误判率
+BLOOM_ERROR_RATE = 0.01
+# 每篇笔记布隆过滤器的最小容量
+BLOOM_MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    """定长位数组实现的布隆过滤器，使用 blake2b 的两个 64 位分量做双重哈希"""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE, bits=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class SeenCommentIndex:
+    """按笔记保存已见评论ID与评论数快照，同一实例可在多个线程中使用"""
+
+    def __init__(self, path=SEEN_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.RLock()
+        self._blooms = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen_comments (
+                note_id TEXT NOT NULL,
+                comment_id TEXT NOT NULL,
+                PRIMARY KEY (note_id, comment_id)
+            );
+            CREATE TABLE IF NOT EXISTS note_snapshots (
+                note_id TEXT PRIMARY KEY,
+                comment_count TEXT,
+                check_time REAL,
+                seen_count INTEGER NOT NULL DEFAULT 0,
+                bloom_capacity INTEGER,
+                bloom BLOB
+            );
+            CREATE TABLE IF NOT EXISTS root_sub_counts (
+                note_id TEXT NOT NULL,
+                comment_id TEXT NOT NULL,
+                sub_comment_count INTEGER NOT NULL,
+                PRIMARY KEY (note_id, comment_id)
+            );
+        """)
+        self._conn.commit()
+
+    def get_snapshot(self, note_id):
+        """返回上次检查时的 (评论数, 检查时间)，没有快照时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT comment_count, check_time FROM note_snapshots WHERE note_id = ? AND check_time IS NOT NULL",
+                (note_id,)
+            ).fetchone()
+        return row
+
+    def set_snapshot(self, note_id, comment_count):
+        """记录本次检查时的评论数与检查时间"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO note_snapshots (note_id, comment_count, check_time) VALUES (?, ?, ?)
+                ON CONFLICT(note_id) DO UPDATE SET
+                    comment_count = excluded.comment_count,
+                    check_time = excluded.check_time
+                """,
+                (note_id, str(comment_count), time.time())
+            )
+            self._conn.commit()
+
+    def contains(self, note_id, comment_id):
+        """评论是否已经见过"""
+        with self._lock:
+            if comment_id not in self._bloom(note_id):
+                return False
+            return self._conn.execute(
+                "SELECT 1 FROM seen_comments WHERE note_id = ? AND comment_id = ?", (note_id, comment_id)
+            ).fetchone() is not None
+
+    def add(self, note_id, comment_ids):
+        """把评论ID加入索引"""
+        comment_ids = list(comment_ids)
+        if not comment_ids:
+            return
+        with self._lock:
+            bloom = self._bloom(note_id)
+            if bloom.count + len(comment_ids) > bloom.capacity:
+                bloom = self._rebuild(note_id, bloom.count + len(comment_ids))
+            for comment_id in comment_ids:
+                bloom.add(comment_id)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_comments (note_id, comment_id) VALUES (?, ?)",
+                [(note_id, comment_id) for comment_id in comment_ids]
+            )
+            # 过滤器与精确集合在同一事务中保存，重启后直接加载
+            self._conn.execute(
+                """
+                INSERT INTO note_snapshots (note_id, seen_count, bloom_capacity, bloom) VALUES (?, ?, ?, ?)
+                ON CONFLICT(note_id) DO UPDATE SET
+                    seen_count = excluded.seen_count,
+                    bloom_capacity = excluded.bloom_capacity,
+                    bloom = excluded.bloom
+                """,
+                (note_id, bloom.count, bloom.capacity, bytes(bloom.bits))
+            )
+            self._conn.commit()
+
+    def sub_comment_counts(self, note_id, comment_ids):
+        """返回一级评论上次记录的回复数 {comment_id: 回复数}，没有记录的评论不在结果中"""
+        comment_ids = list(comment_ids)
+        if not comment_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT comment_id, sub_comment_count FROM root_sub_counts WHERE note_id = ? "
+                f"AND comment_id IN ({','.join('?' * len(comment_ids))})",
+                (note_id, *comment_ids)
+            ).fetchall()
+        return dict(rows)
+
+    def set_sub_comment_counts(self, note_id, counts):
+        """记录一级评论的回复数，counts 为 {comment_id: 回复数}"""
+        if not counts:
+            return
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO root_sub_counts (note_id, comment_id, sub_comment_count) VALUES (?, ?, ?)
+                ON CONFLICT(note_id, comment_id) DO UPDATE SET sub_comment_count = excluded.sub_comment_count
+                """,
+                [(note_id, comment_id, count) for comment_id, count in counts.items()]
+            )
+            self._conn.commit()
+
+    def _bloom(self, note_id):
+        bloom = self._blooms.get(note_id)
+        if bloom is None:
+            row = self._conn.execute(
+                "SELECT seen_count, bloom_capacity, bloom FROM note_snapshots WHERE note_id = ?", (note_id,)
+            ).fetchone()
+            if row and row[2] is not None:
+                bloom = BloomFilter(row[1], bits=row[2])
+                bloom.count = row[0]
+            else:
+                bloom = self._rebuild(note_id, 0)
+            self._blooms[note_id] = bloom
+        return bloom
+
+    def _rebuild(self, note_id, expected):
+        """按预期数量的两倍重新建立过滤器，并把精确集合中的ID全部放入"""
+        rows = self._conn.execute(
+            "SELECT comment_id FROM seen_comments WHERE note_id = ?", (note_id,)
+        ).fetchall()
+        bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * max(expected, len(rows))))
+        for (comment_id,) in rows:
+            bloom.add(comment_id)
+        self._blooms[note_id] = bloom
+        return bloom
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_seen_index():
+    """创建（并缓存）默认的已见评论索引"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SeenCommentIndex(SEEN_INDEX_PATH)
+    return _default_index
@@ -0,0 +1,416 @@
+"""
+签名引擎
+常驻 Node 进程一次性加载签名脚本，之后通过 stdin/stdout 的行协议完成签名调用，
+避免 execjs 每次调用都启动新的 node 进程并重新解析整份脚本。
+"""
+
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from loguru import logger
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+WORKER_SCRIPT = os.path.join(STATIC_DIR, 'sign_worker.js')
+
+# 签名后端: node(常驻进程，默认) / execjs(原有的每次调用启动进程的方式)
+SIGN_BACKEND = os.getenv('XHS_SIGN_BACKEND', 'node')
+SIGN_TIMEOUT = float(os.getenv('XHS_SIGN_TIMEOUT', '30'))
+# x-s 签名进程数量，默认与 CPU 核数一致
+SIGN_WORKERS = int(os.getenv('XHS_SIGN_WORKERS', str(os.cpu_count() or 1)))
+SIGN_HEALTH_INTERVAL = float(os.getenv('XHS_SIGN_HEALTH_INTERVAL', '30'))
+MAX_START_FAILURES = 3
+
+
+class SignError(Exception):
+    """签名调用失败"""
+
+
+class SignBackend(ABC):
+    """签名后端接口，所有后端都通过 call 调用脚本中的全局函数"""
+
+    name = 'base'
+
+    @abstractmethod
+    def call(self, fn, *args):
+        """调用脚本中的全局函数 fn，返回其结果"""
+
+    def call_batch(self, fn, count, *args):
+        """连续调用 count 次，返回结果列表"""
+        return [self.call(fn, *args) for _ in range(count)]
+
+    def close(self):
+        pass
+
+
+class ExecjsBackend(SignBackend):
+    """原有的 PyExecJS 调用方式，每次调用都会启动一个新的 JS 运行时"""
+
+    name = 'execjs'
+
+    def __init__(self, script_path):
+        import execjs
+        with open(script_path, 'r', encoding='utf-8') as f:
+            # 以 static 目录作为工作目录，保证脚本内的相对 require 可以找到
+            self._ctx = execjs.compile(f.read(), cwd=os.path.dirname(script_path))
+
+    def call(self, fn, *args):
+        return self._ctx.call(fn, *args)
+
+
+class NodeWorkerBackend(SignBackend):
+    """常驻 Node 子进程后端，脚本只加载一次，之后按行收发 JSON"""
+
+    name = 'node'
+
+    def __init__(self, script_path, node_path=None, timeout=SIGN_TIMEOUT):
+        self.script_path = script_path
+        self.node_path = node_path or shutil.which('node') or 'node'
+        self.timeout = timeout
+        self._process = None
+        self._pending = {}
+        self.start_failures = 0
+        self._ids = itertools.count(1)
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def crashed(self):
+        """进程启动过但已经意外退出"""
+        return self._process is not None and self._process.poll() is not None
+
+    @property
+    def pid(self):
+        return self._process.pid if self._process is not None else None
+
+    def start(self):
+        """启动子进程并等待脚本加载完成"""
+        with self._start_lock:
+            if self.alive:
+                return
+            try:
+                process = subprocess.Popen(
+                    [self.node_path, WORKER_SCRIPT, self.script_path],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    cwd=os.path.dirname(self.script_path),
+                    encoding='utf-8',
+                    bufsize=1,
+                )
+            except OSError as e:
+                self.start_failures += 1
+                raise SignError(f"签名进程启动失败: {e}")
+            ready = process.stdout.readline()
+            try:
+                message = json.loads(ready) if ready else {}
+            except ValueError:
+                message = {}
+            if not message.get('ready'):
+                process.kill()
+                process.wait()
+                self.start_failures += 1
+                raise SignError(f"签名进程启动失败: {message.get('error', '进程提前退出')}")
+
+            self._process = process
+            self._pending = {}
+            self.start_failures = 0
+            threading.Thread(target=self._read_loop, args=(process, self._pending), daemon=True).start()
+            logger.info(f"签名进程已启动 pid={message.get('pid')} script={os.path.basename(self.script_path)}")
+
+    def _read_loop(self, process, pending):
+        """后台读取响应，按 id 交给等待中的调用"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            slot = pending.pop(message.get('id'), None)
+            if slot is not None:
+                slot['response'] = message
+                slot['event'].set()
+        # 进程退出，唤醒所有仍在等待的调用
+        for request_id in list(pending):
+            slot = pending.pop(request_id, None)
+            if slot is not None:
+                slot['event'].set()
+
+    def request(self, payload, timeout=None):
+        """发送一条请求并等待响应"""
+        if not self.alive:
+            self.start()
+        request_id = next(self._ids)
+        slot = {'event': threading.Event(), 'response': None}
+        pending = self._pending
+        pending[request_id] = slot
+        payload['id'] = request_id
+        try:
+            with self._write_lock:
+                self._process.stdin.write(json.dumps(payload) + '\n')
+                self._process.stdin.flush()
+        except (OSError, ValueError, AttributeError) as e:
+            pending.pop(request_id, None)
+            raise SignError(f"签名进程写入失败: {e}")
+
+        if not slot['event'].wait(timeout or self.timeout):
+            pending.pop(request_id, None)
+            # 超时的进程状态不可信，直接结束，下次调用时重新启动
+            self.close()
+            raise SignError(f"签名调用超时: {payload.get('fn') or payload.get('op')}")
+        response = slot['response']
+        if response is None:
+            raise SignError("签名进程已退出")
+        if 'error' in response:
+            raise SignError(response['error'])
+        return response.get('result')
+
+    def call(self, fn, *args):
+        return self.request({'fn': fn, 'args': list(args)})
+
+    def call_batch(self, fn, count, *args):
+        return self.request({'op': 'batch', 'fn': fn, 'count': count, 'args': list(args)})
+
+    def ping(self, timeout=5):
+        return self.request({'op': 'ping'}, timeout=timeout)
+
+    def close(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class SignerPool(SignBackend):
+    """多个常驻签名进程组成的进程池
+
+    调用分发给当前在途请求最少的进程；进程崩溃后由健康检查线程或下一次调用自动重启；
+    记录每个进程的调用次数、失败次数与耗时。
+    """
+
+    name = 'pool'
+
+    def __init__(self, script_path, size=SIGN_WORKERS, health_interval=SIGN_HEALTH_INTERVAL):
+        self.script_path = script_path
+        self.size = max(1, size)
+        self.health_interval = health_interval
+        self.workers = [NodeWorkerBackend(script_path) for _ in range(self.size)]
+        self._inflight = [0] * self.size
+        self._stats = [
+            {'calls': 0, 'errors': 0, 'restarts': 0, 'total_time': 0.0, 'max_time': 0.0, 'last_time': 0.0}
+            for _ in range(self.size)
+        ]
+        self._checking = set()  # 正在健康检查或重启的进程，不再分发新的调用
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._closed = False
+
+    @property
+    def start_failures(self):
+        # 所有进程都反复启动失败时才认为整个进程池不可用
+        return min(worker.start_failures for worker in self.workers)
+
+    def start(self):
+        """预先启动全部签名进程"""
+        for worker in self.workers:
+            worker.start()
+        self._ensure_health_thread()
+
+    def _acquire(self, exclude=None):
+        with self._lock:
+            # 优先避开正在健康检查的进程，没有其他进程可用时才分发给它
+            candidates = ([i for i in range(self.size) if i != exclude and i not in self._checking]
+                          or [i for i in range(self.size) if i != exclude] or [exclude])
+            index = min(candidates, key=lambda i: self._inflight[i])
+            self._inflight[index] += 1
+            return index
+
+    def _release(self, index, elapsed, error=False):
+        with self._lock:
+            self._inflight[index] -= 1
+            stats = self._stats[index]
+            stats['calls'] += 1
+            if error:
+                stats['errors'] += 1
+                return
+            stats['total_time'] += elapsed
+            stats['last_time'] = elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def _dispatch(self, method, *args):
+        self._ensure_health_thread()
+        index = self._acquire()
+        try:
+            return self._invoke(index, method, *args)
+        except SignError:
+            if self.size == 1:
+                raise
+            # 换一个进程重试一次
+            index = self._acquire(exclude=index)
+            return self._invoke(index, method, *args)
+
+    def _invoke(self, index, method, *args):
+        worker = self.workers[index]
+        if worker.crashed:
+            with self._lock:
+                self._stats[index]['restarts'] += 1
+        start = time.perf_counter()
+        try:
+            result = getattr(worker, method)(*args)
+        except SignError:
+            self._release(index, time.perf_counter() - start, error=True)
+            raise
+        self._release(index, time.perf_counter() - start)
+        return result
+
+    def call(self, fn, *args):
+        return self._dispatch('call', fn, *args)
+
+    def call_batch(self, fn, count, *args):
+        return self._dispatch('call_batch', fn, count, *args)
+
+    def _ensure_health_thread(self):
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, name='sign-pool-health', daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._closed:
+            time.sleep(self.health_interval)
+            self.health_check()
+
+    def health_check(self):
+        """检查已启动的进程，重启崩溃或无响应的进程
+
+        只检查空闲的进程；检查期间该进程不再接收新的调用，ping超时关闭进程时不会连带中断真实的签名请求。
+        已在检查中的进程（如手动调用与后台线程同时检查）跳过，不会被重复重启。
+        """
+        for index, worker in enumerate(self.workers):
+            with self._lock:
+                if index in self._checking or self._inflight[index] or not (worker.alive or worker.crashed):
+                    continue
+                self._checking.add(index)
+            try:
+                self._check_worker(index, worker)
+            finally:
+                with self._lock:
+                    self._checking.discard(index)
+
+    def _check_worker(self, index, worker):
+        if worker.crashed:
+            logger.warning(f"签名进程{index}已退出，正在重启")
+        else:
+            try:
+                worker.ping()
+                return
+            except SignError as e:
+                logger.warning(f"签名进程{index}健康检查失败，正在重启: {e}")
+                worker.close()
+        try:
+            worker.start()
+        except SignError as e:
+            logger.error(f"签名进程{index}重启失败: {e}")
+            return
+        with self._lock:
+            self._stats[index]['restarts'] += 1
+
+    def stats(self):
+        """每个签名进程的状态与耗时统计"""
+        result = []
+        with self._lock:
+            for index, worker in enumerate(self.workers):
+                stats = dict(self._stats[index])
+                succeeded = stats['calls'] - stats['errors']
+                stats['avg_time'] = stats['total_time'] / succeeded if succeeded else 0.0
+                stats.update(index=index, pid=worker.pid, alive=worker.alive, inflight=self._inflight[index])
+                result.append(stats)
+        return result
+
+    def close(self):
+        self._closed = True
+        for worker in self.workers:
+            worker.close()
+
+
+class SignEngine:
+    """签名引擎：优先使用常驻进程后端，失败时回退到 execjs"""
+
+    def __init__(self, script_name, backend=None, workers=1):
+        """
+        Args:
+            script_name (str): static 目录下的签名脚本文件名
+            backend (str): node 或 execjs，默认读取 XHS_SIGN_BACKEND
+            workers (int): 常驻签名进程数量，大于 1 时使用 SignerPool
+        """
+        self.script_path = os.path.join(STATIC_DIR, script_name)
+        self.backend_name = backend or SIGN_BACKEND
+        self.workers = workers
+        self._primary = None
+        self._fallback = None
+        self._lock = threading.Lock()
+
+    def _get_primary(self):
+        if self._primary is None:
+            with self._lock:
+                if self._primary is None:
+                    if self.backend_name == 'node' and self.workers > 1:
+                        self._primary = SignerPool(self.script_path, size=self.workers)
+                    elif self.backend_name == 'node':
+                        self._primary = NodeWorkerBackend(self.script_path)
+                    else:
+                        self._primary = self._get_fallback()
+        return self._primary
+
+    def _get_fallback(self):
+        if self._fallback is None:
+            self._fallback = ExecjsBackend(self.script_path)
+        return self._fallback
+
+    def _run(self, method, *args):
+        primary = self._get_primary()
+        if getattr(primary, 'start_failures', 0) >= MAX_START_FAILURES:
+            # 常驻进程反复启动失败（如缺少 node 或 jsdom），不再尝试，直接使用 execjs
+            logger.error(f"签名进程连续{primary.start_failures}次启动失败，改用execjs后端")
+            self._primary = primary = self._get_fallback()
+        try:
+            return getattr(primary, method)(*args)
+        except (SignError, OSError) as e:
+            if isinstance(primary, ExecjsBackend):
+                raise
+            logger.warning(f"常驻签名进程调用失败，回退到execjs: {e}")
+            return getattr(self._get_fallback(), method)(*args)
+
+    def call(self, fn, *args):
+        return self._run('call', fn, *args)
+
+    def call_batch(self, fn, count, *args):
+        return self._run('call_batch', fn, count, *args)
+
+    def stats(self):
+        """签名后端统计，进程池返回每个进程的统计"""
+        primary = self._primary
+        if isinstance(primary, SignerPool):
+            return {'backend': primary.name, 'workers': primary.stats()}
+        return {'backend': primary.name if primary is not None else self.backend_name}
+
+    def close(self):
+        if self._primary is not None:
+            self._primary.close()
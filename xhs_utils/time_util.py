@@ -0,0 +1,60 @@
+"""
+时间戳转换
+评论时间在内部保存为毫秒时间戳，只在输出时格式化。同一页的评论时间往往集中在相近的秒，
+格式化结果按秒缓存，重复的秒不再调用 fromtimestamp/strftime。
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_epoch_ms(value):
+    """把接口返回的时间戳（毫秒，整数或数字字符串）转换为int，缺失或无法解析时返回None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value == value else None  # 排除NaN
+    if isinstance(value, str):
+        try:
+            return int(float(value)) if value.strip() else None
+        except ValueError:
+            return None
+    return None
+
+
+def now_ms():
+    return int(datetime.now().timestamp() * 1000)
+
+
+@lru_cache(maxsize=8192)
+def _datetime_of_second(second):
+    return datetime.fromtimestamp(second)
+
+
+@lru_cache(maxsize=8192)
+def _format_second(second):
+    return _datetime_of_second(second).strftime(TIME_FORMAT)
+
+
+def format_epoch_ms(ms):
+    """毫秒时间戳格式化为 %Y-%m-%d %H:%M:%S，None或超出范围时返回空字符串"""
+    if ms is None:
+        return ''
+    try:
+        return _format_second(ms // 1000)
+    except (OverflowError, OSError, ValueError):
+        return ''
+
+
+def epoch_ms_to_datetime(ms):
+    """毫秒时间戳转换为datetime（精确到秒），None或超出范围时返回None"""
+    if ms is None:
+        return None
+    try:
+        return _datetime_of_second(ms // 1000)
+    except (OverflowError, OSError, ValueError):
+        return None
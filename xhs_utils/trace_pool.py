@@ -0,0 +1,92 @@
+"""
+x-xray-traceid 预生成池
+由后台线程通过常驻签名进程批量生成 trace-id，构造请求头时直接从池中取，
+不再在请求路径上执行 xray 脚本。
+"""
+
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from loguru import logger
+
+
+class TraceIdPool:
+    """x-xray-traceid 池
+
+    deque 的 append/popleft 在 CPython 中是原子操作，取 id 时不需要加锁；
+    池中剩余数量低于 low_water 时唤醒后台线程批量补充到 capacity。
+    """
+
+    def __init__(self, engine, fn='traceId', capacity=512, low_water=128, batch_size=128):
+        """
+        Args:
+            engine: 加载了 xray 脚本的签名引擎，需要提供 call_batch
+            fn (str): 生成 trace-id 的 JS 函数名
+            capacity (int): 池的最大容量
+            low_water (int): 低水位，剩余数量低于该值时触发补充
+            batch_size (int): 每次向签名进程请求的数量
+        """
+        self.engine = engine
+        self.fn = fn
+        self.capacity = capacity
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self._ids = deque(maxlen=capacity)
+        self._refill_event = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.fallback_count = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get(self):
+        """取一个 trace-id，池为空时用本地算法生成，不等待 JS"""
+        self._ensure_thread()
+        try:
+            trace_id = self._ids.popleft()
+        except IndexError:
+            self.fallback_count += 1
+            trace_id = local_trace_id()
+        if len(self._ids) < self.low_water:
+            self._refill_event.set()
+        return trace_id
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refill_loop, name='xray-trace-pool', daemon=True)
+                self._thread.start()
+                self._refill_event.set()
+
+    def _refill_loop(self):
+        while True:
+            self._refill_event.wait()
+            self._refill_event.clear()
+            try:
+                self.refill()
+            except Exception as e:
+                logger.warning(f"补充x-xray-traceid池失败: {e}")
+                time.sleep(5)
+
+    def refill(self):
+        """批量生成 trace-id，补充到池满"""
+        while len(self._ids) < self.capacity:
+            count = min(self.batch_size, self.capacity - len(self._ids))
+            self._ids.extend(self.engine.call_batch(self.fn, count))
+
+
+_seq = itertools.count(random.randrange(1 << 23))
+
+
+def local_trace_id():
+    """与 xhs_xray.js 中 traceId 相同格式的本地实现
+
+    前 16 位为 (毫秒时间戳 << 23 | 自增序号)，后 16 位为 64 位随机数，均为十六进制。
+    """
+    head = ((int(time.time() * 1000) << 23) | (next(_seq) & 0x7FFFFF)) & 0xFFFFFFFFFFFFFFFF
+    return f"{head:016x}{random.getrandbits(64):016x}"
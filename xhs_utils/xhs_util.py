@@ -1,28 +1,29 @@
-import json
-import math
-import random
-import execjs
-from xhs_utils.cookie_util import trans_cookies
+import os
+from types import MappingProxyType
+from xhs_utils.cookie_util import parse_cookies
+from xhs_utils.sign_engine import SignEngine, SIGN_WORKERS
+from xhs_utils.trace_pool import TraceIdPool
+from xhs_utils import xs_encoder, json_codec
 
-try:
-    js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
-
-try:
-    xray_js = execjs.compile(open(r'../static/xhs_xray.js', 'r', encoding='utf-8').read())
-except:
-    xray_js = execjs.compile(open(r'static/xhs_xray.js', 'r', encoding='utf-8').read())
+# 签名脚本由常驻签名进程加载一次，之后每次签名只是一次进程间通信
+# x-s 签名使用多进程池，并发请求可以同时在多个核上签名
+js = SignEngine('xhs_xs_xsc_56.js', workers=SIGN_WORKERS)
+xray_js = SignEngine('xhs_xray.js')
+# x-xray-traceid 由后台线程批量预生成，构造请求头时直接取用
+xray_pool = TraceIdPool(
+    xray_js,
+    capacity=int(os.getenv('XHS_XRAY_POOL_SIZE', '512')),
+    low_water=int(os.getenv('XHS_XRAY_POOL_LOW_WATER', '128')),
+)
 
 def generate_x_b3_traceid(len=16):
-    x_b3_traceid = ""
-    for t in range(len):
-        x_b3_traceid += "abcdef0123456789"[math.floor(16 * random.random())]
-    return x_b3_traceid
+    # 一次取足够的随机字节转成十六进制，不再逐字符拼接
+    return os.urandom((len + 1) // 2).hex()[:len]
 
 def generate_xs_xs_common(a1, api, data=''):
-    ret = js.call('get_request_headers_params', api, data, a1)
-    xs, xt, xs_common = ret['xs'], ret['xt'], ret['xs_common']
+    # 只有 x-s 依赖脚本中的虚拟机，x-s-common 由 Python 直接计算
+    xs, xt = generate_xs(a1, api, data)
+    xs_common = xs_encoder.xs_common(a1, xs, xt)
     return xs, xt, xs_common
 
 def generate_xs(a1, api, data=''):
@@ -31,7 +32,7 @@ def generate_xs(a1, api, data=''):
     return xs, xt
 
 def generate_xray_traceid():
-    return xray_js.call('traceId')
+    return xray_pool.get()
 def get_common_headers():
     return {
         "authority": "www.xiaohongshu.com",
@@ -50,49 +51,70 @@ def get_common_headers():
         "upgrade-insecure-requests": "1",
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
     }
+# edith 接口请求头中不变的部分，只构造一次；签名相关的键保留占位以固定请求头顺序
+_REQUEST_HEADERS_BASE = {
+    "authority": "edith.xiaohongshu.com",
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+    "cache-control": "no-cache",
+    "content-type": "application/json;charset=UTF-8",
+    "origin": "https://www.xiaohongshu.com",
+    "pragma": "no-cache",
+    "referer": "https://www.xiaohongshu.com/",
+    "sec-ch-ua": "\"Not A(Brand\";v=\"99\", \"Microsoft Edge\";v=\"121\", \"Chromium\";v=\"121\"",
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": "\"Windows\"",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-site",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36 Edg/121.0.0.0",
+    "x-b3-traceid": "",
+    "x-mns": "unload",
+    "x-s": "",
+    "x-s-common": "",
+    "x-t": "",
+    "x-xray-traceid": "",
+}
+# 对外只读；合并时展开内部的普通字典，展开 MappingProxyType 要慢得多
+REQUEST_HEADERS_BASE = MappingProxyType(_REQUEST_HEADERS_BASE)
+
 def get_request_headers_template():
+    return {**_REQUEST_HEADERS_BASE, "x-xray-traceid": generate_xray_traceid()}
+
+def build_request_headers(xs, xt, xs_common, xray_traceid):
+    """在不变的请求头上一次合并出本次请求的请求头"""
     return {
-        "authority": "edith.xiaohongshu.com",
-        "accept": "application/json, text/plain, */*",
-        "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-        "cache-control": "no-cache",
-        "content-type": "application/json;charset=UTF-8",
-        "origin": "https://www.xiaohongshu.com",
-        "pragma": "no-cache",
-        "referer": "https://www.xiaohongshu.com/",
-        "sec-ch-ua": "\"Not A(Brand\";v=\"99\", \"Microsoft Edge\";v=\"121\", \"Chromium\";v=\"121\"",
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": "\"Windows\"",
-        "sec-fetch-dest": "empty",
-        "sec-fetch-mode": "cors",
-        "sec-fetch-site": "same-site",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36 Edg/121.0.0.0",
-        "x-b3-traceid": "",
-        "x-mns": "unload",
-        "x-s": "",
-        "x-s-common": "",
-        "x-t": "",
-        "x-xray-traceid": generate_xray_traceid()
+        **_REQUEST_HEADERS_BASE,
+        "x-b3-traceid": generate_x_b3_traceid(),
+        "x-s": xs,
+        "x-s-common": xs_common,
+        "x-t": str(xt),
+        "x-xray-traceid": xray_traceid,
     }
 
 def generate_headers(a1, api, data=''):
     xs, xt, xs_common = generate_xs_xs_common(a1, api, data)
-    x_b3_traceid = generate_x_b3_traceid()
-    headers = get_request_headers_template()
-    headers['x-s'] = xs
-    headers['x-t'] = str(xt)
-    headers['x-s-common'] = xs_common
-    headers['x-b3-traceid'] = x_b3_traceid
+    headers = build_request_headers(xs, xt, xs_common, generate_xray_traceid())
     if data:
-        data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        # 请求体直接编码为UTF-8字节，orjson时不经过 bytes -> str -> bytes
+        data = json_codec.dumps_bytes(data)
     return headers, data
 
 def generate_request_params(cookies_str, api, data=''):
-    cookies = trans_cookies(cookies_str)
-    # print(f'Cookies: {cookies}')
-    a1 = cookies['a1']
-    headers, data = generate_headers(a1, api, data)
-    return headers, cookies, data
+    # 同一个cookie字符串只解析一次，每次请求只复制字典
+    parsed = parse_cookies(cookies_str)
+    if parsed.a1 is None:
+        raise KeyError('a1')
+    headers, data = generate_headers(parsed.a1, api, data)
+    return headers, dict(parsed.cookies), data
+
+def get_sign_stats():
+    """签名进程池与 trace-id 池的运行统计"""
+    return {
+        'xs': js.stats(),
+        'xray': xray_js.stats(),
+        'xray_pool': {'size': len(xray_pool), 'fallback_count': xray_pool.fallback_count},
+    }
 
 def splice_str(api, params):
     url = api + '?'
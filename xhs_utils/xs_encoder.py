@@ -0,0 +1,104 @@
+"""
+x-s / x-s-common 编码的 Python 实现
+对应 static/xhs_xs_xsc_56.js 中的确定性部分：encrypt_encodeUtf8、encrypt_b64Encode、
+encrypt_mcr、XsCommon。
+x-s 由脚本内的虚拟机 window._webmsxyw 生成，仍需调用 JS。
+"""
+
+import base64
+import json
+import zlib
+
+# encrypt_lookup 反混淆后的编码表，即替换了字符顺序的 base64 字母表
+ENCRYPT_LOOKUP = "ZmserbBoHQtNP+wOcza/LpngG8yJq42KWYj0DSfdikx3VT16IlUAFM97hECvuRX5"
+_STANDARD_B64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_B64_TABLE = str.maketrans(_STANDARD_B64, ENCRYPT_LOOKUP)
+
+# encrypt_mcr 使用的 CRC32 多项式
+_MCR_POLY = 0xEDB88320
+_MCR_TABLE = []
+for _i in range(256):
+    _c = _i
+    for _ in range(8):
+        _c = (_c >> 1) ^ _MCR_POLY if _c & 1 else _c >> 1
+    _MCR_TABLE.append(_c)
+
+# XsCommon 中的 x8 固定指纹
+X8_FINGERPRINT = (
+    "I38rHdgsjopgIvesdVwgIC+oIELmBZ5e3VwXLgFTIxS3bqwErFeexd0ekncAzMFYnqthIhJeSfMDKutRI3KsYorWHPtGrbV0P9Wf"
+    "Ii/eWc6eYqtyQApPI37ekmR1QL+5Ii6sdnoeSfqYHqwl2qt5B0DoIx+PGDi/sVtkIxdeTqwGtuwWIEhBIE3s3Mi3ICLdI3Oe0Vtl"
+    "2ADmsLveDSJsSPw5IEvsiVtJOqw8BVwfPpdeTFWOIx4TIiu6ZPwbPut5IvlaLbgs3qtxIxes1VwHIkumIkIyejgsY/WTge7eSqte"
+    "/D7sDcpipBKefm4sIx/efutZIE0ejutImcLj8fPHIx5e3ut3gIoe19kKIESPIhhgHgGUI38P4m+oIhLu/uwMI3qV2d3ejIgs6PwR"
+    "Ivge0fvejAR2IideTbVUqqwkIkOs196s6Y3eiVwopa/eDuwFICFeoBKsWqt1msoeYqtoIvIQIvm5muwGmPwJoei4KWKed77eiPwc"
+    "IioejAAeVMDYIiNsWMvs3nV7Ikge1Vt6IkiIPqwwNqtUI3OeiVtdIkKsVqwVIENsDqtXNPwnsuwFIvGUI3HgGBIW2IveiPtMIhPK"
+    "Ii0eSPw4eY4KLa6sYjYdIirw4VtOZuw5ICKe3qtd+L/eTlJs1rSwIhOs3oNs3qts/VwqI3Ae0PwAIkge6sR+Ixds0UgsSPtRIh/e"
+    "SPwUH0PwIiLpI33sxMgeka/ejFdsYPtQIiFFI3EYmutcICEIIEgs3SFSNsOsWutsIEbQmqtWGIKsjMveYPwrsPwZIvEDIhh+Luwt"
+    "yPtbIC7eWMAs6Vt2ZVwHIiHQLPw5IvG4L9MgIEJe0L/sY9Ne3VwsHVt4I3HyIx0s6PtRIEKe0WPAI3bebW42ICSKIv0e1VwvbVww"
+    "4VwFICb3IkJexfgskutTmI8lIC4LqPtseuteIxGiIibyIiT3IE/ekSKe3WLItuwKICLEpPwQrVwVIh6sT/lvIEm3sUNs0Vwdcqwm"
+    "zLYKr/DXIiMlaVwtIkdsDWY/IiTHrPwYIhZO2utfbPtwIEDIIClMICk/zVtjIE4OIiee6VtFLbV1IkbNI3gedo5ekPwkICYkIEPA"
+    "njHdIvpf/Wq9IxgedYoeSuwZIENsiVtQIEZ8IC3s0PtwIxIpzPtYI3ve1FTnouw6GuwQIx0eSPwwIEJsSDzSIEJsDoAsTVtrtsvs"
+    "SuwOcm7e6utrIx/sxYJe3PtaIEq0Ikq2autQyMFnIv5sjVtap7Ks1LFEsuwNIxRPIivsdYYrIiAeDPtrIvHyIEgeWZFdIkHLIico"
+    "8M8nICJeYWYFIkWMIvb9I3oeSdWLJuwzbuwynmgsdF5sfqtYIv6ejbNejqwzZVtNI3QPnqw0outHHqtUGqwEtVtWt06s6z5ei9/s"
+    "kl6e6uwqIiPGIhT6I3QFI3OsiBgsT7hUHVtGIEMEmut4P03ekPt8ICAsfZOefezZIvAsSqwmPpmxI36sfPt6IvesVuw7HqtyI3Je"
+    "fdDzOutZbc7ejph="
+)
+
+
+def _to_int32(value):
+    value &= 0xFFFFFFFF
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def encode_utf8(text):
+    """encrypt_encodeUtf8: encodeURIComponent 后逐字节展开，结果与 UTF-8 编码一致"""
+    return text.encode('utf-8')
+
+
+def b64_encode(data):
+    """encrypt_b64Encode: 使用 ENCRYPT_LOOKUP 字母表的 base64"""
+    return base64.b64encode(bytes(data)).decode('ascii').translate(_B64_TABLE)
+
+
+def mcr(value):
+    """encrypt_mcr: CRC32 变体，结果再与多项式异或并转为有符号 32 位整数
+
+    字符串按 UTF-16 码元计算；码元大于 255 时 JS 中查表得到 undefined，按 0 处理。
+    """
+    if isinstance(value, str):
+        try:
+            return _to_int32(zlib.crc32(value.encode('latin-1')) ^ _MCR_POLY)
+        except UnicodeEncodeError:
+            data = memoryview(value.encode('utf-16-le', 'surrogatepass')).cast('H')
+    else:
+        return _to_int32(zlib.crc32(bytes(value)) ^ _MCR_POLY)
+
+    n = 0xFFFFFFFF
+    for code in data:
+        index = (n & 255) ^ code
+        n = (_MCR_TABLE[index] if index < 256 else 0) ^ (n >> 8)
+    return _to_int32(n ^ 0xFFFFFFFF ^ _MCR_POLY)
+
+
+def _js_json(data):
+    """与 JSON.stringify 输出一致的紧凑 JSON"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def xs_common(a1, xs, xt):
+    """XsCommon: 根据 a1、x-s、x-t 生成 x-s-common"""
+    data = {
+        "s0": 5,
+        "s1": "",
+        "x0": "1",
+        "x1": "3.8.7",
+        "x2": "Windows",
+        "x3": "xhs-pc-web",
+        "x4": "4.45.1",
+        "x5": a1,
+        "x6": xt,
+        "x7": xs,
+        "x8": X8_FINGERPRINT,
+        "x9": mcr(str(xt) + xs + X8_FINGERPRINT),
+        "x10": 11,
+    }
+    return b64_encode(encode_utf8(_js_json(data)))